@@ -0,0 +1,45 @@
+"""
+gunicorn configuration for multi-worker serving.
+
+The app is imported once in the master (``preload_app``) so the CLIP weights,
+FAISS indexes and metadata are loaded a single time and shared with the
+forked workers copy-on-write. Before forking, ``gc.freeze`` moves every object
+created so far into the permanent generation, so the collector in each worker
+never writes to those pages while scanning them.
+
+Fork does not carry CUDA contexts over, so workers must run on the CPU:
+set ``CLIP_DEVICE=cpu`` and ``APPLE_FAISS_GPU=-1``. ``FAISS_MMAP=true`` maps
+the index files instead of reading them, which keeps them shared even across
+separate master processes.
+
+Example:
+    CLIP_DEVICE=cpu APPLE_FAISS_GPU=-1 FAISS_MMAP=true \
+        gunicorn -c gunicorn_conf.py main:app
+"""
+
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+torch_threads = int(os.getenv("TORCH_THREADS", "0"))
+
+
+def pre_fork(server, worker):  # pylint: disable=unused-argument
+    """
+    Freezes the preloaded heap so worker garbage collection leaves it untouched.
+    """
+    gc.freeze()
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """
+    Splits the CPU threads between workers instead of oversubscribing them.
+    """
+    import torch  # pylint: disable=import-outside-toplevel
+    threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
+    server.log.info("worker %s using %s torch threads", worker.pid, threads)
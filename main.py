@@ -2,11 +2,24 @@
 run backend
 """
 
+import asyncio
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from src.api.routers import clip_router
+from src.api.routers import (clip_router,
+                             admin_router,
+                             health_router)
+from src.api.dependencies.dependency import service
+from src.api.middlewares.upload_limit import UploadLimitMiddleware
+from src.api.middlewares.traffic_capture import (TRAFFIC_CAPTURE,
+                                                 TrafficCaptureMiddleware)
+from src.utils.utility import convert_value
+
+HOT_RELOAD_WATCH = convert_value(os.getenv("HOT_RELOAD_WATCH", "false"))
+HOT_RELOAD_INTERVAL = convert_value(os.getenv("HOT_RELOAD_INTERVAL", "30"))
 
 app = FastAPI(
     title="Hermes Backend",
@@ -14,6 +27,12 @@ app = FastAPI(
     version="1.0"
 )
 
+# registered before CORS so CORS wraps it and its 413 carries CORS headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    paths=["/clip/searchByImage"]
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins
@@ -22,7 +41,35 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+if TRAFFIC_CAPTURE:
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        prefixes=["/clip/"]
+    )
+
 app.include_router(clip_router)
+app.include_router(admin_router)
+app.include_router(health_router)
+
+
+@app.on_event("startup")
+async def start_store_watcher() -> None:
+    """
+    Start polling the index and metadata files when HOT_RELOAD_WATCH is set
+    and the indexes are loaded in this process.
+    """
+    if HOT_RELOAD_WATCH and service.reloadable:
+        app.state.store_watcher = asyncio.create_task(
+            service.watch_store(interval=HOT_RELOAD_INTERVAL)
+        )
+
+
+@app.on_event("startup")
+async def start_warm_up() -> None:
+    """
+    Warm the encoders up in the background; /health/ready answers 503 until done.
+    """
+    app.state.warm_up = asyncio.create_task(service.warm_up())
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,224 @@
+"""
+This module provides request admission control for the retrieval endpoints.
+
+Endpoints are grouped into classes ("text" for interactive text queries,
+"heavy" for image and multi-event work). Each class has a concurrency limit
+and a bounded wait queue, and all classes share a global limit. When a slot
+frees up, waiting text requests are admitted before heavy ones. Requests are
+shed immediately with 429 when their queue is full, or with 503 when the
+expected wait exceeds the latency budget; both carry ``Retry-After``.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Dict, List, Tuple
+
+from fastapi import (status,
+                     HTTPException)
+
+from src.utils.utility import convert_value
+
+ADMISSION_CONTROL = convert_value(os.getenv("ADMISSION_CONTROL", "true"))
+ADMISSION_TOTAL_LIMIT = convert_value(os.getenv("ADMISSION_TOTAL_LIMIT", "8"))
+ADMISSION_TEXT_LIMIT = convert_value(os.getenv("ADMISSION_TEXT_LIMIT", "8"))
+ADMISSION_HEAVY_LIMIT = convert_value(os.getenv("ADMISSION_HEAVY_LIMIT", "2"))
+ADMISSION_TEXT_QUEUE = convert_value(os.getenv("ADMISSION_TEXT_QUEUE", "64"))
+ADMISSION_HEAVY_QUEUE = convert_value(os.getenv("ADMISSION_HEAVY_QUEUE", "16"))
+ADMISSION_LATENCY_BUDGET = convert_value(os.getenv("ADMISSION_LATENCY_BUDGET", "5"))
+
+PRIORITIES = {"text": 0, "heavy": 1}
+
+
+class AdmissionController:
+    """
+    Tracks in-flight work per endpoint class and decides admission.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        queue_limits: Dict[str, int],
+        total_limit: int,
+        latency_budget: float,
+        initial_latency: float = 0.5
+    ) -> None:
+        """
+        Initializes the controller.
+
+        Args:
+            limits (Dict[str, int]): The concurrency limit of each class.
+            queue_limits (Dict[str, int]): The maximum number of waiting requests per class.
+            total_limit (int): The concurrency limit across all classes.
+            latency_budget (float): The longest acceptable queueing delay in seconds.
+            initial_latency (float): The service time assumed before any is measured.
+        """
+        self._limits = limits
+        self._queue_limits = queue_limits
+        self._total_limit = total_limit
+        self._latency_budget = latency_budget
+        self._in_flight = {name: 0 for name in limits}
+        self._waiting = {name: 0 for name in limits}
+        self._latency = {name: initial_latency for name in limits}
+        self._admitted = {name: 0 for name in limits}
+        self._shed = {name: 0 for name in limits}
+        self._queue: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def _can_run(self, name: str) -> bool:
+        return (
+            self._in_flight[name] < self._limits[name]
+            and sum(self._in_flight.values()) < self._total_limit
+        )
+
+    def _expected_wait(self, name: str) -> float:
+        """
+        Estimates the queueing delay of a new request of the given class.
+        """
+        ahead = self._waiting[name] + 1
+        return ahead * self._latency[name] / max(self._limits[name], 1)
+
+    def _shed_request(
+        self,
+        name: str,
+        status_code: int,
+        detail: str
+    ) -> HTTPException:
+        self._shed[name] += 1
+        retry_after = max(1, math.ceil(self._expected_wait(name)))
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def _dispatch(self) -> None:
+        """
+        Admits waiting requests in priority order while slots are available.
+        """
+        blocked = []
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            _, _, name, future = entry
+            if future.done():
+                continue
+            if self._can_run(name):
+                self._waiting[name] -= 1
+                self._in_flight[name] += 1
+                future.set_result(None)
+            else:
+                blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self._queue, entry)
+
+    async def acquire(self, name: str) -> float:
+        """
+        Waits for a slot of the given class or sheds the request.
+
+        Args:
+            name (str): The endpoint class.
+
+        Returns:
+            float: The admission time, to be passed to release.
+
+        Raises:
+            HTTPException: 429 when the class queue is full, 503 when the
+            expected or actual wait exceeds the latency budget.
+        """
+        if self._can_run(name) and not self._waiting[name]:
+            self._in_flight[name] += 1
+            self._admitted[name] += 1
+            return time.monotonic()
+        if self._waiting[name] >= self._queue_limits[name]:
+            raise self._shed_request(
+                name, status.HTTP_429_TOO_MANY_REQUESTS, "Too many queued requests"
+            )
+        if self._expected_wait(name) > self._latency_budget:
+            raise self._shed_request(
+                name, status.HTTP_503_SERVICE_UNAVAILABLE, "Server is overloaded"
+            )
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[name] += 1
+        heapq.heappush(self._queue, (PRIORITIES.get(name, 1), next(self._sequence), name, future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self._latency_budget)
+        except BaseException as e:
+            # timed out, or cancelled by a disconnect or shutdown: undo the wait
+            if future.done() and not future.cancelled():
+                # admitted meanwhile; give the slot back
+                self._in_flight[name] -= 1
+                self._dispatch()
+            else:
+                future.cancel()
+                self._waiting[name] -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed_request(
+                    name, status.HTTP_503_SERVICE_UNAVAILABLE, "Queueing delay exceeded budget"
+                ) from e
+            raise
+        self._admitted[name] += 1
+        return time.monotonic()
+
+    def release(self, name: str, started: float) -> None:
+        """
+        Frees a slot, updates the service time estimate and admits waiters.
+
+        Args:
+            name (str): The endpoint class.
+            started (float): The value returned by acquire.
+        """
+        elapsed = time.monotonic() - started
+        self._latency[name] = 0.8 * self._latency[name] + 0.2 * elapsed
+        self._in_flight[name] -= 1
+        self._dispatch()
+
+    @property
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Returns per-class in-flight, waiting, admitted and shed counts.
+        """
+        return {
+            name: {
+                "limit": self._limits[name],
+                "in_flight": self._in_flight[name],
+                "waiting": self._waiting[name],
+                "admitted": self._admitted[name],
+                "shed": self._shed[name],
+                "latency": self._latency[name]
+            }
+            for name in self._limits
+        }
+
+
+admission = AdmissionController(
+    limits={"text": ADMISSION_TEXT_LIMIT, "heavy": ADMISSION_HEAVY_LIMIT},
+    queue_limits={"text": ADMISSION_TEXT_QUEUE, "heavy": ADMISSION_HEAVY_QUEUE},
+    total_limit=ADMISSION_TOTAL_LIMIT,
+    latency_budget=ADMISSION_LATENCY_BUDGET
+)
+
+
+def admit(name: str):
+    """
+    Create a dependency that holds a slot of the given class for the request.
+
+    Args:
+        name (str): The endpoint class, "text" or "heavy".
+
+    Returns:
+        The dependency function.
+    """
+    async def dependency():
+        if not ADMISSION_CONTROL:
+            yield
+            return
+        started = await admission.acquire(name)
+        try:
+            yield
+        finally:
+            admission.release(name, started)
+    return dependency
@@ -4,8 +4,17 @@ It imports the Service class from the src.services.service module and
 initializes an instance of it.
 """
 
+import hmac
+import os
+from typing import Optional
+from fastapi import (status,
+                     Header,
+                     HTTPException)
+
 from src.services.service import Service
 
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 service = Service()
 
 
@@ -14,3 +23,22 @@ async def get_service() -> Service:
     Get the inference service instance.
     """
     return service
+
+
+async def verify_admin(
+    x_admin_token: Optional[str] = Header(default=None)
+) -> None:
+    """
+    Reject admin requests without the configured token; without ADMIN_TOKEN
+    the admin API is disabled.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled; set ADMIN_TOKEN to enable it"
+        )
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
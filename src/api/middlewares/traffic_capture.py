@@ -0,0 +1,220 @@
+"""
+This module records API traffic as JSONL for later replay.
+
+Each completed request on a captured path appends one line with its method,
+path, query string, headers needed to resend it, body, status, response size
+and server-side latency. JSON bodies are stored as text and other bodies
+(multipart image uploads) base64-encoded. Encoding and writing happen on a
+background thread fed by a bounded queue, so capture never blocks the event
+loop; records are dropped (and counted) when the queue holds too many
+records or too many body bytes, so a burst of large uploads cannot grow
+memory by queue size times body cap. Each line is
+appended with ``write`` on a file opened in append mode, so several workers
+can share one capture file; a short write is completed with further writes.
+"""
+
+import atexit
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Union
+
+from src.utils.utility import convert_value
+
+TRAFFIC_CAPTURE = convert_value(os.getenv("TRAFFIC_CAPTURE", "false"))
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "requests.jsonl")
+TRAFFIC_CAPTURE_MAX_BODY = convert_value(
+    os.getenv("TRAFFIC_CAPTURE_MAX_BODY", str(20 * 1024 * 1024))
+)
+TRAFFIC_CAPTURE_QUEUE = convert_value(os.getenv("TRAFFIC_CAPTURE_QUEUE", "1024"))
+TRAFFIC_CAPTURE_QUEUE_BYTES = convert_value(
+    os.getenv("TRAFFIC_CAPTURE_QUEUE_BYTES", str(64 * 1024 * 1024))
+)
+
+REPLAY_HEADERS = (b"content-type",)
+
+logger = logging.getLogger(__name__)
+
+
+def encode_body(
+    body: bytes,
+    content_type: str
+) -> Dict:
+    """
+    Converts a request body to its JSON-serializable record fields.
+
+    Args:
+        body (bytes): The raw request body.
+        content_type (str): The request's Content-Type.
+
+    Returns:
+        Dict: ``body`` and ``body_encoding`` ("utf-8" or "base64").
+    """
+    if content_type.startswith("application/json"):
+        try:
+            return {"body": body.decode("utf-8"), "body_encoding": "utf-8"}
+        except UnicodeDecodeError:
+            pass
+    return {"body": base64.b64encode(body).decode("ascii"), "body_encoding": "base64"}
+
+
+def decode_body(record: Dict) -> bytes:
+    """
+    Restores the raw request body of a captured record.
+    """
+    if record.get("body_encoding") == "base64":
+        return base64.b64decode(record.get("body", ""))
+    return record.get("body", "").encode("utf-8")
+
+
+class TrafficCaptureMiddleware:
+    """
+    Appends a JSONL record for every request whose path starts with one of the prefixes.
+    """
+
+    def __init__(
+        self,
+        app,
+        prefixes: Iterable[str] = ("/clip/",),
+        path: str = TRAFFIC_CAPTURE_PATH,
+        max_body: int = TRAFFIC_CAPTURE_MAX_BODY,
+        queue_size: int = TRAFFIC_CAPTURE_QUEUE,
+        queue_bytes: int = TRAFFIC_CAPTURE_QUEUE_BYTES
+    ) -> None:
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            prefixes (Iterable[str]): The path prefixes to record.
+            path (str): The JSONL file records are appended to.
+            max_body (int): Bodies longer than this are recorded as truncated.
+            queue_size (int): The number of records waiting to be written
+                before new ones are dropped.
+            queue_bytes (int): The body bytes waiting to be written before
+                new records are dropped.
+        """
+        self._app = app
+        self._prefixes = tuple(prefixes)
+        self._path = path
+        self._max_body = max_body
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._queue_bytes = queue_bytes
+        self._queued_bytes = 0
+        self._queued_lock = threading.Lock()
+        self._writer: Union[threading.Thread, None] = None
+        self.dropped = 0
+
+    def _enqueue(
+        self,
+        record: Dict,
+        body: bytes,
+        content_type: str
+    ) -> None:
+        """
+        Hands a record to the writer thread, starting it on first use.
+        """
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="traffic-capture", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self._close)
+        with self._queued_lock:
+            if self._queued_bytes + len(body) > self._queue_bytes:
+                self.dropped += 1
+                return
+            self._queued_bytes += len(body)
+        try:
+            self._queue.put_nowait((record, body, content_type))
+        except queue.Full:
+            with self._queued_lock:
+                self._queued_bytes -= len(body)
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        """
+        Encodes queued records and appends them to the capture file until closed.
+        """
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                record, body, content_type = item
+                with self._queued_lock:
+                    self._queued_bytes -= len(body)
+                record.update(encode_body(body, content_type))
+                data = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                try:
+                    while data:
+                        data = data[os.write(fd, data):]
+                except OSError:
+                    logger.exception("traffic capture write failed")
+        finally:
+            os.close(fd)
+
+    def _close(self) -> None:
+        """
+        Writes the queued records and stops the writer thread.
+        """
+        try:
+            self._queue.put(None, timeout=5)
+        except queue.Full:
+            return
+        self._writer.join(timeout=5)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._prefixes):
+            await self._app(scope, receive, send)
+            return
+
+        chunks: List[bytes] = []
+        received = 0
+        response = {"status": None, "bytes": 0}
+
+        async def capture_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                if received + len(body) <= self._max_body:
+                    chunks.append(body)
+                received += len(body)
+            return message
+
+        async def capture_send(message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        headers = dict(scope["headers"])
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        wall_time = time.time()
+        started = time.perf_counter()
+        try:
+            await self._app(scope, capture_receive, capture_send)
+        finally:
+            record = {
+                "timestamp": wall_time,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": {
+                    name.decode("latin-1"): headers[name].decode("latin-1")
+                    for name in REPLAY_HEADERS if name in headers
+                },
+                "status": response["status"],
+                "request_bytes": received,
+                "response_bytes": response["bytes"],
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "truncated": received > self._max_body
+            }
+            self._enqueue(record, b"".join(chunks), content_type)
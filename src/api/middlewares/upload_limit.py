@@ -0,0 +1,53 @@
+"""
+This module rejects oversized uploads before their body is read.
+
+FastAPI parses multipart bodies before the endpoint runs, so the size check
+has to happen at the ASGI layer using the declared Content-Length.
+"""
+
+import os
+from typing import Iterable
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from src.utils.utility import convert_value
+
+MAX_UPLOAD_BYTES = convert_value(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadLimitMiddleware:
+    """
+    Answers 413 to requests on the given paths whose Content-Length exceeds the limit.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Iterable[str],
+        max_bytes: int = MAX_UPLOAD_BYTES
+    ) -> None:
+        """
+        Initializes the middleware.
+
+        Args:
+            app: The wrapped ASGI application.
+            paths (Iterable[str]): The upload endpoints to guard.
+            max_bytes (int): The largest accepted request body.
+        """
+        self._app = app
+        self._paths = set(paths)
+        self._max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in self._paths:
+            length = dict(scope["headers"]).get(b"content-length", b"0")
+            if length.isdigit() and int(length) > self._max_bytes:
+                response = JSONResponse(
+                    {"detail": f"Upload exceeds {self._max_bytes} bytes"},
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+                await response(scope, receive, send)
+                return
+        await self._app(scope, receive, send)
@@ -2,3 +2,5 @@
 Create package for API router clip
 """
 from .clip_retrieval import clip_router
+from .admin import admin_router
+from .health import health_router
@@ -0,0 +1,191 @@
+"""
+This module defines a FastAPI router for operating the running service.
+"""
+import asyncio
+import logging
+from fastapi import (status,
+                     Depends,
+                     APIRouter,
+                     HTTPException)
+
+from src.api.schemas.admin import (ReloadRequest,
+                                   ReloadStatus,
+                                   MemoryProfileRequest)
+from src.services.service import Service
+from src.api.dependencies.dependency import (get_service,
+                                             verify_admin)
+from src.api.dependencies.admission import admission
+from src.utils.memory import (PROFILE_GROUPS,
+                              PROFILE_LOCK)
+
+
+admin_router = APIRouter(
+    tags=["Admin"],
+    prefix="/admin",
+    dependencies=[Depends(verify_admin)]
+)
+
+_background_tasks = set()
+
+logger = logging.getLogger(__name__)
+
+
+def _reload_done(task: asyncio.Task) -> None:
+    """
+    Forgets a finished reload task, logging its failure; the error is
+    already recorded in the reload status.
+    """
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("store reload failed: %s", task.exception())
+
+
+@admin_router.post(
+    "/reload",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ReloadStatus
+)
+async def reload_store(
+    request: ReloadRequest,
+    service: Service = Depends(get_service)
+) -> ReloadStatus:
+    """
+    Starts loading a new index and metadata, swapping them in once ready.
+
+    Args:
+        request (ReloadRequest): Paths to change; empty fields keep the current paths.
+        service (Service): The service instance whose store is reloaded.
+
+    Returns:
+        ReloadStatus: The status at the time the reload was started.
+
+    Raises:
+        HTTPException: If the store cannot be reloaded here or a reload is
+        already in progress.
+    """
+    if not service.reloadable:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The indexes are held by the inference worker; restart it to reload"
+        )
+    if service.reload_status["state"] == "loading":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A reload is already in progress"
+        )
+    task = asyncio.create_task(
+        service.reload_store(**request.dict())
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_reload_done)
+    await asyncio.sleep(0)
+    return ReloadStatus(**service.reload_status)
+
+
+@admin_router.get(
+    "/reload",
+    status_code=status.HTTP_200_OK,
+    response_model=ReloadStatus
+)
+async def reload_status(
+    service: Service = Depends(get_service)
+) -> ReloadStatus:
+    """
+    Reports the state and version of the loaded index and metadata.
+    """
+    return ReloadStatus(**service.reload_status)
+
+
+@admin_router.get(
+    "/admission",
+    status_code=status.HTTP_200_OK
+)
+async def admission_stats() -> dict:
+    """
+    Reports per-class in-flight, waiting, admitted and shed request counts.
+    """
+    return admission.stats
+
+
+@admin_router.get(
+    "/models",
+    status_code=status.HTTP_200_OK
+)
+async def model_stats(
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Reports the device, memory cost and load state of each registered model.
+    """
+    return {
+        "memory_used": service.models.memory_used,
+        "models": service.models.stats
+    }
+
+
+@admin_router.get(
+    "/imageCache",
+    status_code=status.HTTP_200_OK
+)
+async def image_cache_stats(
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Reports entry counts and hit rates of the searchByImage embedding cache.
+    """
+    cache = service.image_clip_retrieval.embedding_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats}
+
+
+@admin_router.get(
+    "/memory",
+    status_code=status.HTTP_200_OK
+)
+async def memory_report(
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Reports estimated bytes for encoders, indexes, metadata and caches, and the process RSS.
+    """
+    return await service.memory_report()
+
+
+@admin_router.post(
+    "/memory/profile",
+    status_code=status.HTTP_200_OK
+)
+async def memory_profile(
+    request: MemoryProfileRequest,
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Runs sample text requests under tracemalloc and reports the top allocation sites.
+
+    Args:
+        request (MemoryProfileRequest): The sample query and report options.
+        service (Service): The service instance to profile.
+
+    Returns:
+        dict: Net and peak traced bytes and the allocation sites by size growth.
+
+    Raises:
+        HTTPException: If the options are invalid or another profile is running.
+    """
+    if request.group_by not in PROFILE_GROUPS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by must be one of {PROFILE_GROUPS}"
+        )
+    if PROFILE_LOCK.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A memory profile is already running"
+        )
+    if request.model_type not in service.models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Model type not supported"
+        )
+    return await service.profile_text_request(**request.dict())
@@ -4,21 +4,35 @@ This module defines a FastAPI router for handling clip text retrieval requests.
 import copy
 import io
 import time
+from typing import Optional
 from fastapi import (status,
                      Depends,
                      APIRouter,
                      HTTPException,
                      UploadFile,
-                     File)
+                     File,
+                     Query)
 
 from src.api.schemas.clip import (RequestClipText,
                                   ResponseClip,
                                   ListResponseClip,
                                   MultiEventRequest,
-                                  MultiModalResquest)
+                                  MultiModalResquest,
+                                  NeighborRequest,
+                                  RequestClipFrame,
+                                  RequestFeedbackStart,
+                                  RequestFeedback,
+                                  ResponseFeedback,
+                                  DiversifyOptions,
+                                  MAX_CANDIDATE_K)
 from src.services.service import Service
 from src.api.dependencies.dependency import get_service
-from src.utils.utility import count_non_empty_fields
+from src.api.dependencies.admission import admit
+from src.api.middlewares.upload_limit import (MAX_UPLOAD_BYTES,
+                                              UPLOAD_CHUNK_BYTES)
+from src.utils.utility import (count_non_empty_fields,
+                               diversify_arguments,
+                               composition_arguments)
 
 
 clip_router = APIRouter(
@@ -29,6 +43,7 @@ clip_router = APIRouter(
 
 @clip_router.post(
     '/clipTextRetrieval',
+    dependencies=[Depends(admit("text"))],
     status_code=status.HTTP_200_OK,
     response_model=ListResponseClip
 )
@@ -47,18 +62,32 @@ async def clip_text_retrieval(
         ListResponseClipText: A list of text clips relevant to the input query.
 
     Raises:
-        HTTPException: If the input text query is missing or an error occurs during processing.
+        HTTPException: If the input text query is missing, the model type is
+            not supported or an error occurs during processing.
     """
     if not request.text:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Query is required"
         )
+    if request.model_type not in service.models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Model type not supported"
+        )
     try:
         a = time.time()
         result = await service.text_clip_retrieval.text_retrieval(
             model_type=request.model_type,
-            text=request.text
+            text=request.text,
+            candidate_k=request.candidate_k,
+            diversify=diversify_arguments(request.diversify),
+            ensemble=request.ensemble,
+            composition=composition_arguments(request)
+        )
+        result = await service.temporal_retrieval.expand(
+            results=result,
+            window=request.expand_neighbors
         )
         print(time.time() - a)
         return ListResponseClip(
@@ -72,12 +101,60 @@ async def clip_text_retrieval(
             detail=str(e)) from e
 
 
+@clip_router.post(
+    "/neighbors",
+    status_code=status.HTTP_200_OK,
+    response_model=ListResponseClip
+)
+async def neighbors(
+    request: NeighborRequest,
+    service: Service = Depends(get_service)
+) -> ListResponseClip:
+    """
+    Retrieves the keyframes surrounding a frame of a video.
+
+    Args:
+        request (NeighborRequest): The video, frame and number of keyframes per side.
+        service (Service): The service instance to handle the lookup.
+
+    Returns:
+        ListResponseClip: The neighboring keyframes in frame order.
+
+    Raises:
+        HTTPException: If the video is unknown or the frame id is not numeric.
+    """
+    try:
+        result = await service.temporal_retrieval.neighbors(
+            video_id=request.video_id,
+            frame_id=request.frame_id,
+            window=request.window
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown video: {request.video_id}"
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid frame id: {request.frame_id}"
+        ) from e
+    return ListResponseClip(
+        data=[
+            ResponseClip(**record) for record in result
+        ]
+    )
+
+
 @clip_router.post(
     "/searchByImage",
+    dependencies=[Depends(admit("heavy"))],
     status_code=status.HTTP_200_OK,
     response_model=ListResponseClip)
 async def search_by_image(
     model_type: str,
+    candidate_k: Optional[int] = Query(default=None, ge=1, le=MAX_CANDIDATE_K),
+    diversify: DiversifyOptions = Depends(),
     file: UploadFile = File(...),
     service: Service = Depends(get_service)
 ) -> ListResponseClip:
@@ -85,6 +162,9 @@ async def search_by_image(
     Perform a search using an uploaded image.
 
     Args:
+        model_type (str): The model to search with.
+        candidate_k (int, optional): The two-stage candidate pool size.
+        diversify (DiversifyOptions): Near-duplicate collapsing options.
         file (UploadFile): The image file to search with.
         service (Service): The service instance used for performing the search.
 
@@ -92,20 +172,36 @@ async def search_by_image(
         ResponseResult: An object containing the search results.
 
     Raises:
-        HTTPException: If no file is provided or if an error occurs during processing.
+        HTTPException: If no file is provided, the model type is not
+            supported, the upload is too large (413) or an error occurs
+            during processing.
     """
     if not file.file:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Image is required"
         )
+    if model_type not in service.models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Model type not supported"
+        )
+    image_stream = io.BytesIO()
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        if image_stream.tell() + len(chunk) > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"
+            )
+        image_stream.write(chunk)
+    image_stream.seek(0)
     try:
         a = time.time()
-        contents = await file.read()
-        image_stream = io.BytesIO(contents)
         result = await service.image_clip_retrieval.image_retrieval(
             model_type=model_type,
-            image=image_stream
+            image=image_stream,
+            candidate_k=candidate_k,
+            diversify=diversify_arguments(diversify)
         )
         print(time.time() - a)
         return ListResponseClip(
@@ -120,8 +216,178 @@ async def search_by_image(
         ) from e
 
 
+@clip_router.post(
+    "/searchByFrame",
+    dependencies=[Depends(admit("text"))],
+    status_code=status.HTTP_200_OK,
+    response_model=ListResponseClip
+)
+async def search_by_frame(
+    request: RequestClipFrame,
+    service: Service = Depends(get_service)
+) -> ListResponseClip:
+    """
+    Perform a search using the stored vectors of indexed keyframes.
+
+    Args:
+        request (RequestClipFrame): The example frames, by indice or by
+            video_id and frame_id; several examples are averaged.
+        service (Service): The service instance used for performing the search.
+
+    Returns:
+        ListResponseClip: The keyframes most similar to the examples.
+
+    Raises:
+        HTTPException: If no example is given, an example is not indexed
+        or an error occurs during processing.
+    """
+    if not request.indices and not request.frames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one example frame is required"
+        )
+    try:
+        result = await service.example_retrieval.example_retrieval(
+            model_type=request.model_type,
+            indices=request.indices,
+            frames=[frame.dict() for frame in request.frames],
+            candidate_k=request.candidate_k,
+            diversify=diversify_arguments(request.diversify)
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Frame not indexed: {e}"
+        ) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+    return ListResponseClip(
+        data=[
+            ResponseClip(**record) for record in result
+        ]
+    )
+
+
+@clip_router.post(
+    "/feedback",
+    dependencies=[Depends(admit("text"))],
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseFeedback
+)
+async def start_feedback(
+    request: RequestFeedbackStart,
+    service: Service = Depends(get_service)
+) -> ResponseFeedback:
+    """
+    Starts a relevance feedback session with a text query.
+
+    Args:
+        request (RequestFeedbackStart): The text query and model type.
+        service (Service): The service instance to handle the retrieval.
+
+    Returns:
+        ResponseFeedback: The session id and the first results.
+
+    Raises:
+        HTTPException: If the query is missing or an error occurs during processing.
+    """
+    if not request.text:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query is required"
+        )
+    try:
+        session_id, result = await service.feedback_retrieval.start_session(
+            model_type=request.model_type,
+            text=request.text
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+    return ResponseFeedback(
+        session_id=session_id,
+        data=[
+            ResponseClip(**record) for record in result
+        ]
+    )
+
+
+@clip_router.post(
+    "/feedback/{session_id}",
+    dependencies=[Depends(admit("text"))],
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseFeedback
+)
+async def give_feedback(
+    session_id: str,
+    request: RequestFeedback,
+    service: Service = Depends(get_service)
+) -> ResponseFeedback:
+    """
+    Refines a feedback session with relevant and non-relevant frames.
+
+    Args:
+        session_id (str): The session to refine.
+        request (RequestFeedback): The marked frames and Rocchio weights.
+        service (Service): The service instance to handle the retrieval.
+
+    Returns:
+        ResponseFeedback: The session id and the refined results.
+
+    Raises:
+        HTTPException: If the session or a frame is unknown, or an error occurs.
+    """
+    try:
+        result = await service.feedback_retrieval.give_feedback(
+            session_id=session_id,
+            positive=request.positive,
+            negative=request.negative,
+            positive_frames=[frame.dict() for frame in request.positive_frames],
+            negative_frames=[frame.dict() for frame in request.negative_frames],
+            alpha=request.alpha,
+            beta=request.beta,
+            gamma=request.gamma
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown session or frame: {e}"
+        ) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        ) from e
+    return ResponseFeedback(
+        session_id=session_id,
+        data=[
+            ResponseClip(**record) for record in result
+        ]
+    )
+
+
+@clip_router.delete(
+    "/feedback/{session_id}",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def close_feedback(
+    session_id: str,
+    service: Service = Depends(get_service)
+) -> None:
+    """
+    Discards a relevance feedback session.
+    """
+    await service.feedback_retrieval.close_session(session_id=session_id)
+
+
 @clip_router.post(
     "/multiEventSearch",
+    dependencies=[Depends(admit("heavy"))],
     status_code=status.HTTP_200_OK,
     response_model=ListResponseClip
 )
@@ -136,11 +402,19 @@ async def multi_event_search(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="List of events is required"
         )
+    if request.model_type not in service.models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Model type not supported"
+        )
     try:
         a = time.time()
         result = await service.multi_event_retrieval.multi_event_search(
             model_type=request.model_type,
-            list_event=request.list_event
+            list_event=request.list_event,
+            top_videos=request.top_videos,
+            max_gap=request.max_gap,
+            top_chains=request.top_chains
         )
         print(time.time() - a)
         return ListResponseClip(
@@ -156,6 +430,7 @@ async def multi_event_search(
 
 @clip_router.post(
     "/multiModalSearch",
+    dependencies=[Depends(admit("heavy"))],
     status_code=status.HTTP_200_OK,
     response_model=ListResponseClip
 )
@@ -176,23 +451,17 @@ async def multi_modal_search(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="at least 2 in 3 fields are required"
         )
+    if request.text and request.model_type not in service.models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Model type not supported"
+        )
 
     try:
-        list_ocr = [
-            dict(
-                obj, frame_id=f"{obj['frame_id']}.jpg"
-            ) for obj in request.list_ocr
-        ]
-        list_asr = [
-            dict(
-                obj, frame_id=f"{obj['frame_id']}.jpg"
-            ) for obj in request.list_asr
-        ]
-
         if not request.text:
             result = await service.multi_event_retrieval.multi_event_search_with_non_text(
-                list_ocr=list_ocr,
-                list_asr=list_asr,
+                list_ocr=request.list_ocr,
+                list_asr=request.list_asr,
                 priority=request.priority
             )
             return ListResponseClip(
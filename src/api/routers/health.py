@@ -0,0 +1,55 @@
+"""
+This module defines a FastAPI router for liveness and readiness probes.
+"""
+from fastapi import (status,
+                     Depends,
+                     APIRouter,
+                     HTTPException)
+
+from src.services.service import Service
+from src.api.dependencies.dependency import get_service
+
+
+health_router = APIRouter(
+    tags=["Health"],
+    prefix="/health"
+)
+
+
+@health_router.get(
+    "/live",
+    status_code=status.HTTP_200_OK
+)
+async def live() -> dict:
+    """
+    Reports that the process is serving requests.
+    """
+    return {"status": "ok"}
+
+
+@health_router.get(
+    "/ready",
+    status_code=status.HTTP_200_OK
+)
+async def ready(
+    service: Service = Depends(get_service)
+) -> dict:
+    """
+    Reports whether encoder warm-up has finished.
+
+    Args:
+        service (Service): The service instance being warmed up.
+
+    Returns:
+        dict: The warm-up state and timings.
+
+    Raises:
+        HTTPException: 503 until warm-up has finished.
+    """
+    readiness = service.readiness
+    if not readiness["ready"]:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=readiness
+        )
+    return readiness
@@ -0,0 +1,42 @@
+"""
+Schemas for the admin API.
+"""
+
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class ReloadRequest(BaseModel):
+    """
+    Request schema for reloading the index and metadata.
+    Fields left empty keep their current value.
+    """
+    json_clip: Optional[str] = None
+    apple_faiss_url: Optional[str] = None
+    laion_faiss_url: Optional[str] = None
+    apple_rerank_url: Optional[str] = None
+    laion_rerank_url: Optional[str] = None
+    apple_shard_dir: Optional[str] = None
+    laion_shard_dir: Optional[str] = None
+
+
+class ReloadStatus(BaseModel):
+    """
+    Response schema for the state of the loaded index and metadata.
+    """
+    state: str
+    version: int
+    loaded_at: float
+    error: Optional[str] = None
+
+
+class MemoryProfileRequest(BaseModel):
+    """
+    Request schema for profiling the allocations of sample text requests.
+    group_by is "lineno", "filename" or "traceback".
+    """
+    model_type: str = "apple_clip"
+    text: str
+    repeat: int = Field(default=1, ge=1, le=100)
+    group_by: str = "lineno"
+    top: int = Field(default=20, ge=1, le=200)
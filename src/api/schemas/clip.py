@@ -2,19 +2,109 @@
 Schemas for clip text retrieval API.
 """
 
+import os
 from typing import (List,
-                    Dict)
-from pydantic import BaseModel
+                    Dict,
+                    Literal,
+                    Optional)
+from pydantic import (BaseModel,
+                      Field)
+
+from src.utils.utility import convert_value
+
+MAX_CANDIDATE_K = convert_value(os.getenv("MAX_CANDIDATE_K", "10000"))
+MAX_NEIGHBOR_WINDOW = convert_value(os.getenv("MAX_NEIGHBOR_WINDOW", "50"))
+MAX_TOP_VIDEOS = convert_value(os.getenv("MAX_TOP_VIDEOS", "1000"))
+MAX_PHRASES = convert_value(os.getenv("MAX_PHRASES", "16"))
+
+
+class DiversifyOptions(BaseModel):
+    """
+    Options for collapsing near-duplicate keyframes in result lists.
+    mode is "collapse" or "mmr"; leaving it empty disables diversification.
+    """
+    mode: Optional[Literal["collapse", "mmr"]] = None
+    frame_window: int = 0
+    similarity_threshold: Optional[float] = None
+    mmr_lambda: float = 0.7
+    mmr_top: int = 300
+
+
+class WeightedPhrase(BaseModel):
+    """
+    A phrase and its weight in a compositional text query.
+    """
+    text: str
+    weight: float = 1.0
 
 
 class RequestClipText(BaseModel):
     """
     Request schema for clip text retrieval.
+    positives are added to the query with their weights; negatives are
+    subtracted from the query vector (negative_mode "vector") or from the
+    candidate scores after the search (negative_mode "rerank").
+    """
+    model_type: str
+    text: str
+    candidate_k: Optional[int] = Field(default=None, ge=1, le=MAX_CANDIDATE_K)
+    expand_neighbors: int = Field(default=0, ge=0, le=MAX_NEIGHBOR_WINDOW)
+    diversify: Optional[DiversifyOptions] = None
+    ensemble: bool = False
+    positives: List[WeightedPhrase] = Field(default=[], max_items=MAX_PHRASES)
+    negatives: List[WeightedPhrase] = Field(default=[], max_items=MAX_PHRASES)
+    negative_mode: Literal["vector", "rerank"] = "vector"
+
+
+class NeighborRequest(BaseModel):
+    """
+    Request schema for the keyframes around a frame of a video.
+    """
+    video_id: str
+    frame_id: str
+    window: int = Field(default=10, ge=0, le=MAX_NEIGHBOR_WINDOW)
+
+
+class FrameReference(BaseModel):
+    """
+    A keyframe identified by its video and frame id.
+    """
+    video_id: str
+    frame_id: str
+
+
+class RequestClipFrame(BaseModel):
+    """
+    Request schema for searching with indexed keyframes as examples.
+    """
+    model_type: str
+    indices: List[int] = []
+    frames: List[FrameReference] = []
+    candidate_k: Optional[int] = Field(default=None, ge=1, le=MAX_CANDIDATE_K)
+    diversify: Optional[DiversifyOptions] = None
+
+
+class RequestFeedbackStart(BaseModel):
+    """
+    Request schema for starting a relevance feedback session.
     """
     model_type: str
     text: str
 
 
+class RequestFeedback(BaseModel):
+    """
+    Request schema for refining a feedback session with marked frames.
+    """
+    positive: List[int] = []
+    negative: List[int] = []
+    positive_frames: List[FrameReference] = []
+    negative_frames: List[FrameReference] = []
+    alpha: float = 1.0
+    beta: float = 0.75
+    gamma: float = 0.15
+
+
 class ResponseClip(BaseModel):
     """
     Response schema for individual text clip.
@@ -31,9 +121,15 @@ class ListResponseClip(BaseModel):
 
 class MultiEventRequest(BaseModel):
     """
+    Request schema for ordered multi-event search.
+    max_gap bounds the frame distance between consecutive events and
+    top_chains the number of ranked chains returned.
     """
     model_type: str
     list_event: List[str]
+    top_videos: Optional[int] = Field(default=None, ge=1, le=MAX_TOP_VIDEOS)
+    max_gap: Optional[int] = Field(default=None, ge=0)
+    top_chains: Optional[int] = Field(default=None, ge=1)
 
 class MultiModalResquest(BaseModel):
     """
@@ -43,3 +139,10 @@ class MultiModalResquest(BaseModel):
     list_ocr: List[Dict]
     list_asr: List[Dict]
     priority: List[str]
+
+class ResponseFeedback(BaseModel):
+    """
+    Response schema for a relevance feedback step.
+    """
+    session_id: str
+    data: List[ResponseClip]
@@ -0,0 +1,402 @@
+"""
+Client side of the inference worker protocol.
+
+``InferenceClient`` multiplexes concurrent requests over one Unix socket
+connection. ``RemoteEncoder`` and ``RemoteFaiss`` expose the parts of
+``AppleCLIP``/``LaionCLIP`` and ``ClipFaiss`` the retrieval services use, so
+the services run unchanged against a worker process.
+"""
+
+import asyncio
+import itertools
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from src.inference.protocol import (OP_ENCODE_TEXT,
+                                    OP_ENCODE_IMAGE,
+                                    OP_SEARCH,
+                                    OP_TEXT_SEARCH,
+                                    OP_RECONSTRUCT,
+                                    STATUS_OK,
+                                    InferenceError,
+                                    pack_request,
+                                    read_response,
+                                    unpack_search,
+                                    unpack_vectors)
+
+
+class InferenceClient:
+    """
+    A pipelined connection to the inference worker.
+    """
+
+    def __init__(
+        self,
+        socket_path: str
+    ) -> None:
+        """
+        Initializes the client; the connection is opened on first use.
+
+        Args:
+            socket_path (str): The worker's Unix socket.
+        """
+        self._socket_path = socket_path
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Union[asyncio.StreamWriter, None] = None
+        self._reader_task: Union[asyncio.Task, None] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await asyncio.open_unix_connection(self._socket_path)
+                self._reader_task = asyncio.create_task(self._read_loop(reader))
+        return self._writer
+
+    async def _read_loop(
+        self,
+        reader: asyncio.StreamReader
+    ) -> None:
+        """
+        Routes responses to their waiting requests until the connection drops.
+        """
+        try:
+            while True:
+                request_id, status, rows, cols, payload = await read_response(reader)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == STATUS_OK:
+                    future.set_result((rows, cols, payload))
+                else:
+                    future.set_exception(InferenceError(payload.decode("utf-8")))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = InferenceError(f"Inference worker connection lost: {e}")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self._writer is not None:
+                self._writer.close()
+
+    async def request(
+        self,
+        op: int,
+        model_type: str,
+        payload: bytes = b"",
+        rows: int = 0,
+        top_k: int = 0,
+        candidate_k: Union[int, None] = None
+    ) -> Tuple[int, int, bytes]:
+        """
+        Sends one request and waits for its response.
+
+        Returns:
+            Tuple[int, int, bytes]: The response rows, cols and payload.
+
+        Raises:
+            InferenceError: If the worker fails the request or the connection drops.
+        """
+        request_id = next(self._ids) & 0xFFFFFFFF
+        frame = pack_request(
+            request_id=request_id,
+            op=op,
+            model_type=model_type,
+            payload=payload,
+            rows=rows,
+            top_k=top_k,
+            candidate_k=candidate_k or 0
+        )
+        writer = await self._connect()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            writer.write(frame)
+            await writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def encode_text(
+        self,
+        model_type: str,
+        text: str
+    ) -> np.ndarray:
+        """
+        Encodes a text into a (1, d) float32 array.
+        """
+        rows, cols, payload = await self.request(
+            OP_ENCODE_TEXT, model_type, text.encode("utf-8")
+        )
+        return unpack_vectors(payload, rows, cols)
+
+    async def encode_image(
+        self,
+        model_type: str,
+        image: bytes
+    ) -> np.ndarray:
+        """
+        Encodes an encoded image file into a (1, d) float32 array.
+        """
+        rows, cols, payload = await self.request(OP_ENCODE_IMAGE, model_type, image)
+        return unpack_vectors(payload, rows, cols)
+
+    async def search(
+        self,
+        model_type: str,
+        query_vectors: np.ndarray,
+        top_k: int,
+        candidate_k: Union[int, None] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the worker's index with float32 query vectors.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        rows, cols, payload = await self.request(
+            OP_SEARCH,
+            model_type,
+            query_vectors.tobytes(),
+            rows=len(query_vectors),
+            top_k=top_k,
+            candidate_k=candidate_k
+        )
+        return unpack_search(payload, rows, cols)
+
+    async def text_search(
+        self,
+        model_type: str,
+        text: str,
+        top_k: int,
+        candidate_k: Union[int, None] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encodes a text and searches with it in a single round trip.
+        """
+        rows, cols, payload = await self.request(
+            OP_TEXT_SEARCH,
+            model_type,
+            text.encode("utf-8"),
+            rows=1,
+            top_k=top_k,
+            candidate_k=candidate_k
+        )
+        return unpack_search(payload, rows, cols)
+
+    async def reconstruct(
+        self,
+        model_type: str,
+        indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Fetches the stored vectors of the given indices.
+        """
+        indices = np.ascontiguousarray(indices, dtype=np.int64)
+        rows, cols, payload = await self.request(
+            OP_RECONSTRUCT, model_type, indices.tobytes(), rows=len(indices)
+        )
+        return unpack_vectors(payload, rows, cols)
+
+
+class RemoteEncoder:
+    """
+    Stands in for ``AppleCLIP``/``LaionCLIP`` by encoding in the worker.
+    """
+
+    def __init__(
+        self,
+        client: InferenceClient,
+        model_type: str
+    ) -> None:
+        """
+        Initializes the encoder proxy.
+
+        Args:
+            client (InferenceClient): The worker connection.
+            model_type (str): The worker model to encode with.
+        """
+        self._client = client
+        self._model_type = model_type
+
+    @property
+    def parameter_bytes(self) -> int:
+        """
+        Returns 0: the model's parameters live in the worker process.
+        """
+        return 0
+
+    async def text_embedding(
+        self,
+        text: str
+    ) -> Tensor:
+        """
+        Generate a text embedding in the worker.
+        """
+        # copied: frombuffer views of the response are read-only
+        return torch.from_numpy(
+            (await self._client.encode_text(self._model_type, text)).copy()
+        )
+
+    async def text_embedding_batch(
+        self,
+        texts: List[str]
+    ) -> Tensor:
+        """
+        Generate text embeddings in the worker; concurrent requests are
+        batched there into one forward pass.
+        """
+        vectors = await asyncio.gather(
+            *(self._client.encode_text(self._model_type, text) for text in texts)
+        )
+        return torch.from_numpy(np.concatenate(vectors))
+
+    async def image_embedding(
+        self,
+        image
+    ) -> Tensor:
+        """
+        Generate an image embedding in the worker from the undecoded file.
+
+        Args:
+            image: A path or binary file-like object.
+        """
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                image = f.read()
+        else:
+            image = image.read()
+        return torch.from_numpy(
+            (await self._client.encode_image(self._model_type, image)).copy()
+        )
+
+    async def image_embedding_files(
+        self,
+        images: List
+    ) -> Tensor:
+        """
+        Generate embeddings for several undecoded image files in the worker;
+        concurrent requests are batched there into one forward pass.
+
+        Args:
+            images (List): Paths or binary file-like objects.
+
+        Returns:
+            Tensor: The normalized image embeddings, one row per image.
+        """
+        vectors = await asyncio.gather(*(self.image_embedding(image) for image in images))
+        return torch.cat(vectors)
+
+    async def image_embedding_batch(
+        self,
+        images: Tensor  # pylint: disable=unused-argument
+    ) -> Tensor:
+        """
+        Not available remotely: the worker decodes and preprocesses images
+        itself, so send files with image_embedding_files instead.
+
+        Raises:
+            NotImplementedError: Always.
+        """
+        raise NotImplementedError(
+            "Preprocessed image batches cannot be sent to the inference worker; "
+            "use image_embedding_files"
+        )
+
+
+class RemoteFaiss:
+    """
+    Stands in for ``ClipFaiss`` by searching in the worker.
+
+    Coarse-to-fine video search is not offered remotely, so multi-event
+    requests fall back to the full search.
+    """
+
+    def __init__(
+        self,
+        client: InferenceClient
+    ) -> None:
+        """
+        Initializes the index proxy.
+
+        Args:
+            client (InferenceClient): The worker connection.
+        """
+        self._client = client
+
+    @staticmethod
+    def _to_numpy(
+        query_vectors: Union[Tensor, np.ndarray]
+    ) -> np.ndarray:
+        if isinstance(query_vectors, Tensor):
+            query_vectors = query_vectors.detach().float().cpu().numpy()
+        return np.ascontiguousarray(query_vectors, dtype=np.float32)
+
+    def has_video_index(
+        self,
+        model_type: str  # pylint: disable=unused-argument
+    ) -> bool:
+        """
+        Tells whether coarse-to-fine search is available for a model.
+        """
+        return False
+
+    @property
+    def memory_stats(self) -> Dict[str, Dict]:
+        """
+        Returns no indexes: they are held by the worker process.
+        """
+        return {}
+
+    async def search(
+        self,
+        model_type: str,
+        top_k: int,
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the worker's index of the given model.
+        """
+        return await self._client.search(
+            model_type=model_type,
+            query_vectors=self._to_numpy(query_vectors),
+            top_k=top_k,
+            candidate_k=candidate_k
+        )
+
+    async def reconstruct(
+        self,
+        model_type: str,
+        indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the stored vectors of the given indices.
+        """
+        return await self._client.reconstruct(model_type=model_type, indices=indices)
+
+    async def apple_search(
+        self,
+        top_k: int,
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
+    ) -> List[int]:
+        """
+        Searches the worker's Apple index, returning indices only.
+        """
+        _, indices = await self.search("apple_clip", top_k, query_vectors, candidate_k)
+        return indices
+
+    async def laion_search(
+        self,
+        top_k: int,
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
+    ) -> List[int]:
+        """
+        Searches the worker's LAION index, returning indices only.
+        """
+        _, indices = await self.search("laion_clip", top_k, query_vectors, candidate_k)
+        return indices
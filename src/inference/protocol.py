@@ -0,0 +1,188 @@
+"""
+Binary framing between API processes and the inference worker.
+
+Every message is a fixed little-endian header followed by a raw payload; no
+JSON is involved. Vectors travel as row-major float32 and indices as int64,
+so both ends read them with ``np.frombuffer`` without copying.
+
+Request header (``REQUEST_HEADER``):
+    request_id u32, op u8, model_len u8, rows u32, top_k u32, candidate_k u32,
+    payload_len u32
+
+followed by the utf-8 model type (``model_len`` bytes) and the payload, so
+any model registered in the worker can be addressed by name.
+
+Response header (``RESPONSE_HEADER``):
+    request_id u32, status u8, rows u32, cols u32, payload_len u32
+
+Payloads per op:
+    OP_ENCODE_TEXT   request utf-8 text, response float32 (1, d)
+    OP_ENCODE_IMAGE  request encoded image bytes, response float32 (1, d)
+    OP_SEARCH        request float32 (n, d), response float32 scores (n, k)
+                     followed by int64 indices (n, k)
+    OP_TEXT_SEARCH   request utf-8 text, response as OP_SEARCH
+    OP_RECONSTRUCT   request int64 indices, response float32 (n, d)
+
+A response with STATUS_ERROR carries a utf-8 error message.
+"""
+
+import asyncio
+import struct
+from typing import Tuple
+
+import numpy as np
+
+REQUEST_HEADER = struct.Struct("<IBBIIII")
+RESPONSE_HEADER = struct.Struct("<IBIII")
+
+OP_ENCODE_TEXT = 1
+OP_ENCODE_IMAGE = 2
+OP_SEARCH = 3
+OP_TEXT_SEARCH = 4
+OP_RECONSTRUCT = 5
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+MAX_MODEL_NAME = 255
+
+
+class InferenceError(RuntimeError):
+    """
+    Raised on the client when the worker reports a failed request.
+    """
+
+
+def pack_request(
+    request_id: int,
+    op: int,
+    model_type: str,
+    payload: bytes = b"",
+    rows: int = 0,
+    top_k: int = 0,
+    candidate_k: int = 0
+) -> bytes:
+    """
+    Builds a request frame.
+
+    Args:
+        request_id (int): The id echoed back in the response.
+        op (int): One of the OP_* constants.
+        model_type (str): The model type, at most MAX_MODEL_NAME utf-8 bytes.
+        payload (bytes): The op payload.
+        rows (int): The number of vectors or indices in the payload.
+        top_k (int): The number of results, for search ops.
+        candidate_k (int): The two-stage candidate pool, 0 for the default.
+
+    Returns:
+        bytes: The frame.
+
+    Raises:
+        ValueError: If the model type is empty or too long.
+    """
+    model = model_type.encode("utf-8")
+    if not model or len(model) > MAX_MODEL_NAME:
+        raise ValueError(f"Model type not supported: {model_type}")
+    header = REQUEST_HEADER.pack(
+        request_id, op, len(model), rows, top_k, candidate_k, len(payload)
+    )
+    return header + model + payload
+
+
+def pack_response(
+    request_id: int,
+    rows: int,
+    cols: int,
+    *arrays: np.ndarray
+) -> bytes:
+    """
+    Builds a successful response frame from one or more arrays.
+
+    Args:
+        request_id (int): The id of the request being answered.
+        rows (int): The number of result rows.
+        cols (int): The number of columns of each array.
+        *arrays (np.ndarray): The arrays, concatenated in order.
+
+    Returns:
+        bytes: The frame.
+    """
+    payload = b"".join(np.ascontiguousarray(array).tobytes() for array in arrays)
+    return RESPONSE_HEADER.pack(request_id, STATUS_OK, rows, cols, len(payload)) + payload
+
+
+def pack_error(
+    request_id: int,
+    message: str
+) -> bytes:
+    """
+    Builds an error response frame.
+    """
+    payload = message.encode("utf-8")
+    return RESPONSE_HEADER.pack(request_id, STATUS_ERROR, 0, 0, len(payload)) + payload
+
+
+async def read_request(
+    reader: asyncio.StreamReader
+) -> Tuple[int, int, str, int, int, int, bytes]:
+    """
+    Reads one request frame.
+
+    Returns:
+        Tuple[int, int, str, int, int, int, bytes]: The request id, op, model
+        type, rows, top_k, candidate_k and payload.
+
+    Raises:
+        asyncio.IncompleteReadError: When the peer closes the connection.
+    """
+    header = await reader.readexactly(REQUEST_HEADER.size)
+    request_id, op, model_len, rows, top_k, candidate_k, length = REQUEST_HEADER.unpack(header)
+    model = await reader.readexactly(model_len) if model_len else b""
+    payload = await reader.readexactly(length) if length else b""
+    return (
+        request_id, op, model.decode("utf-8", errors="replace"),
+        rows, top_k, candidate_k, payload
+    )
+
+
+async def read_response(
+    reader: asyncio.StreamReader
+) -> Tuple[int, int, int, int, bytes]:
+    """
+    Reads one response frame.
+
+    Returns:
+        Tuple[int, int, int, int, bytes]: The request id, status, rows, cols
+        and payload.
+    """
+    header = await reader.readexactly(RESPONSE_HEADER.size)
+    request_id, status, rows, cols, length = RESPONSE_HEADER.unpack(header)
+    payload = await reader.readexactly(length) if length else b""
+    return request_id, status, rows, cols, payload
+
+
+def unpack_vectors(
+    payload: bytes,
+    rows: int,
+    cols: int
+) -> np.ndarray:
+    """
+    Views a float32 payload as a (rows, cols) array.
+    """
+    return np.frombuffer(payload, dtype=np.float32).reshape(rows, cols)
+
+
+def unpack_search(
+    payload: bytes,
+    rows: int,
+    cols: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits a search payload into its scores and indices arrays.
+    """
+    count = rows * cols
+    scores = np.frombuffer(payload, dtype=np.float32, count=count).reshape(rows, cols)
+    indices = np.frombuffer(
+        payload, dtype=np.int64, count=count, offset=count * 4
+    ).reshape(rows, cols)
+    return scores, indices
@@ -0,0 +1,428 @@
+"""
+Dedicated inference worker serving CLIP encoding and FAISS search over a
+Unix socket.
+
+API processes then only parse HTTP and map results, so request handling no
+longer competes with the encoders for the GIL. Requests arriving within a
+short window are batched per (op, model): texts and images go through one
+encoder forward, query vectors through one FAISS search.
+
+Example:
+    python -m src.inference.worker --socket /tmp/hermes-inference.sock
+"""
+
+import argparse
+import asyncio
+import os
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import torch
+
+from src.inference.protocol import (OP_ENCODE_TEXT,
+                                    OP_ENCODE_IMAGE,
+                                    OP_SEARCH,
+                                    OP_TEXT_SEARCH,
+                                    OP_RECONSTRUCT,
+                                    pack_error,
+                                    pack_response,
+                                    read_request)
+from src.modules.apple_clip import AppleCLIP
+from src.modules.laion_clip import LaionCLIP
+from src.modules.model_registry import open_clip_loader
+from src.repositories.load_faiss import ClipFaiss
+from src.utils.image_decode import preprocess_async
+from src.services import service as config
+
+
+class Batcher:
+    """
+    Collects submitted items into batches and runs them through one handler call.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = 32,
+        max_wait: float = 0.002
+    ) -> None:
+        """
+        Initializes the batcher.
+
+        Args:
+            handler: An async function mapping a list of items to a list of
+                results; an exception in the list fails only its own item.
+            max_batch (int): The largest batch handed to the handler.
+            max_wait (float): Seconds to wait for more items after the first.
+        """
+        self._handler = handler
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Union[asyncio.Task, None] = None
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queues an item and waits for its result.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """
+        Waits for one item, then gathers more until the batch is full or max_wait passes.
+        """
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_wait
+        while len(batch) < self._max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                results = await self._handler([item for item, _ in batch])
+            except Exception as e:  # pylint: disable=broad-except
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class InferenceWorker:
+    """
+    Owns the encoders and indexes and answers framed requests.
+    """
+
+    def __init__(
+        self,
+        encoders: Dict[str, Union[AppleCLIP, LaionCLIP]],
+        faiss: ClipFaiss,
+        max_batch: int = 32,
+        max_wait: float = 0.002
+    ) -> None:
+        """
+        Initializes the worker.
+
+        Args:
+            encoders (Dict[str, Union[AppleCLIP, LaionCLIP]]): Encoders by model type.
+            faiss (ClipFaiss): The index wrapper.
+            max_batch (int): The largest batch per encoder forward or search.
+            max_wait (float): Seconds a batch waits to fill up.
+        """
+        self._encoders = encoders
+        self._faiss = faiss
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self._batchers: Dict[Tuple[int, str], Batcher] = {}
+
+    def _batcher(
+        self,
+        op: int,
+        model_type: str
+    ) -> Batcher:
+        key = (op, model_type)
+        if key not in self._batchers:
+            handlers = {
+                OP_ENCODE_TEXT: self._encode_texts,
+                OP_ENCODE_IMAGE: self._encode_images,
+                OP_SEARCH: self._search,
+                OP_TEXT_SEARCH: self._text_search
+            }
+            handler = handlers[op]
+            self._batchers[key] = Batcher(
+                handler=lambda items: handler(model_type, items),
+                max_batch=self._max_batch,
+                max_wait=self._max_wait
+            )
+        return self._batchers[key]
+
+    def _encoder(
+        self,
+        model_type: str
+    ) -> Union[AppleCLIP, LaionCLIP]:
+        if model_type not in self._encoders:
+            raise ValueError(f"Model type not supported: {model_type}")
+        return self._encoders[model_type]
+
+    async def _embed_texts(
+        self,
+        model_type: str,
+        texts: List[str]
+    ) -> np.ndarray:
+        vectors = await self._encoder(model_type).text_embedding_batch(texts)
+        return np.ascontiguousarray(vectors.float().cpu().numpy())
+
+    async def _encode_texts(
+        self,
+        model_type: str,
+        texts: List[str]
+    ) -> List[np.ndarray]:
+        vectors = await self._embed_texts(model_type, texts)
+        return [vectors[row:row + 1] for row in range(len(texts))]
+
+    async def _encode_images(
+        self,
+        model_type: str,
+        blobs: List[bytes]
+    ) -> List[np.ndarray]:
+        encoder = self._encoder(model_type)
+
+        images = await asyncio.gather(
+            *(
+                preprocess_async(encoder.processor, BytesIO(blob), encoder.image_size)
+                for blob in blobs
+            ),
+            return_exceptions=True
+        )
+        decoded = [image for image in images if not isinstance(image, Exception)]
+        if not decoded:
+            return images
+        vectors = await encoder.image_embedding_batch(torch.stack(decoded))
+        vectors = iter(np.ascontiguousarray(vectors.float().cpu().numpy()))
+        return [
+            image if isinstance(image, Exception) else next(vectors)[None]
+            for image in images
+        ]
+
+    async def _search_vectors(
+        self,
+        model_type: str,
+        vectors: List[np.ndarray],
+        top_ks: List[int],
+        candidate_ks: List[int]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Runs one search per candidate pool size for the queries of a batch.
+
+        Requests with the same candidate_k are searched together with their
+        largest top_k and each gets its own leading top_k columns, so a
+        request's results do not depend on what else was in its batch.
+        """
+        groups: Dict[int, List[int]] = {}
+        for position, candidate_k in enumerate(candidate_ks):
+            groups.setdefault(candidate_k, []).append(position)
+        results: List[Tuple[np.ndarray, np.ndarray]] = [None] * len(vectors)
+        for candidate_k, positions in groups.items():
+            scores, indices = await self._faiss.search(
+                model_type=model_type,
+                top_k=max(top_ks[position] for position in positions),
+                query_vectors=torch.from_numpy(
+                    np.concatenate([vectors[position] for position in positions])
+                ),
+                candidate_k=candidate_k or None
+            )
+            start = 0
+            for position in positions:
+                stop = start + len(vectors[position])
+                top_k = top_ks[position]
+                results[position] = (scores[start:stop, :top_k], indices[start:stop, :top_k])
+                start = stop
+        return results
+
+    async def _search(
+        self,
+        model_type: str,
+        items: List[Tuple[np.ndarray, int, int]]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        vectors, top_ks, candidate_ks = zip(*items)
+        return await self._search_vectors(model_type, list(vectors), top_ks, candidate_ks)
+
+    async def _text_search(
+        self,
+        model_type: str,
+        items: List[Tuple[str, int, int]]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        texts, top_ks, candidate_ks = zip(*items)
+        vectors = await self._embed_texts(model_type, list(texts))
+        return await self._search_vectors(
+            model_type,
+            [vectors[row:row + 1] for row in range(len(texts))],
+            top_ks,
+            candidate_ks
+        )
+
+    async def handle(
+        self,
+        request_id: int,
+        op: int,
+        model_type: str,
+        rows: int,
+        top_k: int,
+        candidate_k: int,
+        payload: bytes
+    ) -> bytes:
+        """
+        Answers one request.
+
+        Returns:
+            bytes: The response frame.
+        """
+        if op == OP_ENCODE_TEXT:
+            vectors = await self._batcher(op, model_type).submit(payload.decode("utf-8"))
+            return pack_response(request_id, *vectors.shape, vectors)
+        if op == OP_ENCODE_IMAGE:
+            vectors = await self._batcher(op, model_type).submit(payload)
+            return pack_response(request_id, *vectors.shape, vectors)
+        if op == OP_SEARCH:
+            vectors = np.frombuffer(payload, dtype=np.float32).reshape(rows, -1)
+            scores, indices = await self._batcher(op, model_type).submit(
+                (vectors, top_k, candidate_k)
+            )
+            return pack_response(request_id, *scores.shape, scores, indices)
+        if op == OP_TEXT_SEARCH:
+            scores, indices = await self._batcher(op, model_type).submit(
+                (payload.decode("utf-8"), top_k, candidate_k)
+            )
+            return pack_response(request_id, *scores.shape, scores, indices)
+        if op == OP_RECONSTRUCT:
+            vectors = await self._faiss.reconstruct(
+                model_type=model_type,
+                indices=np.frombuffer(payload, dtype=np.int64)
+            )
+            return pack_response(request_id, *vectors.shape, vectors.astype(np.float32))
+        raise ValueError(f"Unknown op: {op}")
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Tuple
+    ) -> None:
+        try:
+            frame = await self.handle(*request)
+        except Exception as e:  # pylint: disable=broad-except
+            frame = pack_error(request[0], str(e))
+        writer.write(frame)
+        await writer.drain()
+
+    async def serve_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Reads requests from one client; they are answered concurrently so
+        requests pipelined on the connection can share batches.
+        """
+        tasks = set()
+        try:
+            while True:
+                request = await read_request(reader)
+                task = asyncio.create_task(self._respond(writer, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(
+        self,
+        socket_path: str
+    ) -> None:
+        """
+        Listens on a Unix socket until cancelled.
+        """
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(self.serve_connection, path=socket_path)
+        async with server:
+            await server.serve_forever()
+
+
+def load_encoders(
+    device: torch.device
+) -> Dict[str, Union[AppleCLIP, LaionCLIP]]:
+    """
+    Loads both CLIP models the way the API service does, warm-up included.
+
+    Args:
+        device (torch.device): The device to run the encoders on.
+
+    Returns:
+        Dict[str, Union[AppleCLIP, LaionCLIP]]: Encoders by model type.
+    """
+    optimize = {
+        "inference_mode": config.ENCODER_INFERENCE_MODE,
+        "compile_mode": config.ENCODER_COMPILE or None,
+        "channels_last": config.ENCODER_CHANNELS_LAST
+    }
+    return {
+        "apple_clip": open_clip_loader(
+            AppleCLIP, config.APPLE_CLIP_MODEL, config.APPLE_CLIP_TOKENIZER,
+            optimize, config.ENCODER_WARMUP
+        )(device),
+        "laion_clip": open_clip_loader(
+            LaionCLIP, config.LAION_CLIP_MODEL, config.LAION_CLIP_TOKENIZER,
+            optimize, config.ENCODER_WARMUP
+        )(device)
+    }
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--socket", default=config.INFERENCE_SOCKET or "/tmp/hermes-inference.sock")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    device = torch.device(
+        config.CLIP_DEVICE or ("cuda" if torch.cuda.is_available() else "cpu")
+    )
+    faiss = ClipFaiss(
+        apple_faiss_url=config.APPLE_FAISS,
+        laion_faiss_url=config.LAION_FAISS,
+        apple_rerank_url=config.APPLE_RERANK,
+        laion_rerank_url=config.LAION_RERANK,
+        apple_candidate_k=config.APPLE_CANDIDATE_K,
+        laion_candidate_k=config.LAION_CANDIDATE_K,
+        apple_shard_dir=config.APPLE_SHARD_DIR,
+        laion_shard_dir=config.LAION_SHARD_DIR,
+        apple_video_index_url=config.APPLE_VIDEO_INDEX,
+        laion_video_index_url=config.LAION_VIDEO_INDEX,
+        apple_gpu_device=config.APPLE_FAISS_GPU,
+        mmap=config.FAISS_MMAP
+    )
+    encoders = load_encoders(device)
+    if config.ENCODER_WARMUP:
+        for model_type, encoder in encoders.items():
+            print(f"warm-up {model_type}: {encoder.warmup_timings}")
+    worker = InferenceWorker(
+        encoders=encoders,
+        faiss=faiss,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000
+    )
+    print(f"inference worker listening on {args.socket}")
+    asyncio.run(worker.serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
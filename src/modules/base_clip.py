@@ -0,0 +1,265 @@
+"""
+This module provides the shared base for CLIP model-based text and image embedding.
+
+Encoders run eagerly under ``torch.no_grad`` by default. ``BaseCLIP.optimize``
+switches to ``torch.inference_mode``, channels-last image layout and/or
+``torch.compile``d encode functions, and ``BaseCLIP.warmup`` runs the encoders
+over representative batch sizes so compilation, kernel selection and
+allocator growth happen before the first real request.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Sequence, Union
+
+import torch
+from torch import device, Tensor
+import torch.nn.functional as F
+from PIL import Image
+from open_clip.factory import (create_model,
+                               image_transform_v2,
+                               get_tokenizer)
+
+from src.utils.image_decode import preprocess_async
+
+WARMUP_TEXT = "a photo of a person walking on the street"
+
+
+class BaseCLIP:
+    """
+    A class for handling text and image embeddings using an open_clip model.
+    Provides methods to generate embeddings for text and images; concrete
+    models subclass it and are registered by name in the ModelRegistry.
+    """
+
+    def __init__(
+        self,
+        model: create_model,
+        processor: image_transform_v2,
+        tokenizer: get_tokenizer,
+        device_type: device
+    ) -> None:
+        """
+        Initialize the encoder.
+
+        Args:
+            model (create_model): The CLIP model to be used for encoding.
+            processor (image_transform_v2): The image transformation function.
+            tokenizer (get_tokenizer): The tokenizer for processing text inputs.
+            device_type (device): The device on which the model will run (e.g., CPU or GPU).
+        """
+        self._model = model
+        self._processor = processor
+        self._tokenizer = tokenizer
+        self._device_type = device_type
+        self._grad_mode = torch.no_grad
+        self._memory_format = torch.preserve_format
+        self._encode_text = model.encode_text
+        self._encode_image = model.encode_image
+        self._warmup_timings: Union[Dict[str, Dict[int, float]], None] = None
+
+    def optimize(
+        self,
+        inference_mode: bool = False,
+        compile_mode: Union[str, None] = None,
+        channels_last: bool = False
+    ) -> None:
+        """
+        Switches the encoder to faster execution settings.
+
+        Args:
+            inference_mode (bool): Run under torch.inference_mode instead of no_grad.
+            compile_mode (str, optional): A torch.compile mode ("default",
+                "reduce-overhead", "max-autotune") to compile both encode functions.
+            channels_last (bool): Keep the vision tower and its inputs in
+                channels-last layout, which lets oneDNN fuse the patch convolution on CPU.
+        """
+        if inference_mode:
+            self._grad_mode = torch.inference_mode
+        if channels_last:
+            self._model.visual.to(memory_format=torch.channels_last)
+            self._memory_format = torch.channels_last
+        if compile_mode:
+            self._encode_text = torch.compile(self._model.encode_text, mode=compile_mode)
+            self._encode_image = torch.compile(self._model.encode_image, mode=compile_mode)
+
+    def _text_features(
+        self,
+        texts: Union[str, List[str]]
+    ) -> Tensor:
+        """
+        Tokenizes and encodes texts into normalized embeddings.
+        """
+        tokens = self._tokenizer(
+            texts,
+            context_length=self._model.context_length
+        ).to(self._device_type)
+        with self._grad_mode(), torch.cuda.amp.autocast():
+            text_features = self._encode_text(tokens)
+            text_features = F.normalize(text_features, dim=-1)
+        return text_features
+
+    def _image_features(
+        self,
+        images: Tensor
+    ) -> Tensor:
+        """
+        Encodes a batch of preprocessed images into normalized embeddings.
+        """
+        images = images.to(self._device_type, memory_format=self._memory_format)
+        with self._grad_mode(), torch.cuda.amp.autocast():
+            image_features = self._encode_image(images)
+            image_features = F.normalize(image_features, dim=-1)
+        return image_features
+
+    async def text_embedding(
+        self,
+        text: str
+    ) -> Tensor:
+        """
+        Generate a text embedding using the CLIP model.
+
+        Args:
+            text (str): The input text to be encoded.
+
+        Returns:
+            Tensor: The normalized text embedding as a PyTorch tensor.
+        """
+        return self._text_features(text)
+
+    async def text_embedding_batch(
+        self,
+        texts: List[str]
+    ) -> Tensor:
+        """
+        Generate text embeddings for several texts in one forward pass.
+
+        Args:
+            texts (List[str]): The input texts to be encoded.
+
+        Returns:
+            Tensor: The normalized text embeddings, one row per text.
+        """
+        return self._text_features(texts)
+
+    async def image_embedding(
+        self,
+        image
+    ) -> Tensor:
+        """
+        Generate an image embedding using the CLIP model.
+
+        The image is decoded near the model resolution and transformed in
+        the decode pool.
+
+        Args:
+            image: The input image file (path or file-like object) to be encoded.
+
+        Returns:
+            Tensor: The normalized image embedding as a PyTorch tensor.
+        """
+        image = await preprocess_async(self._processor, image, self.image_size)
+        return self._image_features(image.unsqueeze(0))
+
+    async def image_embedding_files(
+        self,
+        images: List
+    ) -> Tensor:
+        """
+        Generate embeddings for several image files in one forward pass.
+
+        The files are decoded concurrently in the decode pool.
+
+        Args:
+            images (List): Paths or binary file-like objects.
+
+        Returns:
+            Tensor: The normalized image embeddings, one row per image.
+        """
+        pixels = await asyncio.gather(*(
+            preprocess_async(self._processor, image, self.image_size)
+            for image in images
+        ))
+        return self._image_features(torch.stack(pixels))
+
+    async def image_embedding_batch(
+        self,
+        images: Tensor
+    ) -> Tensor:
+        """
+        Generate embeddings for a batch of already preprocessed images.
+
+        Args:
+            images (Tensor): A (batch, 3, H, W) tensor produced by the processor.
+
+        Returns:
+            Tensor: The normalized image embeddings, one row per image.
+        """
+        return self._image_features(images)
+
+    def warmup(
+        self,
+        batch_sizes: Sequence[int] = (1,)
+    ) -> Dict[str, Dict[int, float]]:
+        """
+        Runs text and image encoding once per batch size and times each run.
+
+        Blocking; run it in a worker thread when the event loop is serving.
+
+        Args:
+            batch_sizes (Sequence[int]): The batch sizes requests are expected to use.
+
+        Returns:
+            Dict[str, Dict[int, float]]: Milliseconds per batch size for "text" and "image".
+        """
+        blank = self._processor(Image.new("RGB", (self.image_size, self.image_size)))
+        timings = {"text": {}, "image": {}}
+        for batch_size in batch_sizes:
+            for kind, run in (
+                ("text", lambda: self._text_features([WARMUP_TEXT] * batch_size)),
+                ("image", lambda: self._image_features(blank.expand(batch_size, -1, -1, -1)))
+            ):
+                started = time.perf_counter()
+                run()
+                if torch.device(self._device_type).type == "cuda":
+                    torch.cuda.synchronize(self._device_type)
+                timings[kind][batch_size] = (time.perf_counter() - started) * 1000
+        self._warmup_timings = timings
+        return timings
+
+    @property
+    def warmed(self) -> bool:
+        """
+        Tells whether warmup has run.
+        """
+        return self._warmup_timings is not None
+
+    @property
+    def warmup_timings(self) -> Union[Dict[str, Dict[int, float]], None]:
+        """
+        Returns the timings of the last warmup, or None if it has not run.
+        """
+        return self._warmup_timings
+
+    @property
+    def processor(self):
+        """
+        Returns the image preprocessing transform of the model.
+        """
+        return self._processor
+
+    @property
+    def parameter_bytes(self) -> int:
+        """
+        Returns the bytes held by the model's parameters and buffers.
+        """
+        tensors = list(self._model.parameters()) + list(self._model.buffers())
+        return sum(tensor.element_size() * tensor.nelement() for tensor in tensors)
+
+    @property
+    def image_size(self) -> int:
+        """
+        Returns the larger side of the model's input resolution.
+        """
+        size = self._model.visual.image_size
+        return max(size) if isinstance(size, (tuple, list)) else size
@@ -0,0 +1,290 @@
+"""
+This module provides a registry of named encoders with lazy loading and
+memory-budgeted LRU eviction.
+
+Services look encoders up by model type instead of holding one attribute per
+model, so a new model only needs a registration (and a FAISS index under the
+same name), not code changes in every service.
+"""
+
+import asyncio
+import gc
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence, Union
+
+import torch
+from open_clip import (create_model_from_pretrained,
+                       get_tokenizer)
+
+from src.modules.base_clip import BaseCLIP
+
+
+class ModelRegistry:
+    """
+    Holds encoder loaders by name and keeps at most a memory budget of them loaded.
+    """
+
+    def __init__(
+        self,
+        memory_budget: Union[int, None] = None
+    ) -> None:
+        """
+        Initializes an empty registry.
+
+        Args:
+            memory_budget (int, optional): The total memory cost of loaded
+                encoders, in the unit of the registered costs (MB by
+                convention); None or 0 keeps everything loaded.
+        """
+        self._memory_budget = memory_budget
+        self._entries: Dict[str, Dict] = {}
+        self._loaded: "OrderedDict[str, BaseCLIP]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loading = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Returns the registered model names in registration order.
+        """
+        return list(self._entries)
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[torch.device], BaseCLIP],
+        device: Union[str, torch.device] = "cpu",
+        memory_cost: int = 0
+    ) -> None:
+        """
+        Registers an encoder; nothing is loaded until it is first used.
+
+        Args:
+            name (str): The model type used in requests and as the FAISS index name.
+            loader (Callable[[torch.device], BaseCLIP]): Builds the encoder on a device.
+            device (Union[str, torch.device]): The device to load the encoder on.
+            memory_cost (int): The memory the loaded encoder occupies.
+        """
+        self.unload(name)
+        self._entries[name] = {
+            "loader": loader,
+            "device": torch.device(device),
+            "memory_cost": memory_cost,
+            "loads": 0,
+            "last_used": None
+        }
+        self._locks[name] = asyncio.Lock()
+
+    def _evict(
+        self,
+        keep: str
+    ) -> None:
+        """
+        Unloads least recently used encoders until the model to be loaded fits.
+
+        Runs before the loader, so the old and new weights are never resident
+        together beyond the budget; loads already in progress count as used.
+        Requests already holding an evicted encoder finish with it; its
+        memory is released when they drop their reference.
+        """
+        if not self._memory_budget:
+            return
+        incoming = self._entries[keep]["memory_cost"]
+        while self.memory_used + self._loading + incoming > self._memory_budget:
+            victim = next((name for name in self._loaded if name != keep), None)
+            if victim is None:
+                return
+            self.unload(victim)
+
+    def _store(
+        self,
+        name: str,
+        encoder: BaseCLIP
+    ) -> BaseCLIP:
+        """
+        Records a freshly loaded encoder.
+        """
+        self._entries[name]["loads"] += 1
+        self._loaded[name] = encoder
+        return encoder
+
+    def _touch(
+        self,
+        name: str
+    ) -> Union[BaseCLIP, None]:
+        """
+        Marks a model as used and returns it if it is loaded.
+        """
+        entry = self._entries[name]
+        entry["last_used"] = time.time()
+        if name not in self._loaded:
+            return None
+        self._loaded.move_to_end(name)
+        return self._loaded[name]
+
+    def load(
+        self,
+        name: str
+    ) -> BaseCLIP:
+        """
+        Returns an encoder, loading it synchronously if needed.
+
+        Args:
+            name (str): The registered model name.
+
+        Returns:
+            BaseCLIP: The encoder.
+
+        Raises:
+            KeyError: If the name is not registered.
+        """
+        encoder = self._touch(name)
+        if encoder is None:
+            entry = self._entries[name]
+            self._evict(keep=name)
+            encoder = self._store(name, entry["loader"](entry["device"]))
+        return encoder
+
+    async def get(
+        self,
+        name: str
+    ) -> BaseCLIP:
+        """
+        Returns an encoder, running its loader in a worker thread on first use.
+
+        Concurrent first requests for the same model share one load.
+
+        Args:
+            name (str): The registered model name.
+
+        Returns:
+            BaseCLIP: The encoder.
+
+        Raises:
+            ValueError: If the name is not registered.
+        """
+        if name not in self._entries:
+            raise ValueError(f"Model type not supported: {name}")
+        encoder = self._touch(name)
+        if encoder is not None:
+            return encoder
+        async with self._locks[name]:
+            encoder = self._touch(name)
+            if encoder is None:
+                entry = self._entries[name]
+                self._evict(keep=name)
+                # counted against the budget while loading, so a concurrent
+                # load of another model makes room for both
+                self._loading += entry["memory_cost"]
+                try:
+                    loaded = await asyncio.to_thread(entry["loader"], entry["device"])
+                finally:
+                    self._loading -= entry["memory_cost"]
+                encoder = self._store(name, loaded)
+        return encoder
+
+    def preload(self) -> List[str]:
+        """
+        Loads registered encoders in registration order while they fit the budget.
+
+        Returns:
+            List[str]: The names that were loaded.
+        """
+        loaded = []
+        for name, entry in self._entries.items():
+            if self._memory_budget and \
+                    self.memory_used + entry["memory_cost"] > self._memory_budget:
+                continue
+            self.load(name)
+            loaded.append(name)
+        return loaded
+
+    def unload(
+        self,
+        name: str
+    ) -> None:
+        """
+        Drops a loaded encoder and returns its cached device memory.
+        """
+        encoder = self._loaded.pop(name, None)
+        if encoder is None:
+            return
+        device = self._entries[name]["device"]
+        del encoder
+        gc.collect()
+        if device.type == "cuda":
+            torch.cuda.empty_cache()
+
+    @property
+    def memory_used(self) -> int:
+        """
+        Returns the summed memory cost of the loaded encoders.
+        """
+        return sum(self._entries[name]["memory_cost"] for name in self._loaded)
+
+    @property
+    def parameter_bytes(self) -> Dict[str, int]:
+        """
+        Returns the parameter and buffer bytes of each loaded encoder.
+        """
+        return {name: encoder.parameter_bytes for name, encoder in self._loaded.items()}
+
+    @property
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Returns the device, cost, load state and usage of each registered model.
+        """
+        return {
+            name: {
+                "device": str(entry["device"]),
+                "memory_cost": entry["memory_cost"],
+                "loaded": name in self._loaded,
+                "loads": entry["loads"],
+                "last_used": entry["last_used"]
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+def open_clip_loader(
+    encoder_class: type,
+    model_name: str,
+    tokenizer_name: str,
+    optimize: Union[Dict, None] = None,
+    warmup: Sequence[int] = ()
+) -> Callable[[torch.device], BaseCLIP]:
+    """
+    Creates a loader for an open_clip model wrapped in an encoder class.
+
+    Warm-up is part of the load, so an encoder reloaded after eviction is
+    compiled and warmed before the registry hands it to any request.
+
+    Args:
+        encoder_class (type): A BaseCLIP subclass.
+        model_name (str): The open_clip model name, e.g. an ``hf-hub:`` id.
+        tokenizer_name (str): The open_clip tokenizer name.
+        optimize (Dict, optional): Arguments for BaseCLIP.optimize.
+        warmup (Sequence[int]): Batch sizes for BaseCLIP.warmup; empty skips it.
+
+    Returns:
+        Callable[[torch.device], BaseCLIP]: The loader.
+    """
+    def loader(device: torch.device) -> BaseCLIP:
+        model, processor = create_model_from_pretrained(model_name)
+        model.to(device).eval()
+        encoder = encoder_class(
+            model=model,
+            processor=processor,
+            tokenizer=get_tokenizer(tokenizer_name),
+            device_type=device
+        )
+        if optimize:
+            encoder.optimize(**optimize)
+        if warmup:
+            encoder.warmup(warmup)
+        return encoder
+    return loader
@@ -0,0 +1,209 @@
+"""
+Implements a per-video frame-order index over the keyframe metadata.
+"""
+
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from src.utils.memory import deep_sizeof
+from src.utils.utility import frame_number
+
+
+class FrameIndex:
+    """
+    Keeps all keyframes sorted by (video_id, frame number) in contiguous arrays,
+    with per-video offsets, so temporal lookups are a binary search.
+    """
+
+    def __init__(
+        self,
+        mapping: List[Dict]
+    ) -> None:
+        """
+        Builds the index from the metadata rows.
+
+        Args:
+            mapping (List[Dict]): Rows with 'indice', 'video_id' and 'frame_id'.
+        """
+        rows = sorted(
+            mapping,
+            key=lambda obj: (obj['video_id'], frame_number(obj['frame_id']))
+        )
+        self._indices = np.fromiter(
+            (obj['indice'] for obj in rows), dtype=np.int64, count=len(rows)
+        )
+        self._frames = np.fromiter(
+            (frame_number(obj['frame_id']) for obj in rows), dtype=np.int64, count=len(rows)
+        )
+        self._video_ids = [obj['video_id'] for obj in rows]
+        self._frame_ids = [obj['frame_id'] for obj in rows]
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for position in range(1, len(rows) + 1):
+            if position == len(rows) or rows[position]['video_id'] != rows[start]['video_id']:
+                self._offsets[rows[start]['video_id']] = (start, position)
+                start = position
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Returns the estimated bytes of the index arrays, ids and offsets.
+        """
+        return deep_sizeof(
+            [self._indices, self._frames, self._video_ids, self._frame_ids, self._offsets]
+        )
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._offsets
+
+    def _span(
+        self,
+        video_id: str,
+        frame_id: str
+    ) -> Tuple[int, int, int, int]:
+        """
+        Locates a frame within its video.
+
+        Returns:
+            Tuple[int, int, int, int]: The video's start and end offsets and the
+            first/last positions holding the frame (equal if it is absent).
+
+        Raises:
+            KeyError: If the video is unknown.
+        """
+        start, end = self._offsets[video_id]
+        number = frame_number(frame_id)
+        frames = self._frames[start:end]
+        left = start + int(np.searchsorted(frames, number, side='left'))
+        right = start + int(np.searchsorted(frames, number, side='right'))
+        return start, end, left, right
+
+    def _rows(
+        self,
+        start: int,
+        end: int
+    ) -> List[Dict]:
+        """
+        Returns the metadata of the positions in [start, end).
+        """
+        return [
+            {'video_id': self._video_ids[position], 'frame_id': self._frame_ids[position]}
+            for position in range(start, end)
+        ]
+
+    def indice_of(
+        self,
+        video_id: str,
+        frame_id: str
+    ) -> int:
+        """
+        Resolves a (video_id, frame_id) pair to its FAISS indice.
+
+        Raises:
+            KeyError: If the frame is not indexed.
+        """
+        _, _, left, right = self._span(video_id, frame_id)
+        if left == right:
+            raise KeyError(f"{video_id}/{frame_id}")
+        return int(self._indices[left])
+
+    def resolve(
+        self,
+        data: Dict,
+        indices: Union[List[int], None] = None,
+        frames: Union[List[Dict], None] = None
+    ) -> List[int]:
+        """
+        Collects FAISS indices from explicit indices and (video_id, frame_id) pairs.
+
+        Args:
+            data (Dict): The metadata explicit indices must belong to.
+            indices (List[int], optional): Indices given directly.
+            frames (List[Dict], optional): Frames with 'video_id' and 'frame_id'.
+
+        Returns:
+            List[int]: The resolved indices, explicit ones first.
+
+        Raises:
+            KeyError: If an indice or a frame is not indexed.
+        """
+        resolved = []
+        for indice in indices or []:
+            if indice not in data:
+                raise KeyError(f"Indice {indice} is not indexed")
+            resolved.append(indice)
+        for frame in frames or []:
+            resolved.append(
+                self.indice_of(
+                    video_id=frame['video_id'],
+                    frame_id=frame['frame_id']
+                )
+            )
+        return resolved
+
+    def neighbors(
+        self,
+        video_id: str,
+        frame_id: str,
+        window: int
+    ) -> List[Dict]:
+        """
+        Returns up to window keyframes on each side of a frame, in frame order.
+
+        The frame itself is included when it is indexed; for an unindexed frame
+        number the surrounding keyframes are returned.
+
+        Args:
+            video_id (str): The video to look in.
+            frame_id (str): The frame id, with or without extension.
+            window (int): The number of keyframes on each side.
+
+        Returns:
+            List[Dict]: The neighboring keyframes.
+        """
+        start, end, left, right = self._span(video_id, frame_id)
+        return self._rows(max(start, left - window), min(end, right + window))
+
+    def video_indices(
+        self,
+        video_id: str
+    ) -> np.ndarray:
+        """
+        Returns the FAISS indices of all keyframes of a video, in frame order.
+        """
+        start, end = self._offsets[video_id]
+        return self._indices[start:end]
+
+    def expand(
+        self,
+        results: List[Dict],
+        window: int
+    ) -> List[Dict]:
+        """
+        Replaces each hit by its temporal neighborhood, keeping hit order and
+        dropping frames already emitted for an earlier hit.
+
+        Args:
+            results (List[Dict]): The ranked hits with 'video_id' and 'frame_id'.
+            window (int): The number of keyframes on each side of a hit.
+
+        Returns:
+            List[Dict]: The expanded hits.
+        """
+        seen = set()
+        expanded = []
+        for hit in results:
+            try:
+                neighborhood = self.neighbors(hit['video_id'], hit['frame_id'], window)
+            except KeyError:
+                neighborhood = [hit]
+            for row in neighborhood:
+                key = (row['video_id'], row['frame_id'])
+                if key not in seen:
+                    seen.add(key)
+                    expanded.append(row)
+        return expanded
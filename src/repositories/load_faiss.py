@@ -1,11 +1,35 @@
 """
 Implements a FAISS-based search for CLIP embeddings.
+
+Index files may be plain flat indexes or ``faiss.IndexPreTransform`` pipelines
+produced by ``src.tools.reduce_index``; the latter project query vectors to the
+reduced dimensionality inside ``search``.
+
+A model may also be configured for two-stage retrieval: a compressed (IVF/PQ)
+index returns a wide candidate pool which is then re-ranked exactly against
+full-precision vectors read from a memory-mapped ``.npy`` matrix (see
+``src.tools.build_two_stage``).
+
+A model configured with a shard directory is served by ``ShardedFaiss``
+instead of a single index file.
+
+A model may also have a ``VideoIndex`` of per-video centroids for
+coarse-to-fine search: rank videos first, then search only their keyframes.
 """
 
-from typing import List
+from typing import Dict, List, Tuple, Union
+import logging
+
 import faiss
+import numpy as np
 from torch import Tensor
 
+from src.repositories.sharded_faiss import ShardedFaiss
+from src.repositories.video_index import VideoIndex
+from src.utils.memory import index_bytes
+
+logger = logging.getLogger(__name__)
+
 
 class ClipFaiss:
     """
@@ -15,29 +39,416 @@ class ClipFaiss:
     def __init__(
         self,
         apple_faiss_url: str,
-        laion_faiss_url: str
+        laion_faiss_url: str,
+        apple_rerank_url: Union[str, None] = None,
+        laion_rerank_url: Union[str, None] = None,
+        apple_candidate_k: Union[int, None] = None,
+        laion_candidate_k: Union[int, None] = None,
+        apple_shard_dir: Union[str, None] = None,
+        laion_shard_dir: Union[str, None] = None,
+        apple_video_index_url: Union[str, None] = None,
+        laion_video_index_url: Union[str, None] = None,
+        apple_gpu_device: Union[int, None] = 1,
+        mmap: bool = False,
+        extra_indexes: Union[Dict[str, Dict], None] = None
     ) -> None:
         """
         Initializes the FAISS index and loads it onto a GPU.
 
         Args:
-            faiss_url (str): The path to the FAISS index file.
-            device_type (device): The device type (e.g., 'cpu' or 'cuda').
+            apple_faiss_url (str): The path to the Apple FAISS index file.
+            laion_faiss_url (str): The path to the LAION FAISS index file.
+            apple_rerank_url (str, optional): A ``.npy`` matrix of full-precision
+                Apple vectors; enables two-stage retrieval for that model.
+            laion_rerank_url (str, optional): The same for the LAION model.
+            apple_candidate_k (int, optional): The default candidate pool size
+                for Apple two-stage retrieval.
+            laion_candidate_k (int, optional): The same for the LAION model.
+            apple_shard_dir (str, optional): A directory of Apple index shards;
+                when set, apple_faiss_url is not loaded.
+            laion_shard_dir (str, optional): The same for the LAION model.
+            apple_video_index_url (str, optional): The path prefix of the Apple
+                video centroid index (``<prefix>.faiss`` and ``<prefix>.json``).
+            laion_video_index_url (str, optional): The same for the LAION model.
+            apple_gpu_device (int, optional): The GPU holding the Apple index;
+                None or a negative value keeps it on the CPU, as does an index
+                FAISS cannot clone to the GPU (e.g. fp16/sq8 scalar quantizers).
+            mmap (bool): Whether to memory-map index files instead of reading
+                them into private memory, so forked workers share the pages.
+            extra_indexes (Dict[str, Dict], optional): Indexes of additional
+                registered models by model type, each with ``faiss_url`` and
+                optionally ``rerank_url`` and ``candidate_k``.
+        """
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        self._mmap = mmap
+        if apple_shard_dir:
+            self._apple_index = ShardedFaiss(shard_dir=apple_shard_dir, io_flags=io_flags)
+            self._apple_gpu_index = self._apple_index
+        else:
+            self._apple_index = faiss.read_index(apple_faiss_url, io_flags)
+            self._apple_gpu_index = self._apple_index
+            if apple_gpu_device is not None and apple_gpu_device >= 0:
+                self._apple_res = faiss.StandardGpuResources()
+                try:
+                    self._apple_gpu_index = faiss.index_cpu_to_gpu(
+                        provider=self._apple_res,
+                        device=apple_gpu_device,
+                        index=self._apple_index
+                    )
+                except RuntimeError as e:
+                    logger.warning("keeping the Apple index on the CPU: %s", e)
+        if laion_shard_dir:
+            self._laion_index = ShardedFaiss(shard_dir=laion_shard_dir, io_flags=io_flags)
+        else:
+            self._laion_index = faiss.read_index(laion_faiss_url, io_flags)
+        self._indexes: Dict[str, faiss.Index] = {
+            "apple_clip": self._apple_gpu_index,
+            "laion_clip": self._laion_index
+        }
+        self._cpu_indexes: Dict[str, faiss.Index] = {
+            "apple_clip": self._apple_index,
+            "laion_clip": self._laion_index
+        }
+        self._rerank_vectors: Dict[str, Union[np.ndarray, None]] = {
+            "apple_clip": self._load_rerank_vectors(apple_rerank_url),
+            "laion_clip": self._load_rerank_vectors(laion_rerank_url)
+        }
+        self._candidate_k: Dict[str, Union[int, None]] = {
+            "apple_clip": apple_candidate_k,
+            "laion_clip": laion_candidate_k
+        }
+        self._video_indexes: Dict[str, Union[VideoIndex, None]] = {
+            "apple_clip": self._load_video_index(apple_video_index_url),
+            "laion_clip": self._load_video_index(laion_video_index_url)
+        }
+        for model_type, extra in (extra_indexes or {}).items():
+            index = faiss.read_index(extra["faiss_url"], io_flags)
+            self._indexes[model_type] = index
+            self._cpu_indexes[model_type] = index
+            self._rerank_vectors[model_type] = self._load_rerank_vectors(
+                extra.get("rerank_url")
+            )
+            self._candidate_k[model_type] = extra.get("candidate_k")
+            self._video_indexes[model_type] = None
+
+    @staticmethod
+    def _load_video_index(
+        video_index_url: Union[str, None]
+    ) -> Union[VideoIndex, None]:
+        """
+        Loads a video centroid index, if one is configured.
+
+        Args:
+            video_index_url (str, optional): The path prefix of the index files.
+
+        Returns:
+            VideoIndex: The loaded index, or None.
+        """
+        if not video_index_url:
+            return None
+        return VideoIndex(
+            index_url=f"{video_index_url}.faiss",
+            videos_url=f"{video_index_url}.json"
+        )
+
+    def has_video_index(
+        self,
+        model_type: str
+    ) -> bool:
+        """
+        Tells whether coarse-to-fine search is available for a model.
+        """
+        return self._video_indexes.get(model_type) is not None
+
+    @property
+    def memory_stats(self) -> Dict[str, Dict]:
+        """
+        Estimates the storage of each model's indexes.
+
+        Returns:
+            Dict[str, Dict]: Per model, the index_bytes of the CPU index, whether
+            a GPU copy exists, whether files are memory-mapped (pages shared
+            between workers), and the re-rank matrix and video index bytes.
+        """
+        stats = {}
+        for model_type, index in self._cpu_indexes.items():
+            vectors = self._rerank_vectors[model_type]
+            video_index = self._video_indexes[model_type]
+            stats[model_type] = {
+                **index_bytes(index),
+                "gpu": self._indexes[model_type] is not index,
+                "mmap": self._mmap,
+                "rerank_bytes": vectors.nbytes if vectors is not None else 0,
+                "video_index_bytes": video_index.memory_bytes if video_index else 0
+            }
+        return stats
+
+    def _sharded_index(
+        self,
+        model_type: str
+    ) -> ShardedFaiss:
+        """
+        Returns the sharded index of a model, failing if it is not sharded.
+
+        Args:
+            model_type (str): The model whose index to return.
+
+        Returns:
+            ShardedFaiss: The model's shard set.
+        """
+        index = self._indexes.get(model_type)
+        if not isinstance(index, ShardedFaiss):
+            raise ValueError(f"Index of {model_type} is not sharded")
+        return index
+
+    def load_shard(
+        self,
+        model_type: str,
+        name: str,
+        index_url: str,
+        ids_url: str
+    ) -> None:
+        """
+        Loads or replaces one shard of a sharded model index.
+
+        Args:
+            model_type (str): The model whose index to extend.
+            name (str): The shard name, e.g. the video batch prefix.
+            index_url (str): The path to the shard's FAISS index.
+            ids_url (str): The path to the shard's local-to-global id array.
+        """
+        self._sharded_index(model_type).load_shard(
+            name=name,
+            index_url=index_url,
+            ids_url=ids_url
+        )
+
+    def unload_shard(
+        self,
+        model_type: str,
+        name: str
+    ) -> None:
+        """
+        Unloads one shard of a sharded model index.
+
+        Args:
+            model_type (str): The model whose index to shrink.
+            name (str): The shard name.
+        """
+        self._sharded_index(model_type).unload_shard(name=name)
+
+    @staticmethod
+    def _load_rerank_vectors(
+        rerank_url: Union[str, None]
+    ) -> Union[np.ndarray, None]:
+        """
+        Memory-maps a full-precision vector matrix, if one is configured.
+
+        Args:
+            rerank_url (str, optional): The path to a fp16 or fp32 ``.npy`` file.
+
+        Returns:
+            np.ndarray: A read-only memory-mapped array, or None.
+        """
+        if not rerank_url:
+            return None
+        return np.load(rerank_url, mmap_mode="r")
+
+    @staticmethod
+    def _to_numpy(
+        query_vectors: Tensor
+    ) -> np.ndarray:
+        """
+        Converts query embeddings to the contiguous float32 layout FAISS expects.
+
+        Args:
+            query_vectors (Tensor): The query vectors, possibly half precision.
 
+        Returns:
+            np.ndarray: A float32 array of shape (n, d).
         """
-        self._apple_index = faiss.read_index(apple_faiss_url)
-        self._apple_res = faiss.StandardGpuResources()
-        self._apple_gpu_index = faiss.index_cpu_to_gpu(
-            provider=self._apple_res,
-            device=1,
-            index=self._apple_index
+        return np.ascontiguousarray(
+            query_vectors.detach().float().cpu().numpy(),
+            dtype=np.float32
         )
-        self._laion_index = faiss.read_index(laion_faiss_url)
+
+    @staticmethod
+    def _rerank(
+        vectors: np.ndarray,
+        query_vectors: np.ndarray,
+        candidates: np.ndarray,
+        top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-scores candidate ids exactly and keeps the best top_k per query.
+
+        Candidate rows are gathered in ascending id order so reads from the
+        memory-mapped matrix stay as sequential as possible.
+
+        Args:
+            vectors (np.ndarray): The full-precision vector matrix.
+            query_vectors (np.ndarray): The float32 query vectors.
+            candidates (np.ndarray): The candidate ids from the coarse search.
+            top_k (int): The number of results to keep per query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and ids, padded with -inf/-1.
+        """
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+        indices = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        for row, (query, ids) in enumerate(zip(query_vectors, candidates)):
+            ids = np.sort(ids[ids >= 0])
+            if not len(ids):
+                continue
+            exact = np.asarray(vectors[ids], dtype=np.float32) @ query
+            keep = min(top_k, len(ids))
+            best = np.argpartition(-exact, keep - 1)[:keep]
+            best = best[np.argsort(-exact[best])]
+            scores[row, :keep] = exact[best]
+            indices[row, :keep] = ids[best]
+        return scores, indices
+
+    async def search(
+        self,
+        model_type: str,
+        top_k: int,
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the index of the given model, re-ranking when configured.
+
+        Two-stage retrieval is used when the model has a re-rank matrix and the
+        candidate pool (the argument, or the model default) is larger than top_k.
+
+        Args:
+            model_type (str): The model whose index to search.
+            top_k (int): The number of nearest neighbors to retrieve.
+            query_vectors (Tensor): The query vectors to search against the index.
+            candidate_k (int, optional): The coarse candidate pool size.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Similarity scores and indices,
+            each of shape (n_queries, top_k).
+        """
+        if model_type not in self._indexes:
+            raise ValueError(f"Model type not supported: {model_type}")
+        index = self._indexes[model_type]
+        query_vectors = self._to_numpy(query_vectors)
+        vectors = self._rerank_vectors[model_type]
+        candidate_k = candidate_k or self._candidate_k[model_type]
+        if vectors is None or not candidate_k or candidate_k <= top_k:
+            return index.search(query_vectors, top_k)
+        _, candidates = index.search(query_vectors, candidate_k)
+        return self._rerank(vectors, query_vectors, candidates, top_k)
+
+    async def reconstruct(
+        self,
+        model_type: str,
+        indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the stored vectors of the given indices.
+
+        Vectors come from the full-precision re-rank matrix when the model has
+        one, otherwise from the CPU copy of the index. Indices are checked
+        against the matrix or index size, except for sharded indexes, whose
+        global ids need not be contiguous; those raise from reconstruct_batch
+        for ids no loaded shard holds.
+
+        Args:
+            model_type (str): The model whose vectors to read.
+            indices (np.ndarray): The indices to reconstruct.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(indices), d).
+
+        Raises:
+            KeyError: If an index is outside the stored vectors.
+        """
+        if model_type not in self._cpu_indexes:
+            raise ValueError(f"Model type not supported: {model_type}")
+        indices = np.asarray(indices, dtype=np.int64)
+        vectors = self._rerank_vectors[model_type]
+        index = self._cpu_indexes[model_type]
+        if vectors is None and isinstance(index, ShardedFaiss):
+            return index.reconstruct_batch(indices)
+        ntotal = len(vectors) if vectors is not None else index.ntotal
+        invalid = indices[(indices < 0) | (indices >= ntotal)]
+        if len(invalid):
+            raise KeyError(f"Indice {int(invalid[0])} is not indexed")
+        if vectors is not None:
+            order = np.argsort(indices)
+            result = np.empty((len(indices), vectors.shape[1]), dtype=np.float32)
+            result[order] = vectors[indices[order]]
+            return result
+        return index.reconstruct_batch(indices)
+
+    async def search_videos(
+        self,
+        model_type: str,
+        query_vectors: Tensor,
+        top_videos: int
+    ) -> List[str]:
+        """
+        Ranks videos against all query vectors using the centroid index.
+
+        Args:
+            model_type (str): The model whose video index to search.
+            query_vectors (Tensor): One or more query vectors.
+            top_videos (int): The number of videos to return.
+
+        Returns:
+            List[str]: The best video ids, best first.
+        """
+        if not self.has_video_index(model_type):
+            raise ValueError(f"No video index configured for {model_type}")
+        return self._video_indexes[model_type].rank_videos(
+            query_vectors=self._to_numpy(query_vectors),
+            top_videos=top_videos
+        )
+
+    async def search_within(
+        self,
+        model_type: str,
+        top_k: int,
+        query_vectors: Tensor,
+        indices: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches exactly, but only among the given indices.
+
+        Args:
+            model_type (str): The model whose vectors to search.
+            top_k (int): The number of nearest neighbors to retrieve.
+            query_vectors (Tensor): The query vectors.
+            indices (np.ndarray): The indices eligible as results.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and indices of shape
+            (n_queries, top_k), padded with -inf/-1.
+        """
+        query_vectors = self._to_numpy(query_vectors)
+        indices = np.asarray(indices, dtype=np.int64)
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+        result = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        if not len(indices):
+            return scores, result
+        vectors = await self.reconstruct(model_type=model_type, indices=indices)
+        similarities = query_vectors @ vectors.T
+        keep = min(top_k, len(indices))
+        best = np.argpartition(-similarities, keep - 1, axis=1)[:, :keep]
+        best_scores = np.take_along_axis(similarities, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        scores[:, :keep] = np.take_along_axis(best_scores, order, axis=1)
+        result[:, :keep] = indices[np.take_along_axis(best, order, axis=1)]
+        return scores, result
 
     async def apple_search(
         self,
         top_k: int,
-        query_vectors: Tensor
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
     ) -> List[int]:
         """
         Searches the Apple FAISS index for the top-k nearest neighbors.
@@ -45,18 +456,24 @@ class ClipFaiss:
         Args:
             top_k (int): The number of nearest neighbors to retrieve.
             query_vectors (Tensor): The query vectors to search against the index.
+            candidate_k (int, optional): The two-stage candidate pool size.
 
         Returns:
             List[int]: A list of indices of the top-k nearest neighbors.
         """
-        query_vectors = query_vectors.cpu().detach().numpy()
-        _, indices = self._apple_gpu_index.search(query_vectors, top_k)
+        _, indices = await self.search(
+            model_type="apple_clip",
+            top_k=top_k,
+            query_vectors=query_vectors,
+            candidate_k=candidate_k
+        )
         return indices
 
     async def laion_search(
         self,
         top_k: int,
-        query_vectors: Tensor
+        query_vectors: Tensor,
+        candidate_k: Union[int, None] = None
     ) -> List[int]:
         """
         Searches the LAION FAISS index for the top-k nearest neighbors.
@@ -64,10 +481,15 @@ class ClipFaiss:
         Args:
             top_k (int): The number of nearest neighbors to retrieve.
             query_vectors (Tensor): The query vectors to search against the index.
+            candidate_k (int, optional): The two-stage candidate pool size.
 
         Returns:
             List[int]: A list of indices of the top-k nearest neighbors.
         """
-        query_vectors = query_vectors.cpu().detach().numpy()
-        _, indices = self._laion_index.search(query_vectors, top_k)
+        _, indices = await self.search(
+            model_type="laion_clip",
+            top_k=top_k,
+            query_vectors=query_vectors,
+            candidate_k=candidate_k
+        )
         return indices
@@ -4,6 +4,8 @@ Loads and processes JSON data for video and frame mapping.
 
 import json
 
+from src.repositories.frame_index import FrameIndex
+
 
 class LoadJson:
     """
@@ -28,3 +30,11 @@ class LoadJson:
                 'frame_id': obj['frame_id']
             } for obj in self._mapping
         }
+        self._frame_index = FrameIndex(self._mapping)
+
+    @property
+    def frame_index(self) -> FrameIndex:
+        """
+        Returns the per-video frame-order index of the loaded keyframes.
+        """
+        return self._frame_index
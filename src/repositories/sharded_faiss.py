@@ -0,0 +1,217 @@
+"""
+Implements a sharded FAISS index searched with parallel fan-out.
+
+Each shard is a FAISS index file plus a ``.ids.npy`` array mapping its local
+row numbers to global indices (the ``indice`` values in the metadata). Shards
+are usually one video batch each (``L01``, ``L02``, ...) as written by
+``src.tools.build_shards`` and can be loaded or unloaded independently.
+"""
+
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Tuple, Union
+
+import faiss
+import numpy as np
+
+SHARD_SUFFIX = ".faiss"
+IDS_SUFFIX = ".ids.npy"
+
+
+class ShardedFaiss:
+    """
+    A set of independently loadable shards exposing the ``faiss.Index`` search API.
+    """
+
+    def __init__(
+        self,
+        shard_dir: Union[str, None] = None,
+        max_workers: Union[int, None] = None,
+        io_flags: int = 0
+    ) -> None:
+        """
+        Initializes the shard set, loading every shard found in shard_dir.
+
+        Args:
+            shard_dir (str, optional): A directory of ``<name>.faiss`` and
+                ``<name>.ids.npy`` pairs.
+            max_workers (int, optional): The number of search threads;
+                FAISS releases the GIL so shards are searched concurrently.
+            io_flags (int): Flags passed to ``faiss.read_index``, e.g.
+                ``faiss.IO_FLAG_MMAP`` to map shard files instead of reading them.
+        """
+        self._io_flags = io_flags
+        self._lock = threading.Lock()
+        self._shards: Dict[str, Tuple[faiss.Index, np.ndarray]] = {}
+        self._id_order: Dict[str, np.ndarray] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="faiss-shard"
+        )
+        if shard_dir:
+            for file_name in sorted(os.listdir(shard_dir)):
+                if file_name.endswith(SHARD_SUFFIX):
+                    name = file_name[:-len(SHARD_SUFFIX)]
+                    self.load_shard(
+                        name=name,
+                        index_url=os.path.join(shard_dir, file_name),
+                        ids_url=os.path.join(shard_dir, name + IDS_SUFFIX)
+                    )
+
+    @property
+    def shards(self) -> List[str]:
+        """
+        Returns the names of the loaded shards.
+        """
+        return sorted(self._shards)
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Returns the total number of vectors across loaded shards.
+        """
+        return sum(index.ntotal for index, _ in self._shards.values())
+
+    @property
+    def d(self) -> int:
+        """
+        Returns the vector dimensionality of the shards.
+        """
+        for index, _ in self._shards.values():
+            return index.d
+        return 0
+
+    def load_shard(
+        self,
+        name: str,
+        index_url: str,
+        ids_url: str
+    ) -> None:
+        """
+        Loads a shard, replacing any loaded shard with the same name.
+
+        The shard table is swapped as a whole so concurrent searches keep
+        using the table they started with.
+
+        Args:
+            name (str): The shard name, e.g. the video batch prefix.
+            index_url (str): The path to the shard's FAISS index.
+            ids_url (str): The path to the shard's local-to-global id array.
+        """
+        index = faiss.read_index(index_url, self._io_flags)
+        ids = np.load(ids_url).astype(np.int64)
+        if len(ids) != index.ntotal:
+            raise ValueError(
+                f"Shard {name} has {index.ntotal} vectors but {len(ids)} ids"
+            )
+        with self._lock:
+            shards = dict(self._shards)
+            shards[name] = (index, ids)
+            self._shards = shards
+            self._id_order.pop(name, None)
+
+    def unload_shard(
+        self,
+        name: str
+    ) -> None:
+        """
+        Unloads a shard; its memory is released once in-flight searches finish.
+
+        Args:
+            name (str): The shard name.
+        """
+        with self._lock:
+            shards = dict(self._shards)
+            shards.pop(name, None)
+            self._shards = shards
+            self._id_order.pop(name, None)
+
+    def reconstruct_batch(
+        self,
+        indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Returns the stored vectors of the given global indices.
+
+        Args:
+            indices (np.ndarray): Global indices, all present in some shard.
+
+        Returns:
+            np.ndarray: A float32 array of shape (len(indices), d).
+
+        Raises:
+            KeyError: If an indice is not held by any loaded shard.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        vectors = np.zeros((len(indices), self.d), dtype=np.float32)
+        found = np.zeros(len(indices), dtype=bool)
+        for name, (index, ids) in list(self._shards.items()):
+            order = self._id_order.get(name)
+            if order is None:
+                order = self._id_order[name] = np.argsort(ids)
+            sorted_ids = ids[order]
+            positions = np.searchsorted(sorted_ids, indices).clip(max=len(ids) - 1)
+            hit = (sorted_ids[positions] == indices) & ~found
+            if hit.any():
+                vectors[hit] = index.reconstruct_batch(order[positions[hit]])
+                found |= hit
+        if not found.all():
+            raise KeyError(f"Indices not loaded: {indices[~found][:10].tolist()}")
+        return vectors
+
+    @staticmethod
+    def _search_shard(
+        index: faiss.Index,
+        ids: np.ndarray,
+        query_vectors: np.ndarray,
+        top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches one shard and remaps its local rows to global indices.
+        """
+        scores, local = index.search(query_vectors, min(top_k, index.ntotal))
+        return scores, np.where(local >= 0, ids[local], -1)
+
+    def search(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches all shards in parallel and merges their top-k lists.
+
+        Args:
+            query_vectors (np.ndarray): The float32 query vectors.
+            top_k (int): The number of results per query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and global indices of shape
+            (n_queries, top_k), padded with -inf/-1.
+        """
+        shards = list(self._shards.values())
+        futures = [
+            self._executor.submit(self._search_shard, index, ids, query_vectors, top_k)
+            for index, ids in shards if index.ntotal
+        ]
+        partials = [future.result() for future in futures]
+
+        scores = np.full((len(query_vectors), top_k), -np.inf, dtype=np.float32)
+        indices = np.full((len(query_vectors), top_k), -1, dtype=np.int64)
+        for row in range(len(query_vectors)):
+            merged = islice(
+                heapq.merge(
+                    *(
+                        zip(shard_scores[row].tolist(), shard_ids[row].tolist())
+                        for shard_scores, shard_ids in partials
+                    ),
+                    key=lambda hit: -hit[0]
+                ),
+                top_k
+            )
+            for col, (score, indice) in enumerate(merged):
+                scores[row, col] = score
+                indices[row, col] = indice
+        return scores, indices
@@ -0,0 +1,82 @@
+"""
+Implements a small FAISS index of per-video centroid embeddings.
+"""
+
+import json
+from typing import List
+
+import faiss
+import numpy as np
+
+from src.utils.memory import index_bytes
+
+
+class VideoIndex:
+    """
+    Ranks videos by the similarity of queries to their centroid embeddings,
+    as built by ``src.tools.build_video_index``.
+    """
+
+    def __init__(
+        self,
+        index_url: str,
+        videos_url: str
+    ) -> None:
+        """
+        Loads the centroid index and the video id of each of its rows.
+
+        Args:
+            index_url (str): The path to the centroid FAISS index.
+            videos_url (str): The path to the JSON list of video ids, in row order.
+        """
+        self._index = faiss.read_index(index_url)
+        with open(videos_url, "r", encoding="utf-8") as f:
+            self._video_ids = json.load(f)
+        if len(self._video_ids) != self._index.ntotal:
+            raise ValueError(
+                f"{videos_url} lists {len(self._video_ids)} videos "
+                f"but {index_url} has {self._index.ntotal} centroids"
+            )
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Returns the number of videos in the index.
+        """
+        return self._index.ntotal
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Returns the estimated bytes of the centroid vectors.
+        """
+        return index_bytes(self._index)["code_bytes"]
+
+    def rank_videos(
+        self,
+        query_vectors: np.ndarray,
+        top_videos: int
+    ) -> List[str]:
+        """
+        Ranks videos by their summed similarity to all query vectors.
+
+        Summing over queries favours videos relevant to every event of a
+        multi-event query rather than to a single one.
+
+        Args:
+            query_vectors (np.ndarray): The float32 query vectors.
+            top_videos (int): The number of videos to return.
+
+        Returns:
+            List[str]: The best video ids, best first.
+        """
+        n_videos = self._index.ntotal
+        scores, rows = self._index.search(query_vectors, n_videos)
+        combined = np.zeros(n_videos, dtype=np.float32)
+        for row_scores, row_ids in zip(scores, rows):
+            valid = row_ids >= 0
+            combined[row_ids[valid]] += row_scores[valid]
+        top_videos = min(top_videos, n_videos)
+        best = np.argpartition(-combined, top_videos - 1)[:top_videos]
+        best = best[np.argsort(-combined[best])]
+        return [self._video_ids[row] for row in best]
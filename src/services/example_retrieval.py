@@ -0,0 +1,136 @@
+"""
+Implements "more like this" retrieval from frames already in the FAISS index.
+"""
+
+from typing import List, Dict, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.repositories.load_faiss import ClipFaiss
+from src.repositories.frame_index import FrameIndex
+from src.utils.diversify import rank_indices
+
+
+class ExampleRetrieval:
+    """
+    Handles retrieval using the stored vectors of indexed keyframes as the query,
+    so no image is decoded or encoded.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        faiss: ClipFaiss,
+        data: Dict,
+        frame_index: FrameIndex
+    ) -> None:
+        """
+        Initializes the ExampleRetrieval class with the index and metadata.
+
+        Args:
+            top_k (int): The number of top results to retrieve.
+            faiss (ClipFaiss): An instance of the ClipFaiss class for performing FAISS.
+            data (Dict): A dictionary mapping indices to video and frame information.
+            frame_index (FrameIndex): The frame-order index used to resolve frames.
+        """
+        self._top_k = top_k
+        self._faiss = faiss
+        self._data = data
+        self._frame_index = frame_index
+
+    def swap_store(
+        self,
+        faiss: ClipFaiss,
+        data: Dict,
+        frame_index: FrameIndex
+    ) -> None:
+        """
+        Replaces the FAISS index and metadata used by subsequent requests.
+
+        Args:
+            faiss (ClipFaiss): The new FAISS index wrapper.
+            data (Dict): The new mapping of indices to video and frame information.
+            frame_index (FrameIndex): The new frame-order index.
+        """
+        self._faiss = faiss
+        self._data = data
+        self._frame_index = frame_index
+
+    @staticmethod
+    async def mean_vector(
+        faiss: ClipFaiss,
+        model_type: str,
+        indices: List[int]
+    ) -> torch.Tensor:
+        """
+        Averages the stored vectors of the given indices into one query vector.
+
+        Args:
+            faiss (ClipFaiss): The index wrapper to read vectors from.
+            model_type (str): The model whose vectors to read.
+            indices (List[int]): The indices to average.
+
+        Returns:
+            torch.Tensor: The normalized query vector of shape (1, d).
+        """
+        vectors = await faiss.reconstruct(
+            model_type=model_type,
+            indices=np.asarray(indices, dtype=np.int64)
+        )
+        query = torch.from_numpy(vectors).mean(dim=0, keepdim=True)
+        return F.normalize(query, dim=-1)
+
+    async def example_retrieval(
+        self,
+        model_type: str,
+        indices: Union[List[int], None] = None,
+        frames: Union[List[Dict], None] = None,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None
+    ) -> List[Dict]:
+        """
+        Retrieves keyframes similar to one or more indexed keyframes.
+
+        Several examples are averaged into a single query vector, which acts as
+        a simple relevance-feedback refinement.
+
+        Args:
+            model_type (str): The model whose index to search.
+            indices (List[int], optional): Example frames by FAISS indice.
+            frames (List[Dict], optional): Example frames by video_id and frame_id.
+            candidate_k (int, optional): The two-stage candidate pool size.
+            diversify (Dict, optional): Arguments for diversify_results.
+
+        Returns:
+            List[Dict]: A list of dictionaries containing the retrieval results.
+        """
+        faiss, data, frame_index = self._faiss, self._data, self._frame_index
+        examples = frame_index.resolve(
+            data=data,
+            indices=indices,
+            frames=frames
+        )
+        if not examples:
+            raise ValueError("At least one example frame is required")
+        query_vectors = await self.mean_vector(
+            faiss=faiss,
+            model_type=model_type,
+            indices=examples
+        )
+        scores, result = await faiss.search(
+            model_type=model_type,
+            top_k=self._top_k,
+            query_vectors=query_vectors,
+            candidate_k=candidate_k
+        )
+        result = await rank_indices(
+            faiss=faiss,
+            model_type=model_type,
+            data=data,
+            scores=scores[0],
+            indices=result[0],
+            diversify=diversify
+        )
+        return [data[indice] for indice in result if indice in data]
@@ -0,0 +1,239 @@
+"""
+Implements session-scoped Rocchio relevance feedback on top of CLIP text search.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Union
+
+import numpy as np
+import torch
+
+from src.modules.model_registry import ModelRegistry
+from src.repositories.load_faiss import ClipFaiss
+from src.repositories.frame_index import FrameIndex
+from src.utils.memory import deep_sizeof
+
+
+class FeedbackRetrieval:
+    """
+    Keeps the latest query vector of each feedback session server-side and
+    refines it with the stored vectors of frames marked relevant or not,
+    so follow-up searches never run the text encoder.
+    """
+
+    def __init__(
+        self,
+        top_k: int,
+        models: ModelRegistry,
+        faiss: ClipFaiss,
+        data: Dict,
+        frame_index: FrameIndex,
+        max_sessions: int = 256,
+        session_ttl: float = 1800.0
+    ) -> None:
+        """
+        Initializes the FeedbackRetrieval class.
+
+        Args:
+            top_k (int): The number of top results to retrieve.
+            models (ModelRegistry): The registry the encoders are looked up in.
+            faiss (ClipFaiss): An instance of the ClipFaiss class for performing FAISS.
+            data (Dict): A dictionary mapping indices to video and frame information.
+            frame_index (FrameIndex): The frame-order index used to resolve frames.
+            max_sessions (int): The maximum number of live sessions; the least
+                recently used session is evicted beyond it.
+            session_ttl (float): Seconds of inactivity after which a session expires.
+        """
+        self._top_k = top_k
+        self._models = models
+        self._faiss = faiss
+        self._data = data
+        self._frame_index = frame_index
+        self._max_sessions = max_sessions
+        self._session_ttl = session_ttl
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def swap_store(
+        self,
+        faiss: ClipFaiss,
+        data: Dict,
+        frame_index: FrameIndex
+    ) -> None:
+        """
+        Replaces the FAISS index and metadata used by subsequent requests.
+
+        Args:
+            faiss (ClipFaiss): The new FAISS index wrapper.
+            data (Dict): The new mapping of indices to video and frame information.
+            frame_index (FrameIndex): The new frame-order index.
+        """
+        self._faiss = faiss
+        self._data = data
+        self._frame_index = frame_index
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Returns the estimated bytes held by the live feedback sessions.
+        """
+        return deep_sizeof(self._sessions)
+
+    def _evict(self) -> None:
+        """
+        Drops expired sessions, then the least recently used ones over the limit.
+        """
+        deadline = time.monotonic() - self._session_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session["updated_at"] >= deadline and len(self._sessions) <= self._max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def _get_session(
+        self,
+        session_id: str
+    ) -> Dict:
+        """
+        Returns a live session and marks it as recently used.
+
+        Raises:
+            KeyError: If the session does not exist or has expired.
+        """
+        self._evict()
+        session = self._sessions[session_id]
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def _search(
+        self,
+        faiss: ClipFaiss,
+        data: Dict,
+        model_type: str,
+        query: np.ndarray
+    ) -> List[Dict]:
+        """
+        Searches with a session's query vector and maps the hits.
+        """
+        _, indices = await faiss.search(
+            model_type=model_type,
+            top_k=self._top_k,
+            query_vectors=torch.from_numpy(query)
+        )
+        return [data[indice] for indice in indices[0] if indice in data]
+
+    async def start_session(
+        self,
+        model_type: str,
+        text: str
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Encodes a text query once, stores it in a new session and searches.
+
+        Args:
+            model_type (str): The model to encode and search with.
+            text (str): The text query.
+
+        Returns:
+            Tuple[str, List[Dict]]: The session id and the retrieval results.
+        """
+        faiss, data = self._faiss, self._data
+        encoder = await self._models.get(model_type)
+        vector_embedding = await encoder.text_embedding(text=text)
+        query = np.ascontiguousarray(
+            vector_embedding.detach().float().cpu().numpy(), dtype=np.float32
+        )
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = {
+            "model_type": model_type,
+            "query": query,
+            "updated_at": time.monotonic()
+        }
+        self._evict()
+        result = await self._search(faiss, data, model_type, query)
+        return session_id, result
+
+    async def _mean_vector(
+        self,
+        faiss: ClipFaiss,
+        model_type: str,
+        indices: List[int]
+    ) -> Union[np.ndarray, None]:
+        """
+        Averages the stored vectors of the given indices, or None if empty.
+        """
+        if not indices:
+            return None
+        vectors = await faiss.reconstruct(
+            model_type=model_type,
+            indices=np.asarray(indices, dtype=np.int64)
+        )
+        return vectors.mean(axis=0, keepdims=True)
+
+    async def give_feedback(
+        self,
+        session_id: str,
+        positive: Union[List[int], None] = None,
+        negative: Union[List[int], None] = None,
+        positive_frames: Union[List[Dict], None] = None,
+        negative_frames: Union[List[Dict], None] = None,
+        alpha: float = 1.0,
+        beta: float = 0.75,
+        gamma: float = 0.15
+    ) -> List[Dict]:
+        """
+        Applies a Rocchio update to the session query and searches again.
+
+        ``q = alpha * q + beta * mean(positive) - gamma * mean(negative)``,
+        re-normalized; frame vectors are read from the index.
+
+        Args:
+            session_id (str): The session to refine.
+            positive (List[int], optional): Relevant frames by indice.
+            negative (List[int], optional): Non-relevant frames by indice.
+            positive_frames (List[Dict], optional): Relevant frames by video_id/frame_id.
+            negative_frames (List[Dict], optional): Non-relevant frames by video_id/frame_id.
+            alpha (float): The weight of the current query.
+            beta (float): The weight of the relevant centroid.
+            gamma (float): The weight of the non-relevant centroid.
+
+        Returns:
+            List[Dict]: The retrieval results of the refined query.
+
+        Raises:
+            KeyError: If the session is unknown or expired, or a frame is not indexed.
+        """
+        faiss, data, frame_index = self._faiss, self._data, self._frame_index
+        session = self._get_session(session_id)
+        model_type = session["model_type"]
+
+        query = alpha * session["query"]
+        positive_mean = await self._mean_vector(
+            faiss, model_type, frame_index.resolve(data, positive, positive_frames)
+        )
+        negative_mean = await self._mean_vector(
+            faiss, model_type, frame_index.resolve(data, negative, negative_frames)
+        )
+        if positive_mean is not None:
+            query = query + beta * positive_mean
+        if negative_mean is not None:
+            query = query - gamma * negative_mean
+        norm = np.linalg.norm(query, axis=-1, keepdims=True)
+        query = np.ascontiguousarray(query / np.maximum(norm, 1e-12), dtype=np.float32)
+
+        session["query"] = query
+        session["updated_at"] = time.monotonic()
+        return await self._search(faiss, data, model_type, query)
+
+    async def close_session(
+        self,
+        session_id: str
+    ) -> None:
+        """
+        Discards a session.
+
+        Args:
+            session_id (str): The session to discard.
+        """
+        self._sessions.pop(session_id, None)
@@ -2,12 +2,35 @@
 Implements text retrieval using CLIP embeddings and FAISS index.
 """
 
+import asyncio
 from io import BytesIO
-from typing import List, Dict
+from typing import List, Dict, Union
 
-from src.modules.apple_clip import AppleCLIP
-from src.modules.laion_clip import LaionCLIP
+from torch import Tensor
+
+from src.modules.model_registry import ModelRegistry
 from src.repositories.load_faiss import ClipFaiss
+from src.utils.diversify import rank_indices
+from src.utils.embedding_cache import (EmbeddingCache,
+                                       content_hash,
+                                       difference_hash)
+from src.utils.image_decode import decode_executor, open_reduced
+
+# dHash reads a 9x8 thumbnail, so the upload only needs decoding to this size
+DHASH_DECODE_SIZE = 64
+
+
+def perceptual_hash(contents: bytes) -> int:
+    """
+    Decodes an upload at reduced scale and returns its difference_hash.
+
+    Args:
+        contents (bytes): The raw upload.
+
+    Returns:
+        int: The dHash of the image.
+    """
+    return difference_hash(open_reduced(BytesIO(contents), DHASH_DECODE_SIZE))
 
 
 class ImageClipRetrieval:
@@ -18,24 +41,48 @@ class ImageClipRetrieval:
     def __init__(
         self,
         top_k: int,
-        apple_clip: AppleCLIP,
-        laion_clip: LaionCLIP,
+        models: ModelRegistry,
         faiss: ClipFaiss,
-        data: Dict
+        data: Dict,
+        embedding_cache: Union[EmbeddingCache, None] = None
     ) -> None:
         """
         Initializes the ClipSearch class with the provided CLIP models, FAISS index, and data.
 
         Args:
             top_k (int): The number of top search results to return.
-            apple_clip (AppleCLIP): An instance of the AppleCLIP model for generating embeddings.
-            laion_clip (LaionCLIP): An instance of the LaionCLIP model for generating embeddings.
+            models (ModelRegistry): The registry the encoders are looked up in.
             faiss (ClipFaiss): An instance of the ClipFaiss class for performing FAISS
             data (Dict): A dictionary mapping indices to video and frame information.
+            embedding_cache (EmbeddingCache, optional): A cache of upload embeddings.
         """
         self._top_k = top_k
-        self._apple_clip = apple_clip
-        self._laion_clip = laion_clip
+        self._models = models
+        self._faiss = faiss
+        self._data = data
+        self._embedding_cache = embedding_cache
+
+    @property
+    def embedding_cache(self) -> Union[EmbeddingCache, None]:
+        """
+        Returns the upload embedding cache, if enabled.
+        """
+        return self._embedding_cache
+
+    def swap_store(
+        self,
+        faiss: ClipFaiss,
+        data: Dict
+    ) -> None:
+        """
+        Replaces the FAISS index and metadata used by subsequent requests.
+
+        Requests already in flight keep the pair they captured when they started.
+
+        Args:
+            faiss (ClipFaiss): The new FAISS index wrapper.
+            data (Dict): The new mapping of indices to video and frame information.
+        """
         self._faiss = faiss
         self._data = data
 
@@ -57,62 +104,130 @@ class ImageClipRetrieval:
         filtered_list = [data[indice] for indice in indices if indice in data]
         return filtered_list
 
-    async def apple_image_retrieval(
+    async def embed_image(
         self,
+        model_type: str,
         image: BytesIO
+    ) -> Tensor:
+        """
+        Embeds an uploaded image, answering repeated uploads from the cache.
+
+        The content hash is checked before any decoding; the perceptual tier,
+        when enabled, decodes the image but still skips the encoder.
+
+        Args:
+            model_type (str): The registered model to encode with.
+            image (BytesIO): The uploaded image.
+
+        Returns:
+            Tensor: The image embedding.
+        """
+        cache = self._embedding_cache
+        if cache is None:
+            encoder = await self._models.get(model_type)
+            return await encoder.image_embedding(image=image)
+        contents = image.getvalue()
+        digest = content_hash(contents)
+        vector = cache.get_exact(model_type, digest)
+        if vector is not None:
+            return vector
+        dhash = None
+        if cache.perceptual:
+            dhash = await asyncio.get_running_loop().run_in_executor(
+                decode_executor(), perceptual_hash, contents
+            )
+            vector = cache.get_similar(model_type, dhash)
+            if vector is not None:
+                cache.put(model_type, digest, vector)
+                return vector
+        cache.record_miss()
+        encoder = await self._models.get(model_type)
+        vector = await encoder.image_embedding(image=BytesIO(contents))
+        cache.put(model_type, digest, vector, dhash)
+        return vector
+
+    async def model_image_retrieval(
+        self,
+        model_type: str,
+        image: BytesIO,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None
     ) -> List[Dict]:
         """
-        Retrieves text data using the apple CLIP model.
+        Retrieves keyframes similar to an image using a registered CLIP model.
 
         Args:
-            text (str): The input text to retrieve data for.
+            model_type (str): The registered model to encode and search with.
+            image (BytesIO): The uploaded image.
+            candidate_k (int, optional): The two-stage candidate pool size.
+            diversify (Dict, optional): Arguments for diversify_results.
 
         Returns:
             List[Dict]: A list of dictionaries containing the retrieval results.
         """
-        vector_embedding = await self._apple_clip.image_embedding(
+        faiss, data = self._faiss, self._data
+        vector_embedding = await self.embed_image(
+            model_type=model_type,
             image=image
         )
-        indices = await self._faiss.apple_search(
+        scores, indices = await faiss.search(
+            model_type=model_type,
             top_k=self._top_k,
-            query_vectors=vector_embedding
+            query_vectors=vector_embedding,
+            candidate_k=candidate_k
         )
         result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
+            data=data,
+            indices=await rank_indices(
+                faiss=faiss,
+                model_type=model_type,
+                data=data,
+                scores=scores[0],
+                indices=indices[0],
+                diversify=diversify
+            )
         )
         return result
 
-    async def laion_image_retrieval(
+    async def batch_image_retrieval(
         self,
-        image: BytesIO
-    ) -> List[Dict]:
+        model_type: str,
+        images: List,
+        candidate_k: Union[int, None] = None
+    ) -> List[List[Dict]]:
         """
-        Retrieves text data using the laion CLIP model.
+        Retrieves keyframes for many images with one encoder forward and one search.
+
+        Images are decoded concurrently in the decode pool and bypass the
+        upload embedding cache.
 
         Args:
-            text (str): The input text to retrieve data for.
+            model_type (str): The registered model to encode and search with.
+            images (List): Paths or binary file-like objects.
+            candidate_k (int, optional): The two-stage candidate pool size.
 
         Returns:
-            List[Dict]: A list of dictionaries containing the retrieval results.
+            List[List[Dict]]: The ranked keyframes of each image.
         """
-        vector_embedding = await self._laion_clip.image_embedding(
-            image=image
-        )
-        indices = await self._faiss.laion_search(
+        if model_type not in self._models:
+            raise ValueError(f"Model type not supported: {model_type}")
+        faiss, data = self._faiss, self._data
+        encoder = await self._models.get(model_type)
+        vectors = await encoder.image_embedding_files(images)
+        _, indices = await faiss.search(
+            model_type=model_type,
             top_k=self._top_k,
-            query_vectors=vector_embedding
-        )
-        result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
+            query_vectors=vectors,
+            candidate_k=candidate_k
         )
-        return result
+        return [await self.mapping_results(data=data, indices=row) for row in indices]
 
     async def image_retrieval(
         self,
         model_type: str,
-        image: BytesIO
+        image: BytesIO,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None
     ) -> List[Dict]:
         """
         Retrieves text data based on the specified model type.
@@ -120,18 +235,20 @@ class ImageClipRetrieval:
         Args:
             model_type (str): The type of model to use for retrieval.
             text (str): The input text to retrieve data for.
+            candidate_k (int, optional): The two-stage candidate pool size.
+            diversify (Dict, optional): Arguments for diversify_results.
 
         Returns:
             List[Dict]: A list of dictionaries containing the retrieval results.
+
+        Raises:
+            ValueError: If the model type is not registered.
         """
-        if model_type == "apple_clip":
-            return await self.apple_image_retrieval(
-                image=image
-            )
-        if model_type == "laion_clip":
-            return await self.laion_image_retrieval(
-                image=image
-            )
-        return {
-            "error": "Model type not supported"
-        }
+        if model_type not in self._models:
+            raise ValueError(f"Model type not supported: {model_type}")
+        return await self.model_image_retrieval(
+            model_type=model_type,
+            image=image,
+            candidate_k=candidate_k,
+            diversify=diversify
+        )
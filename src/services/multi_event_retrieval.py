@@ -1,10 +1,15 @@
 """
 """
 
-from typing import List, Dict, Union
-from src.modules.apple_clip import AppleCLIP
-from src.modules.laion_clip import LaionCLIP
+import asyncio
+from typing import List, Dict, Set, Tuple, Union
+import numpy as np
+from src.modules.model_registry import ModelRegistry
 from src.repositories.load_faiss import ClipFaiss
+from src.repositories.frame_index import FrameIndex
+from src.utils.utility import frame_number
+from src.utils.event_sequence import rank_event_chains
+from src.utils.single_flight import SingleFlight
 
 
 class MultiEventRetrieval:
@@ -14,150 +19,329 @@ class MultiEventRetrieval:
     def __init__(
         self,
         top_k: int,
-        apple_clip: AppleCLIP,
-        laion_clip: LaionCLIP,
+        models: ModelRegistry,
         faiss: ClipFaiss,
-        data: Dict
+        data: Dict,
+        frame_index: Union[FrameIndex, None] = None
     ) -> None:
         """
         """
         self._top_k = top_k
-        self._apple_clip = apple_clip
-        self._laion_clip = laion_clip
+        self._models = models
         self._faiss = faiss
         self._data = data
+        self._frame_index = frame_index
+        self._single_flight = SingleFlight()
 
-    async def mapping_results(
+    def swap_store(
         self,
+        faiss: ClipFaiss,
         data: Dict,
-        indices: List[int]
-    ) -> List:
+        frame_index: Union[FrameIndex, None] = None
+    ) -> None:
         """
+        Replaces the FAISS index and metadata used by subsequent requests.
         """
-        filtered_list = [data[indice] for indice in indices if indice in data]
-        return filtered_list
+        self._faiss = faiss
+        self._data = data
+        self._frame_index = frame_index
 
-    async def apple_text_retrieval(
+    async def mapping_scored_results(
         self,
-        text: str
-    ) -> List[Dict]:
+        data: Dict,
+        indices: List[int],
+        scores: List[float]
+    ) -> Tuple[List[Dict], List[float]]:
         """
+        Maps indices to their metadata, keeping the score of every mapped hit.
         """
-        vector_embedding = await self._apple_clip.text_embedding(
-            text=text
-        )
-        indices = await self._faiss.apple_search(
-            top_k=self._top_k,
-            query_vectors=vector_embedding
-        )
-        result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
-        )
-        return result
+        pairs = [
+            (data[indice], score) for indice, score in zip(indices, scores) if indice in data
+        ]
+        return [hit for hit, _ in pairs], [score for _, score in pairs]
 
-    async def laion_text_retrieval(
+    async def model_text_retrieval(
         self,
+        model_type: str,
         text: str
-    ) -> List[Dict]:
+    ) -> Tuple[List[Dict], List[float]]:
         """
+        Searches one event and returns its hits with their similarities.
         """
-        vector_embedding = await self._laion_clip.text_embedding(
+        faiss, data = self._faiss, self._data
+        encoder = await self._models.get(model_type)
+        vector_embedding = await encoder.text_embedding(
             text=text
         )
-        indices = await self._faiss.laion_search(
+        scores, indices = await faiss.search(
+            model_type=model_type,
             top_k=self._top_k,
             query_vectors=vector_embedding
         )
-        result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
+        return await self.mapping_scored_results(
+            data=data,
+            indices=indices[0],
+            scores=scores[0]
         )
-        return result
 
     async def text_retrieval(
         self,
         model_type: str,
         text: str
-    ) -> List[Dict]:
+    ) -> Tuple[List[Dict], List[float]]:
         """
+        Concurrent identical event queries share a single encoder call and search.
         """
-        if model_type == "apple_clip":
-            return await self.apple_text_retrieval(
-                text=text
-            )
-        elif model_type == "laion_clip":
-            return await self.laion_text_retrieval(
-                text=text
-            )
-        else:
-            return {
-                "error": "Model type not supported"
-            }
+        return await self._single_flight.do(
+            (model_type, text, self._top_k),
+            lambda: self._text_retrieval(model_type=model_type, text=text)
+        )
 
-    async def find_common_elements_by_field(
+    async def _text_retrieval(
         self,
-        list_event: List[Dict],
+        model_type: str,
+        text: str
+    ) -> Tuple[List[Dict], List[float]]:
+        """
+        """
+        if model_type not in self._models:
+            raise ValueError("Model type not supported")
+        return await self.model_text_retrieval(
+            model_type=model_type,
+            text=text
+        )
+
+    @staticmethod
+    def latest_frames(
+        hits: List[Dict],
+        field: str = "video_id",
+        frame_field: str = "frame_id"
+    ) -> Dict[str, int]:
+        """
+        Reduces a hit list to the latest frame number seen in each video.
+
+        An item of another list follows a hit in the same video exactly when
+        that video's latest frame is after the hit, so this map is all the
+        sequence join needs from every list but the first.
+        """
+        latest = {}
+        for hit in hits:
+            number = frame_number(hit[frame_field])
+            if number > latest.get(hit[field], -1):
+                latest[hit[field]] = number
+        return latest
+
+    @staticmethod
+    def join_latest_frames(
+        base_list: List[Dict],
+        latest_frames: List[Dict[str, int]],
         field: str = "video_id",
         frame_field: str = "frame_id"
     ) -> List[Dict]:
         """
-        Tìm các đối tượng có cùng giá trị video_id trong list đầu tiên và xuất hiện trong n-1 list còn lại.
-        Chỉ thêm vào danh sách kết quả nếu phần tử có mặt trong tất cả các danh sách còn lại.
+        Keeps the base hits followed, in the same video, by a hit of every other list.
         """
-        base_list = list_event[0]  # Danh sách cơ sở (list đầu tiên)
-        common_elements = []
+        return [
+            item for item in base_list
+            if all(
+                frame_number(item[frame_field]) < latest.get(item[field], -1)
+                for latest in latest_frames
+            )
+        ]
 
-        def extract_frame_number(frame_id: str) -> int:
-            """Chuyển frame_id thành số nguyên để so sánh."""
-            return int(frame_id.split('.')[0])
+    @staticmethod
+    def compact_hits(
+        hits: List[Dict]
+    ) -> Tuple[List[Dict], Set[Tuple[str, str]], Dict[str, int]]:
+        """
+        Normalizes OCR/ASR hits to keyframe ids with extension and a keyed form.
 
-        for item in base_list:
-            video_id_value = item[field]  # Lấy video_id từ phần tử hiện tại
-            frame_id_value = extract_frame_number(
-                item[frame_field])  # Lấy frame_id dưới dạng số nguyên
+        Args:
+            hits (List[Dict]): Hits with 'video_id' and 'frame_id' (extension optional).
 
-            # Kiểm tra xem phần tử hiện tại có trong tất cả các list khác không
-            in_all_other_lists = all(
-                any(
-                    d[field] == video_id_value and extract_frame_number(
-                        d[frame_field]) > frame_id_value
-                    for d in lst
-                )
-                for lst in list_event[1:]
-            )
+        Returns:
+            Tuple: The normalized hits, their (video_id, frame_id) keys and the
+            latest frame number per video.
+        """
+        items = []
+        keys = set()
+        for hit in hits:
+            frame_id = str(hit['frame_id'])
+            if '.' not in frame_id:
+                frame_id = f"{frame_id}.jpg"
+            key = (hit['video_id'], frame_id)
+            if key not in keys:
+                keys.add(key)
+                items.append({'video_id': key[0], 'frame_id': key[1]})
+        return items, keys, MultiEventRetrieval.latest_frames(items)
 
-            # Chỉ thêm phần tử vào danh sách kết quả nếu nó có mặt trong tất cả các danh sách khác
-            if in_all_other_lists:
-                common_elements.append(item)
+    async def rank_event_sequences(
+        self,
+        list_event: List[Tuple[List[Dict], List[float]]],
+        max_gap: Union[int, None] = None,
+        top_chains: Union[int, None] = None
+    ) -> List[Dict]:
+        """
+        Ranks videos' ordered chains of event hits and returns their first-event keyframes.
 
-        # Giới hạn kết quả trả về (nếu cần thiết)
-        half_size = len(common_elements) // 100
-        return common_elements[:half_size] if half_size > 0 else common_elements
+        Args:
+            list_event (List[Tuple[List[Dict], List[float]]]): The hits and
+                similarities of each event, in event order.
+            max_gap (int, optional): The largest frame distance between consecutive events.
+            top_chains (int, optional): The number of chains kept, top_k by default.
+
+        Returns:
+            List[Dict]: The first keyframe of each chain, best chain first.
+        """
+        chains = await asyncio.to_thread(
+            rank_event_chains,
+            event_hits=[hits for hits, _ in list_event],
+            event_scores=[scores for _, scores in list_event],
+            top_k=top_chains or self._top_k,
+            max_gap=max_gap
+        )
+        return [hits[0] for _, hits in chains]
+
+    async def coarse_to_fine_search(
+        self,
+        model_type: str,
+        list_event: List[str],
+        top_videos: int
+    ) -> List[Tuple[List[Dict], List[float]]]:
+        """
+        Searches every event only among the keyframes of the best videos.
+
+        Videos are ranked once against all event embeddings with the centroid
+        index, so each event is scored against a few thousand keyframes
+        instead of the whole corpus.
+
+        Args:
+            model_type (str): The model to encode and search with.
+            list_event (List[str]): The event descriptions, in order.
+            top_videos (int): The number of videos kept after the coarse stage.
+
+        Returns:
+            List[Tuple[List[Dict], List[float]]]: The ranked keyframes of each
+            event and their similarities.
+        """
+        faiss, data, frame_index = self._faiss, self._data, self._frame_index
+        encoder = await self._models.get(model_type)
+        query_vectors = await encoder.text_embedding_batch(texts=list_event)
+        videos = await faiss.search_videos(
+            model_type=model_type,
+            query_vectors=query_vectors,
+            top_videos=top_videos
+        )
+        candidates = np.concatenate(
+            [
+                frame_index.video_indices(video_id)
+                for video_id in videos if video_id in frame_index
+            ]
+            or [np.empty(0, dtype=np.int64)]
+        )
+        scores, indices = await faiss.search_within(
+            model_type=model_type,
+            top_k=self._top_k,
+            query_vectors=query_vectors,
+            indices=candidates
+        )
+        return [
+            await self.mapping_scored_results(data=data, indices=row, scores=row_scores)
+            for row, row_scores in zip(indices, scores)
+        ]
 
     async def multi_event_search(
         self,
         model_type: str,
-        list_event: List[str]
+        list_event: List[str],
+        top_videos: Union[int, None] = None,
+        max_gap: Union[int, None] = None,
+        top_chains: Union[int, None] = None
     ) -> List[Dict]:
-        list_result = []
-        for event in list_event:
-            result = await self.text_retrieval(
+        """
+        Finds videos showing the events in order, ranked by their best chain of hits.
+
+        Args:
+            model_type (str): The model to encode and search with.
+            list_event (List[str]): The event descriptions, in order.
+            top_videos (int, optional): Search only the best videos' keyframes.
+            max_gap (int, optional): The largest frame distance between consecutive events.
+            top_chains (int, optional): The number of chains returned.
+
+        Returns:
+            List[Dict]: The first keyframe of each chain, best chain first.
+        """
+        if top_videos and self._frame_index is not None \
+                and self._faiss.has_video_index(model_type):
+            list_result = await self.coarse_to_fine_search(
                 model_type=model_type,
-                text=event
+                list_event=list_event,
+                top_videos=top_videos
             )
-            list_result.append(result)
-        result = await self.find_common_elements_by_field(
+        else:
+            list_result = []
+            for event in list_event:
+                result = await self.text_retrieval(
+                    model_type=model_type,
+                    text=event
+                )
+                list_result.append(result)
+        return await self.rank_event_sequences(
             list_event=list_result,
-            field="video_id"
+            max_gap=max_gap,
+            top_chains=top_chains
+        )
+
+    async def batch_multi_event_search(
+        self,
+        model_type: str,
+        list_events: List[List[str]],
+        max_gap: Union[int, None] = None,
+        top_chains: Union[int, None] = None
+    ) -> List[List[Dict]]:
+        """
+        Runs several multi-event queries with one encoder forward and one search.
+
+        Args:
+            model_type (str): The model to encode and search with.
+            list_events (List[List[str]]): The events of each query, in order.
+            max_gap (int, optional): The largest frame distance between consecutive events.
+            top_chains (int, optional): The number of chains returned per query.
+
+        Returns:
+            List[List[Dict]]: The first keyframes of each query's best chains.
+        """
+        if model_type not in self._models:
+            raise ValueError(f"Model type not supported: {model_type}")
+        faiss, data = self._faiss, self._data
+        encoder = await self._models.get(model_type)
+        texts = [event for events in list_events for event in events]
+        vectors = await encoder.text_embedding_batch(texts)
+        scores, indices = await faiss.search(
+            model_type=model_type,
+            top_k=self._top_k,
+            query_vectors=vectors
         )
-        return result
+        hits = [
+            await self.mapping_scored_results(data=data, indices=row, scores=row_scores)
+            for row, row_scores in zip(indices, scores)
+        ]
+        results = []
+        offset = 0
+        for events in list_events:
+            results.append(await self.rank_event_sequences(
+                list_event=hits[offset:offset + len(events)],
+                max_gap=max_gap,
+                top_chains=top_chains
+            ))
+            offset += len(events)
+        return results
 
     async def prioritize_results(
         self,
         result: List[Dict],
-        list_ocr: List[Dict],
-        list_asr: List[Dict],
+        asr_keys: Set[Tuple[str, str]],
+        ocr_keys: Set[Tuple[str, str]],
         priority: List[str]
     ) -> List[Dict]:
         """
@@ -168,21 +352,17 @@ class MultiEventRetrieval:
             if item == 'asr':
                 prioritized_results.extend(
                     [
-                        r for r in result if r in list_asr
+                        r for r in result if (r['video_id'], r['frame_id']) in asr_keys
                     ]
                 )
             elif item == 'ocr':
                 prioritized_results.extend(
                     [
-                        r for r in result if r in list_ocr
+                        r for r in result if (r['video_id'], r['frame_id']) in ocr_keys
                     ]
                 )
             elif item == 'clip':
-                prioritized_results.extend(
-                    [
-                        r for r in result if r in result
-                    ]
-                )
+                prioritized_results.extend(result)
         return prioritized_results
 
     async def multi_event_search_with_non_text(
@@ -192,17 +372,20 @@ class MultiEventRetrieval:
         priority: Union[List[str], None] = None
     ) -> List[Dict]:
         """
+        Intersects OCR and ASR hits by keyframe, ordered by priority.
         """
-        ocr_set = {tuple(item.items()) for item in list_ocr}
-        asr_set = {tuple(item.items()) for item in list_asr}
-        intersection = ocr_set.intersection(asr_set)
-        result = [dict(item) for item in intersection]
+        ocr_items, ocr_keys, _ = self.compact_hits(list_ocr or [])
+        _, asr_keys, _ = self.compact_hits(list_asr or [])
+        result = [
+            item for item in ocr_items
+            if (item['video_id'], item['frame_id']) in asr_keys
+        ]
 
         prioritized_results = await self.prioritize_results(
             result=result,
-            list_ocr=list_ocr,
-            list_asr=list_asr,
-            priority=priority
+            asr_keys=asr_keys,
+            ocr_keys=ocr_keys,
+            priority=priority or []
         )
         return prioritized_results
 
@@ -215,48 +398,45 @@ class MultiEventRetrieval:
         priority: Union[List[str], None] = None
     ) -> List[Dict]:
         """
+        Joins CLIP text hits with OCR/ASR hits in priority order.
+
+        The OCR/ASR payloads are handed to worker threads, which normalize
+        them into hit lists plus per-video latest frames while the CLIP search
+        runs; the sequence join is then a single pass over the first list.
         """
-        combine = []
-        result_clip = await self.text_retrieval(
-            model_type=model_type,
-            text=text
+        if not list_asr and not list_ocr:
+            return []
+        loop = asyncio.get_running_loop()
+        # run_in_executor submits at once; the encoder holds the event loop
+        # until its first await, so tasks created alongside it would only
+        # start afterwards
+        normalizing = asyncio.gather(
+            loop.run_in_executor(None, self.compact_hits, list_ocr or []),
+            loop.run_in_executor(None, self.compact_hits, list_asr or [])
         )
-        if list_asr and list_ocr:
-            for item in priority:
-                if item == 'asr':
-                    combine.append(list_asr)
-                elif item == 'ocr':
-                    combine.append(list_ocr)
-                elif item == 'clip':
-                    combine.append(result_clip)
-            result = await self.find_common_elements_by_field(
-                list_event=combine,
-                field="video_id"
-            )
-            return result
-        elif list_asr:
-            for item in priority:
-                if item == 'asr':
-                    combine.append(list_asr)
-                elif item == 'clip':
-                    combine.append(result_clip)
-            print("pass cluster")
-            result = await self.find_common_elements_by_field(
-                list_event=combine,
-                field="video_id"
-            )
-            print("pass cluster 2")
-            return result
-        elif list_ocr:
-            for item in priority:
-                if item == 'ocr':
-                    combine.append(list_ocr)
-                elif item == 'clip':
-                    combine.append(result_clip)
-            result = await self.find_common_elements_by_field(
-                list_event=combine,
-                field="video_id"
+        try:
+            result_clip, _ = await self.text_retrieval(
+                model_type=model_type,
+                text=text
             )
-            return result
-        else:
+        except BaseException:
+            normalizing.cancel()
+            raise
+        (ocr_items, _, ocr_latest), (asr_items, _, asr_latest) = await normalizing
+        sources = {'clip': (result_clip, None)}
+        if list_ocr:
+            sources['ocr'] = (ocr_items, ocr_latest)
+        if list_asr:
+            sources['asr'] = (asr_items, asr_latest)
+        combine = [sources[item] for item in priority or [] if item in sources]
+        if not combine:
             return []
+        common_elements = self.join_latest_frames(
+            base_list=combine[0][0],
+            latest_frames=[
+                latest if latest is not None else self.latest_frames(hits)
+                for hits, latest in combine[1:]
+            ]
+        )
+        half_size = len(common_elements) // 100
+        return common_elements[:half_size] if half_size > 0 else common_elements
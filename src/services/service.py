@@ -2,26 +2,45 @@
 Service class for initializing and managing the CLIP retrieval system.
 """
 
-# import os
+import asyncio
+import gc
+import logging
+import os
+import time
+from typing import Dict, List, Tuple, Union
 from dotenv import load_dotenv
 import torch
-from open_clip import (create_model_from_pretrained,
-                       get_tokenizer)
 from transformers import (CLIPProcessor,
                           AutoTokenizer,
                           CLIPModel)
 
-# from src.utils.utility import convert_value
+from src.utils.utility import convert_value
 from src.modules.apple_clip import AppleCLIP
 from src.modules.laion_clip import LaionCLIP
+from src.modules.base_clip import BaseCLIP
+from src.modules.model_registry import (ModelRegistry,
+                                        open_clip_loader)
+from src.inference.client import (InferenceClient,
+                                  RemoteEncoder,
+                                  RemoteFaiss)
 from src.repositories.load_faiss import ClipFaiss
 from src.repositories.load_json import LoadJson
 from src.services.text_clip_retrieval import TextClipRetrieval
 from src.services.image_clip_retrieval import ImageClipRetrieval
 from src.services.multi_event_retrieval import MultiEventRetrieval
+from src.services.temporal_retrieval import TemporalRetrieval
+from src.services.example_retrieval import ExampleRetrieval
+from src.services.feedback_retrieval import FeedbackRetrieval
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.memory import (deep_sizeof,
+                              process_memory,
+                              profile_allocations)
+from src.utils.prompt_ensemble import PromptEnsemble
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 APPLE_CLIP_MODEL = "hf-hub:apple/DFN5B-CLIP-ViT-H-14-378"
 APPLE_CLIP_TOKENIZER = "ViT-H-14"
 LAION_CLIP_MODEL = "hf-hub:laion/CLIP-ViT-g-14-laion2B-s12B-b42K"
@@ -30,6 +49,36 @@ APPLE_FAISS = "/kaggle/input/apple-clip/apple.faiss"
 LAION_FAISS = "/kaggle/input/faiss-database/laion.faiss"
 JSON_CLIP = "/kaggle/input/json-clip/clip.json"
 TOP_K = 1500
+APPLE_RERANK = os.getenv("APPLE_RERANK")
+LAION_RERANK = os.getenv("LAION_RERANK")
+APPLE_CANDIDATE_K = convert_value(os.getenv("APPLE_CANDIDATE_K", "0"))
+LAION_CANDIDATE_K = convert_value(os.getenv("LAION_CANDIDATE_K", "0"))
+APPLE_SHARD_DIR = os.getenv("APPLE_SHARD_DIR")
+LAION_SHARD_DIR = os.getenv("LAION_SHARD_DIR")
+APPLE_VIDEO_INDEX = os.getenv("APPLE_VIDEO_INDEX")
+LAION_VIDEO_INDEX = os.getenv("LAION_VIDEO_INDEX")
+CLIP_DEVICE = os.getenv("CLIP_DEVICE")
+APPLE_FAISS_GPU = convert_value(os.getenv("APPLE_FAISS_GPU", "1"))
+FAISS_MMAP = convert_value(os.getenv("FAISS_MMAP", "false"))
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET")
+APPLE_CLIP_DEVICE = os.getenv("APPLE_CLIP_DEVICE")
+LAION_CLIP_DEVICE = os.getenv("LAION_CLIP_DEVICE")
+APPLE_CLIP_MEMORY = convert_value(os.getenv("APPLE_CLIP_MEMORY", "3950"))
+LAION_CLIP_MEMORY = convert_value(os.getenv("LAION_CLIP_MEMORY", "5470"))
+MODEL_MEMORY_BUDGET = convert_value(os.getenv("MODEL_MEMORY_BUDGET", "0"))
+MODEL_PRELOAD = convert_value(os.getenv("MODEL_PRELOAD", "true"))
+EXTRA_MODELS = convert_value(os.getenv("EXTRA_MODELS", "[]"))
+IMAGE_CACHE_SIZE = convert_value(os.getenv("IMAGE_CACHE_SIZE", "1024"))
+IMAGE_CACHE_PERCEPTUAL = convert_value(os.getenv("IMAGE_CACHE_PERCEPTUAL", "false"))
+IMAGE_CACHE_DISTANCE = convert_value(os.getenv("IMAGE_CACHE_DISTANCE", "4"))
+PROMPT_TEMPLATES = convert_value(os.getenv("PROMPT_TEMPLATES", "[]"))
+PROMPT_CACHE_SIZE = convert_value(os.getenv("PROMPT_CACHE_SIZE", "4096"))
+ENCODER_INFERENCE_MODE = convert_value(os.getenv("ENCODER_INFERENCE_MODE", "false"))
+ENCODER_COMPILE = os.getenv("ENCODER_COMPILE")
+ENCODER_CHANNELS_LAST = convert_value(os.getenv("ENCODER_CHANNELS_LAST", "false"))
+ENCODER_WARMUP = convert_value(os.getenv("ENCODER_WARMUP", "[]"))
+FEEDBACK_MAX_SESSIONS = convert_value(os.getenv("FEEDBACK_MAX_SESSIONS", "256"))
+FEEDBACK_SESSION_TTL = convert_value(os.getenv("FEEDBACK_SESSION_TTL", "1800"))
 
 
 class Service:
@@ -46,68 +95,483 @@ class Service:
         apple_clip_faiss=APPLE_FAISS,
         laion_clip_faiss=LAION_FAISS,
         json_clip=JSON_CLIP,
-        top_k=TOP_K
+        top_k=TOP_K,
+        apple_rerank=APPLE_RERANK,
+        laion_rerank=LAION_RERANK,
+        apple_candidate_k=APPLE_CANDIDATE_K,
+        laion_candidate_k=LAION_CANDIDATE_K,
+        apple_shard_dir=APPLE_SHARD_DIR,
+        laion_shard_dir=LAION_SHARD_DIR,
+        apple_video_index=APPLE_VIDEO_INDEX,
+        laion_video_index=LAION_VIDEO_INDEX,
+        feedback_max_sessions=FEEDBACK_MAX_SESSIONS,
+        feedback_session_ttl=FEEDBACK_SESSION_TTL,
+        device=CLIP_DEVICE,
+        apple_faiss_gpu=APPLE_FAISS_GPU,
+        faiss_mmap=FAISS_MMAP,
+        inference_socket=INFERENCE_SOCKET,
+        apple_clip_device=APPLE_CLIP_DEVICE,
+        laion_clip_device=LAION_CLIP_DEVICE,
+        apple_clip_memory=APPLE_CLIP_MEMORY,
+        laion_clip_memory=LAION_CLIP_MEMORY,
+        model_memory_budget=MODEL_MEMORY_BUDGET,
+        model_preload=MODEL_PRELOAD,
+        extra_models=EXTRA_MODELS,
+        image_cache_size=IMAGE_CACHE_SIZE,
+        image_cache_perceptual=IMAGE_CACHE_PERCEPTUAL,
+        image_cache_distance=IMAGE_CACHE_DISTANCE,
+        prompt_templates=PROMPT_TEMPLATES,
+        prompt_cache_size=PROMPT_CACHE_SIZE,
+        encoder_inference_mode=ENCODER_INFERENCE_MODE,
+        encoder_compile=ENCODER_COMPILE,
+        encoder_channels_last=ENCODER_CHANNELS_LAST,
+        encoder_warmup=ENCODER_WARMUP
     ) -> None:
         """
         Sets up the necessary components for the CLIP retrieval service.
 
         Args:
             top_k (int): The number of top results to return during retrieval.
+            apple_rerank (str): Optional full-precision vector matrix enabling
+                two-stage retrieval for the Apple model.
+            laion_rerank (str): The same for the LAION model.
+            apple_candidate_k (int): Default two-stage candidate pool for Apple.
+            laion_candidate_k (int): Default two-stage candidate pool for LAION.
+            apple_shard_dir (str): Optional directory of Apple index shards.
+            laion_shard_dir (str): Optional directory of LAION index shards.
+            apple_video_index (str): Optional path prefix of the Apple video
+                centroid index used for coarse-to-fine multi-event search.
+            laion_video_index (str): The same for the LAION model.
+            feedback_max_sessions (int): The maximum number of feedback sessions.
+            feedback_session_ttl (float): Seconds before an idle feedback session expires.
+            device (str): The torch device for the encoders; defaults to CUDA
+                when available. Use "cpu" for forked multi-worker serving.
+            apple_faiss_gpu (int): The GPU for the Apple index, -1 for CPU.
+            faiss_mmap (bool): Whether to memory-map the index files.
+            inference_socket (str): The socket of a running inference worker;
+                when set, encoding and search happen there and no model or
+                index is loaded in this process.
+            apple_clip_device (str): The device of the Apple encoder; defaults to device.
+            laion_clip_device (str): The device of the LAION encoder; defaults to device.
+            apple_clip_memory (int): The Apple encoder's memory cost in MB.
+            laion_clip_memory (int): The LAION encoder's memory cost in MB.
+            model_memory_budget (int): The MB of encoders kept loaded, 0 for no limit.
+            model_preload (bool): Whether to load encoders that fit the budget at startup.
+            extra_models (List[Dict]): Additional open_clip models, each with
+                ``name``, ``model``, ``faiss_url`` and optionally ``tokenizer``,
+                ``device``, ``memory``, ``rerank_url`` and ``candidate_k``.
+            image_cache_size (int): Upload embeddings cached per tier, 0 to disable.
+            image_cache_perceptual (bool): Whether to also match uploads by dHash.
+            image_cache_distance (int): The dHash Hamming distance counted as a match.
+            prompt_templates (List[str]): Templates for ensembled text queries;
+                empty for the built-in set.
+            prompt_cache_size (int): Prompt embeddings cached for ensembling.
+            encoder_inference_mode (bool): Run encoders under torch.inference_mode.
+            encoder_compile (str): A torch.compile mode for the encoders, empty for eager.
+            encoder_channels_last (bool): Use channels-last layout for the vision towers.
+            encoder_warmup (List[int]): Batch sizes run through every preloaded
+                encoder by warm_up before the service reports ready.
         """
-        self._data = LoadJson(
+        self._json_clip = json_clip
+        self._faiss_config = {
+            "apple_faiss_url": apple_clip_faiss,
+            "laion_faiss_url": laion_clip_faiss,
+            "apple_rerank_url": apple_rerank,
+            "laion_rerank_url": laion_rerank,
+            "apple_candidate_k": apple_candidate_k,
+            "laion_candidate_k": laion_candidate_k,
+            "apple_shard_dir": apple_shard_dir,
+            "laion_shard_dir": laion_shard_dir,
+            "apple_video_index_url": apple_video_index,
+            "laion_video_index_url": laion_video_index,
+            "apple_gpu_device": apple_faiss_gpu,
+            "mmap": faiss_mmap,
+            "extra_indexes": {
+                extra["name"]: {
+                    "faiss_url": extra["faiss_url"],
+                    "rerank_url": extra.get("rerank_url"),
+                    "candidate_k": extra.get("candidate_k")
+                }
+                for extra in extra_models
+            }
+        }
+        self._reload_lock = asyncio.Lock()
+        self._reload_status = {
+            "state": "idle",
+            "version": 0,
+            "loaded_at": time.time(),
+            "error": None
+        }
+        metadata = LoadJson(
             json_url=json_clip
-        )._data
-        self._device = torch.device(
-            "cuda" if torch.cuda.is_available() else "cpu"
-        )
-        self._apple_model, self._apple_processor = create_model_from_pretrained(
-            apple_clip_model
-        )
-        self._apple_model.to(self._device)
-        self._apple_tokenizer = get_tokenizer(apple_clip_tokenizer)
-        self._laion_model, self._laion_processor = create_model_from_pretrained(
-            laion_clip_model
-        )
-        self._laion_model.to(self._device)
-        self._laion_tokenizer = get_tokenizer(laion_clip_tokenizer)
-        self._apple_clip = AppleCLIP(
-            model=self._apple_model,
-            processor=self._apple_processor,
-            tokenizer=self._apple_tokenizer,
-            device_type=self._device
-        )
-        self._laion_clip = LaionCLIP(
-            model=self._laion_model,
-            processor=self._laion_processor,
-            tokenizer=self._laion_tokenizer,
-            device_type=self._device
-        )
-        self._faiss = ClipFaiss(
-            apple_faiss_url=apple_clip_faiss,
-            laion_faiss_url=laion_clip_faiss
         )
+        self._data = metadata._data
+        self._frame_index = metadata.frame_index
+        self._inference_client = None
+        self._warmup_batches = [] if inference_socket else list(encoder_warmup)
+        self._warmup_status = {"state": "pending", "timings": {}, "error": None}
+        optimize = {
+            "inference_mode": encoder_inference_mode,
+            "compile_mode": encoder_compile or None,
+            "channels_last": encoder_channels_last
+        }
+        self._models = ModelRegistry(memory_budget=model_memory_budget)
+        if inference_socket:
+            self._inference_client = InferenceClient(socket_path=inference_socket)
+            for model_type in ("apple_clip", "laion_clip"):
+                self._models.register(
+                    name=model_type,
+                    loader=lambda _, model_type=model_type: RemoteEncoder(
+                        client=self._inference_client,
+                        model_type=model_type
+                    )
+                )
+            self._faiss = RemoteFaiss(client=self._inference_client)
+        else:
+            device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+            self._models.register(
+                name="apple_clip",
+                loader=open_clip_loader(
+                    AppleCLIP, apple_clip_model, apple_clip_tokenizer, optimize, self._warmup_batches
+                ),
+                device=apple_clip_device or device,
+                memory_cost=apple_clip_memory
+            )
+            self._models.register(
+                name="laion_clip",
+                loader=open_clip_loader(
+                    LaionCLIP, laion_clip_model, laion_clip_tokenizer, optimize, self._warmup_batches
+                ),
+                device=laion_clip_device or device,
+                memory_cost=laion_clip_memory
+            )
+            for extra in extra_models:
+                self._models.register(
+                    name=extra["name"],
+                    loader=open_clip_loader(
+                        BaseCLIP,
+                        extra["model"],
+                        extra.get("tokenizer", extra["model"]),
+                        optimize,
+                        self._warmup_batches
+                    ),
+                    device=extra.get("device", device),
+                    memory_cost=extra.get("memory", 0)
+                )
+            self._faiss = ClipFaiss(**self._faiss_config)
+        if model_preload:
+            self._models.preload()
         self._text_clip_retrieval = TextClipRetrieval(
             top_k=top_k,
-            apple_clip=self._apple_clip,
-            laion_clip=self._laion_clip,
+            models=self._models,
             faiss=self._faiss,
-            data=self._data
+            data=self._data,
+            prompt_ensemble=PromptEnsemble(
+                templates=prompt_templates,
+                cache_size=prompt_cache_size
+            )
         )
         self._image_clip_retrieval = ImageClipRetrieval(
             top_k=top_k,
-            apple_clip=self._apple_clip,
-            laion_clip=self._laion_clip,
+            models=self._models,
             faiss=self._faiss,
-            data=self._data
+            data=self._data,
+            embedding_cache=EmbeddingCache(
+                max_entries=image_cache_size,
+                perceptual=image_cache_perceptual,
+                max_distance=image_cache_distance
+            ) if image_cache_size else None
         )
         self._multi_event_retrieval = MultiEventRetrieval(
             top_k=top_k,
-            apple_clip=self._apple_clip,
-            laion_clip=self._laion_clip,
+            models=self._models,
+            faiss=self._faiss,
+            data=self._data,
+            frame_index=self._frame_index
+        )
+        self._temporal_retrieval = TemporalRetrieval(
+            frame_index=self._frame_index
+        )
+        self._example_retrieval = ExampleRetrieval(
+            top_k=top_k,
             faiss=self._faiss,
-            data=self._data
+            data=self._data,
+            frame_index=self._frame_index
+        )
+        self._feedback_retrieval = FeedbackRetrieval(
+            top_k=top_k,
+            models=self._models,
+            faiss=self._faiss,
+            data=self._data,
+            frame_index=self._frame_index,
+            max_sessions=feedback_max_sessions,
+            session_ttl=feedback_session_ttl
+        )
+
+    @staticmethod
+    def _load_store(
+        faiss_config: Dict,
+        json_clip: str
+    ) -> Tuple[ClipFaiss, LoadJson]:
+        """
+        Loads a FAISS index wrapper and its metadata.
+
+        Args:
+            faiss_config (Dict): Keyword arguments for ClipFaiss.
+            json_clip (str): The path to the metadata JSON file.
+
+        Returns:
+            Tuple[ClipFaiss, LoadJson]: The index wrapper and the metadata.
+        """
+        return ClipFaiss(**faiss_config), LoadJson(json_url=json_clip)
+
+    def _store_files(self) -> List[str]:
+        """
+        Lists the files backing the current index and metadata.
+        """
+        files = [self._json_clip]
+        for key, value in self._faiss_config.items():
+            if not value:
+                continue
+            if key.endswith("_video_index_url"):
+                files.extend([f"{value}.faiss", f"{value}.json"])
+            elif key.endswith(("_url", "_dir")):
+                files.append(value)
+        return files
+
+    async def reload_store(
+        self,
+        json_clip: Union[str, None] = None,
+        **faiss_overrides
+    ) -> Dict:
+        """
+        Loads a new index and metadata in the background and swaps them in.
+
+        Loading happens in a worker thread so requests keep being served from
+        the current store. The swap is a reference assignment on each retrieval
+        service; in-flight requests finish on the store they started with and
+        the old store is freed once they drop it.
+
+        Args:
+            json_clip (str, optional): A new metadata path; defaults to the current one.
+            **faiss_overrides: ClipFaiss arguments to change, e.g. laion_faiss_url.
+
+        Returns:
+            Dict: The reload status after the attempt.
+
+        Raises:
+            ValueError: If the indexes are held by an inference worker.
+        """
+        if not self.reloadable:
+            raise ValueError(
+                "The indexes are held by the inference worker; restart it to reload"
+            )
+        async with self._reload_lock:
+            faiss_config = dict(self._faiss_config)
+            faiss_config.update(
+                {key: value for key, value in faiss_overrides.items() if value is not None}
+            )
+            json_clip = json_clip or self._json_clip
+            self._reload_status["state"] = "loading"
+            try:
+                faiss, metadata = await asyncio.to_thread(
+                    self._load_store, faiss_config, json_clip
+                )
+            except Exception as e:
+                self._reload_status.update(state="failed", error=str(e))
+                raise
+            for retrieval in (
+                self._text_clip_retrieval,
+                self._image_clip_retrieval
+            ):
+                retrieval.swap_store(faiss=faiss, data=metadata._data)
+            for retrieval in (
+                self._multi_event_retrieval,
+                self._example_retrieval,
+                self._feedback_retrieval
+            ):
+                retrieval.swap_store(
+                    faiss=faiss,
+                    data=metadata._data,
+                    frame_index=metadata.frame_index
+                )
+            self._temporal_retrieval.swap_store(frame_index=metadata.frame_index)
+            self._faiss, self._data = faiss, metadata._data
+            self._frame_index = metadata.frame_index
+            self._faiss_config, self._json_clip = faiss_config, json_clip
+            self._reload_status.update(
+                state="idle",
+                version=self._reload_status["version"] + 1,
+                loaded_at=time.time(),
+                error=None
+            )
+        gc.collect()
+        return self.reload_status
+
+    @property
+    def reloadable(self) -> bool:
+        """
+        Tells whether the store can be reloaded in this process; it cannot
+        when an inference worker holds the indexes.
+
+        Returns:
+            bool: True when reload_store is supported.
+        """
+        return self._inference_client is None
+
+    async def watch_store(
+        self,
+        interval: float = 30.0
+    ) -> None:
+        """
+        Polls the store files and reloads once a change has settled.
+
+        A change is acted on only when the modification times are unchanged
+        for a whole interval, so half-written files are not loaded.
+
+        Args:
+            interval (float): The polling interval in seconds.
+        """
+        def snapshot() -> Dict[str, float]:
+            return {
+                path: os.path.getmtime(path)
+                for path in self._store_files() if os.path.exists(path)
+            }
+
+        loaded = snapshot()
+        previous = loaded
+        while True:
+            await asyncio.sleep(interval)
+            current = snapshot()
+            if current != loaded and current == previous:
+                try:
+                    await self.reload_store()
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("store reload failed")
+                loaded = current
+            previous = current
+
+    async def warm_up(self) -> Dict:
+        """
+        Collects the warm-up timings of every loaded encoder.
+
+        Encoders are warmed by their loader: preloaded ones while the service
+        is constructed, before the server accepts traffic, and others when
+        they are first loaded or reloaded after eviction, under the registry
+        lock so concurrent requests never compile the same model twice. Any
+        loaded encoder that missed warm-up is warmed here in a worker thread.
+        The service reports ready once this finishes (at once when no batch
+        sizes are configured or encoding happens in an inference worker).
+
+        Returns:
+            Dict: The warm-up status with milliseconds per model, kind and batch size.
+        """
+        self._warmup_status["state"] = "running"
+        try:
+            for name, stats in self._models.stats.items():
+                if not stats["loaded"] or not self._warmup_batches:
+                    continue
+                encoder = await self._models.get(name)
+                if not encoder.warmed:
+                    await asyncio.to_thread(encoder.warmup, self._warmup_batches)
+                self._warmup_status["timings"][name] = encoder.warmup_timings
+            self._warmup_status["state"] = "ready"
+        except Exception as e:  # pylint: disable=broad-except
+            self._warmup_status.update(state="failed", error=str(e))
+        return self.readiness
+
+    @property
+    def readiness(self) -> Dict:
+        """
+        Provides the warm-up state; the service is ready when it is "ready".
+
+        Returns:
+            Dict: The state, warm-up timings and any error.
+        """
+        return dict(self._warmup_status, ready=self._warmup_status["state"] == "ready")
+
+    async def memory_report(self) -> Dict:
+        """
+        Estimates the bytes held by each component of the service.
+
+        Walking the metadata dict takes a moment on large collections, so the
+        immutable metadata is sized in a worker thread.
+
+        Returns:
+            Dict: Process RSS, encoder parameters, index storage, metadata and caches.
+        """
+        faiss, data, frame_index = self._faiss, self._data, self._frame_index
+        metadata_bytes, frame_index_bytes = await asyncio.to_thread(
+            lambda: (deep_sizeof(data), frame_index.memory_bytes)
+        )
+        image_cache = self._image_clip_retrieval.embedding_cache
+        return {
+            "process": process_memory(),
+            "models": self._models.parameter_bytes,
+            "indexes": faiss.memory_stats,
+            "metadata": {
+                "entries": len(data),
+                "data_bytes": metadata_bytes,
+                "frame_index_bytes": frame_index_bytes
+            },
+            "caches": {
+                "image_embeddings_bytes": image_cache.memory_bytes if image_cache else 0,
+                "prompt_embeddings_bytes": self._text_clip_retrieval.prompt_ensemble.memory_bytes,
+                "feedback_sessions_bytes": self._feedback_retrieval.memory_bytes
+            }
+        }
+
+    async def profile_text_request(
+        self,
+        model_type: str,
+        text: str,
+        repeat: int = 1,
+        group_by: str = "lineno",
+        top: int = 20
+    ) -> Dict:
+        """
+        Profiles the allocations of text retrieval requests with tracemalloc.
+
+        Args:
+            model_type (str): The model to search with.
+            text (str): The sample query.
+            repeat (int): The number of requests run between the snapshots.
+            group_by (str): "lineno", "filename" or "traceback".
+            top (int): The number of allocation sites reported.
+
+        Returns:
+            Dict: The profile_allocations report.
+        """
+        return await profile_allocations(
+            call=lambda: self._text_clip_retrieval.text_retrieval(
+                model_type=model_type,
+                text=text
+            ),
+            repeat=repeat,
+            group_by=group_by,
+            top=top
         )
 
+    @property
+    def models(self) -> ModelRegistry:
+        """
+        Provides access to the registry of encoders.
+
+        Returns:
+            ModelRegistry: The model registry.
+        """
+        return self._models
+
+    @property
+    def reload_status(self) -> Dict:
+        """
+        Provides the state and version of the loaded index and metadata.
+
+        Returns:
+            Dict: The reload status.
+        """
+        return dict(self._reload_status)
+
     @property
     def text_clip_retrieval(self):
         """
@@ -137,3 +601,33 @@ class Service:
             ClipRetrieval: The CLIP retrieval service instance.
         """
         return self._multi_event_retrieval
+
+    @property
+    def temporal_retrieval(self):
+        """
+        Provides access to the temporal neighborhood retrieval service.
+
+        Returns:
+            TemporalRetrieval: The temporal retrieval service instance.
+        """
+        return self._temporal_retrieval
+
+    @property
+    def example_retrieval(self):
+        """
+        Provides access to the query-by-example retrieval service.
+
+        Returns:
+            ExampleRetrieval: The query-by-example retrieval service instance.
+        """
+        return self._example_retrieval
+
+    @property
+    def feedback_retrieval(self):
+        """
+        Provides access to the relevance feedback retrieval service.
+
+        Returns:
+            FeedbackRetrieval: The relevance feedback retrieval service instance.
+        """
+        return self._feedback_retrieval
@@ -0,0 +1,82 @@
+"""
+Implements temporal (video context) lookups over the keyframe metadata.
+"""
+
+from typing import List, Dict
+
+from src.repositories.frame_index import FrameIndex
+
+
+class TemporalRetrieval:
+    """
+    Handles retrieval of keyframes surrounding a given frame of a video.
+    """
+
+    def __init__(
+        self,
+        frame_index: FrameIndex
+    ) -> None:
+        """
+        Initializes the TemporalRetrieval class with a frame-order index.
+
+        Args:
+            frame_index (FrameIndex): The per-video sorted keyframe index.
+        """
+        self._frame_index = frame_index
+
+    def swap_store(
+        self,
+        frame_index: FrameIndex
+    ) -> None:
+        """
+        Replaces the frame-order index used by subsequent requests.
+
+        Args:
+            frame_index (FrameIndex): The new frame-order index.
+        """
+        self._frame_index = frame_index
+
+    async def neighbors(
+        self,
+        video_id: str,
+        frame_id: str,
+        window: int
+    ) -> List[Dict]:
+        """
+        Retrieves the keyframes around a frame of a video.
+
+        Args:
+            video_id (str): The video to look in.
+            frame_id (str): The frame id, with or without extension.
+            window (int): The number of keyframes on each side.
+
+        Returns:
+            List[Dict]: The neighboring keyframes in frame order.
+        """
+        return self._frame_index.neighbors(
+            video_id=video_id,
+            frame_id=frame_id,
+            window=window
+        )
+
+    async def expand(
+        self,
+        results: List[Dict],
+        window: int
+    ) -> List[Dict]:
+        """
+        Expands ranked search results with their temporal neighbors.
+
+        Args:
+            results (List[Dict]): The ranked hits.
+            window (int): The number of keyframes on each side of a hit.
+
+        Returns:
+            List[Dict]: The hits interleaved with their neighborhoods.
+        """
+        if window <= 0:
+            return results
+        return self._frame_index.expand(
+            results=results,
+            window=window
+        )
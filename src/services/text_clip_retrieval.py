@@ -2,10 +2,17 @@
 Implements text retrieval using CLIP embeddings and FAISS index.
 """
 
-from typing import List, Dict
-from src.modules.apple_clip import AppleCLIP
-from src.modules.laion_clip import LaionCLIP
+from typing import List, Dict, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch import Tensor
+from src.modules.model_registry import ModelRegistry
 from src.repositories.load_faiss import ClipFaiss
+from src.utils.diversify import rank_indices
+from src.utils.prompt_ensemble import PromptEnsemble
+from src.utils.single_flight import SingleFlight
 
 
 class TextClipRetrieval:
@@ -16,24 +23,49 @@ class TextClipRetrieval:
     def __init__(
         self,
         top_k: int,
-        apple_clip: AppleCLIP,
-        laion_clip: LaionCLIP,
+        models: ModelRegistry,
         faiss: ClipFaiss,
-        data: Dict
+        data: Dict,
+        prompt_ensemble: Union[PromptEnsemble, None] = None
     ) -> None:
         """
         Initializes the ClipSearch class with the given CLIP models, FAISS index, and data.
 
         Args:
             top_k (int): The number of top results to retrieve.
-            apple_clip (AppleCLIP): An instance of the AppleCLIP model.
-            laion_clip (LaionCLIP): An instance of the LaionCLIP model.
+            models (ModelRegistry): The registry the encoders are looked up in.
             faiss (ClipFaiss): An instance of the ClipFaiss class for performing FAISS.
             data (Dict): A dictionary mapping indices to video and frame information.
+            prompt_ensemble (PromptEnsemble, optional): Templates for ensembled queries.
         """
         self._top_k = top_k
-        self._apple_clip = apple_clip
-        self._laion_clip = laion_clip
+        self._models = models
+        self._faiss = faiss
+        self._data = data
+        self._prompt_ensemble = prompt_ensemble or PromptEnsemble()
+        self._single_flight = SingleFlight()
+
+    @property
+    def prompt_ensemble(self) -> PromptEnsemble:
+        """
+        Returns the prompt-template ensemble and its embedding cache.
+        """
+        return self._prompt_ensemble
+
+    def swap_store(
+        self,
+        faiss: ClipFaiss,
+        data: Dict
+    ) -> None:
+        """
+        Replaces the FAISS index and metadata used by subsequent requests.
+
+        Requests already in flight keep the pair they captured when they started.
+
+        Args:
+            faiss (ClipFaiss): The new FAISS index wrapper.
+            data (Dict): The new mapping of indices to video and frame information.
+        """
         self._faiss = faiss
         self._data = data
 
@@ -56,82 +88,299 @@ class TextClipRetrieval:
         filtered_list = [data[indice] for indice in indices if indice in data]
         return filtered_list
 
-    async def apple_text_retrieval(
+    async def embed_text(
+        self,
+        model_type: str,
+        text: str,
+        ensemble: bool = False
+    ) -> Tensor:
+        """
+        Embeds a text query, optionally as a prompt-template ensemble.
+
+        Args:
+            model_type (str): The registered model to encode with.
+            text (str): The query.
+            ensemble (bool): Whether to average the embeddings of all templates.
+
+        Returns:
+            Tensor: The query embedding.
+        """
+        encoder = await self._models.get(model_type)
+        if ensemble:
+            return await self._prompt_ensemble.embed(
+                encoder=encoder,
+                model_type=model_type,
+                text=text
+            )
+        return await encoder.text_embedding(text=text)
+
+    async def embed_phrases(
         self,
-        text: str
+        model_type: str,
+        texts: List[str],
+        ensemble: bool = False
+    ) -> Tensor:
+        """
+        Embeds several phrases in one batched forward; with ensembling every
+        phrase-template prompt goes into that forward.
+
+        Args:
+            model_type (str): The registered model to encode with.
+            texts (List[str]): The phrases.
+            ensemble (bool): Whether to embed each phrase as a template ensemble.
+
+        Returns:
+            Tensor: A float32 CPU tensor with one normalized row per phrase.
+        """
+        encoder = await self._models.get(model_type)
+        if ensemble:
+            vectors = await self._prompt_ensemble.embed_many(
+                encoder=encoder,
+                model_type=model_type,
+                texts=texts
+            )
+        else:
+            vectors = await encoder.text_embedding_batch(texts)
+        return vectors.detach().float().cpu()
+
+    async def compose_query(
+        self,
+        model_type: str,
+        text: str,
+        positives: Tuple[Tuple[str, float], ...] = (),
+        negatives: Tuple[Tuple[str, float], ...] = (),
+        negative_mode: str = "vector",
+        ensemble: bool = False
+    ) -> Tuple[Tensor, Union[np.ndarray, None]]:
+        """
+        Combines the query and its weighted phrases into a single query vector.
+
+        The query and positives are summed with their weights. In "vector"
+        mode the weighted negatives are subtracted before normalizing; in
+        "rerank" mode they are returned for rerank_negatives instead.
+
+        Args:
+            model_type (str): The registered model to encode with.
+            text (str): The main query, weighted 1.
+            positives (Tuple[Tuple[str, float], ...]): Phrases and weights to add.
+            negatives (Tuple[Tuple[str, float], ...]): Phrases and weights to subtract.
+            negative_mode (str): Either "vector" or "rerank".
+            ensemble (bool): Whether to embed each phrase as a template ensemble.
+
+        Returns:
+            Tuple[Tensor, Union[np.ndarray, None]]: The (1, d) query vector and,
+            in "rerank" mode, the weighted negative vectors summed into one (d,) array.
+        """
+        if negative_mode not in ("vector", "rerank"):
+            raise ValueError(f"Unknown negative mode: {negative_mode}")
+        phrases = [(text, 1.0), *positives, *negatives]
+        vectors = await self.embed_phrases(
+            model_type=model_type,
+            texts=[phrase for phrase, _ in phrases],
+            ensemble=ensemble
+        )
+        weights = torch.tensor([weight for _, weight in phrases], dtype=torch.float32)[:, None]
+        split = len(phrases) - len(negatives)
+        query = (weights[:split] * vectors[:split]).sum(dim=0, keepdim=True)
+        negative = (weights[split:] * vectors[split:]).sum(dim=0, keepdim=True)
+        if negative_mode == "rerank" and negatives:
+            return F.normalize(query, dim=-1), negative[0].numpy()
+        return F.normalize(query - negative, dim=-1), None
+
+    async def rerank_negatives(
+        self,
+        faiss: ClipFaiss,
+        model_type: str,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        negative: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-scores hits as ``sim(query) - sum(weight * sim(negative))``.
+
+        Args:
+            faiss (ClipFaiss): The index wrapper the hits came from.
+            model_type (str): The model whose index was searched.
+            scores (np.ndarray): The query similarity of each hit.
+            indices (np.ndarray): The indices of the hits.
+            negative (np.ndarray): The weighted sum of the negative vectors.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The re-scored hits, best first.
+        """
+        valid = indices >= 0
+        scores, indices = np.asarray(scores)[valid], np.asarray(indices)[valid]
+        if not len(indices):
+            return scores, indices
+        vectors = await faiss.reconstruct(model_type=model_type, indices=indices)
+        scores = scores - vectors @ negative
+        order = np.argsort(-scores, kind="stable")
+        return scores[order], indices[order]
+
+    async def model_text_retrieval(
+        self,
+        model_type: str,
+        text: str,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None,
+        ensemble: bool = False,
+        composition: Union[Dict, None] = None
     ) -> List[Dict]:
         """
-        Retrieves text data using the apple CLIP model.
+        Retrieves text data using a registered CLIP model.
 
         Args:
+            model_type (str): The registered model to encode and search with.
             text (str): The input text to retrieve data for.
+            candidate_k (int, optional): The two-stage candidate pool size.
+            diversify (Dict, optional): Arguments for diversify_results.
+            ensemble (bool): Whether to embed the text as a prompt-template ensemble.
+            composition (Dict, optional): Arguments for compose_query.
 
         Returns:
             List[Dict]: A list of dictionaries containing the retrieval results.
         """
-        vector_embedding = await self._apple_clip.text_embedding(
-            text=text
-        )
-        indices = await self._faiss.apple_search(
+        faiss, data = self._faiss, self._data
+        negative = None
+        if composition:
+            vector_embedding, negative = await self.compose_query(
+                model_type=model_type,
+                text=text,
+                ensemble=ensemble,
+                **composition
+            )
+        else:
+            vector_embedding = await self.embed_text(
+                model_type=model_type,
+                text=text,
+                ensemble=ensemble
+            )
+        scores, indices = await faiss.search(
+            model_type=model_type,
             top_k=self._top_k,
-            query_vectors=vector_embedding
+            query_vectors=vector_embedding,
+            candidate_k=candidate_k
         )
+        if negative is not None:
+            scores, indices = await self.rerank_negatives(
+                faiss=faiss,
+                model_type=model_type,
+                scores=scores[0],
+                indices=indices[0],
+                negative=negative
+            )
+            scores, indices = scores[None], indices[None]
         result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
+            data=data,
+            indices=await rank_indices(
+                faiss=faiss,
+                model_type=model_type,
+                data=data,
+                scores=scores[0],
+                indices=indices[0],
+                diversify=diversify
+            )
         )
         return result
 
-    async def laion_text_retrieval(
+    async def batch_text_retrieval(
         self,
-        text: str
-    ) -> List[Dict]:
+        model_type: str,
+        texts: List[str],
+        candidate_k: Union[int, None] = None
+    ) -> List[List[Dict]]:
         """
-        Retrieves text data using the laion CLIP model.
+        Retrieves keyframes for many queries with one encoder forward and one search.
 
         Args:
-            text (str): The input text to retrieve data for.
+            model_type (str): The registered model to encode and search with.
+            texts (List[str]): The queries.
+            candidate_k (int, optional): The two-stage candidate pool size.
 
         Returns:
-            List[Dict]: A list of dictionaries containing the retrieval results.
+            List[List[Dict]]: The ranked keyframes of each query.
         """
-        vector_embedding = await self._laion_clip.text_embedding(
-            text=text
-        )
-        indices = await self._faiss.laion_search(
+        if model_type not in self._models:
+            raise ValueError(f"Model type not supported: {model_type}")
+        faiss, data = self._faiss, self._data
+        encoder = await self._models.get(model_type)
+        vectors = await encoder.text_embedding_batch(texts)
+        _, indices = await faiss.search(
+            model_type=model_type,
             top_k=self._top_k,
-            query_vectors=vector_embedding
-        )
-        result = await self.mapping_results(
-            data=self._data,
-            indices=indices[0]
+            query_vectors=vectors,
+            candidate_k=candidate_k
         )
-        return result
+        return [await self.mapping_results(data=data, indices=row) for row in indices]
 
     async def text_retrieval(
         self,
         model_type: str,
-        text: str
+        text: str,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None,
+        ensemble: bool = False,
+        composition: Union[Dict, None] = None
     ) -> List[Dict]:
         """
         Retrieves text data based on the specified model type.
 
+        Concurrent identical requests share a single encoder call and search.
+
         Args:
             model_type (str): The type of model to use for retrieval.
             text (str): The input text to retrieve data for.
+            candidate_k (int, optional): The two-stage candidate pool size.
+            diversify (Dict, optional): Arguments for diversify_results.
+            ensemble (bool): Whether to embed the text as a prompt-template ensemble.
+            composition (Dict, optional): Arguments for compose_query.
 
         Returns:
             List[Dict]: A list of dictionaries containing the retrieval results.
         """
-        if model_type == "apple_clip":
-            return await self.apple_text_retrieval(
-                text=text
-            )
-        elif model_type == "laion_clip":
-            return await self.laion_text_retrieval(
-                text=text
+        key = (
+            model_type,
+            text,
+            self._top_k,
+            candidate_k,
+            tuple(sorted(diversify.items())) if diversify else None,
+            ensemble,
+            tuple(sorted(composition.items())) if composition else None
+        )
+        return await self._single_flight.do(
+            key,
+            lambda: self._text_retrieval(
+                model_type=model_type,
+                text=text,
+                candidate_k=candidate_k,
+                diversify=diversify,
+                ensemble=ensemble,
+                composition=composition
             )
-        else:
-            return {
-                "error": "Model type not supported"
-            }
+        )
+
+    async def _text_retrieval(
+        self,
+        model_type: str,
+        text: str,
+        candidate_k: Union[int, None] = None,
+        diversify: Union[Dict, None] = None,
+        ensemble: bool = False,
+        composition: Union[Dict, None] = None
+    ) -> List[Dict]:
+        """
+        Dispatches a text retrieval to the registered model.
+
+        Raises:
+            ValueError: If the model type is not registered.
+        """
+        if model_type not in self._models:
+            raise ValueError(f"Model type not supported: {model_type}")
+        return await self.model_text_retrieval(
+            model_type=model_type,
+            text=text,
+            candidate_k=candidate_k,
+            diversify=diversify,
+            ensemble=ensemble,
+            composition=composition
+        )
@@ -0,0 +1,148 @@
+"""
+Measures first-request and steady-state encoder latency per execution mode.
+
+Each mode runs in a fresh process, so the first request sees cold allocators
+and uncompiled kernels as it would after a restart. "eager" is the default
+no_grad path; "inference_mode", "channels_last" and "compile" apply
+``BaseCLIP.optimize`` (compile also uses inference mode). With --warmup the
+encoder runs ``BaseCLIP.warmup`` over those batch sizes before the first
+request is timed, as the service does before reporting ready.
+
+By default the architecture is built with random weights (stand-in model
+with the real shapes, nothing downloaded); --pretrained loads the real model.
+
+Example:
+    python -m src.tools.bench_encoder_warmup --arch ViT-H-14-378-quickgelu \
+        --modes eager compile --warmup 1 8 32 --repeat 20
+"""
+
+import argparse
+import asyncio
+import time
+from multiprocessing import get_context
+from typing import Dict, List, Union
+
+import open_clip
+import torch
+from open_clip.transform import image_transform
+from PIL import Image
+
+from src.modules.base_clip import BaseCLIP
+
+MODES = {
+    "eager": {},
+    "inference_mode": {"inference_mode": True},
+    "channels_last": {"inference_mode": True, "channels_last": True},
+    "compile": {"inference_mode": True, "compile_mode": "default"}
+}
+
+
+def build_encoder(
+    arch: str,
+    pretrained: Union[str, None],
+    device: torch.device
+) -> BaseCLIP:
+    """
+    Builds a BaseCLIP around a real or randomly initialized open_clip model.
+    """
+    if pretrained:
+        model, processor = open_clip.create_model_from_pretrained(pretrained)
+    else:
+        model = open_clip.create_model(arch)
+        size = model.visual.image_size
+        processor = image_transform(size if isinstance(size, int) else max(size), is_train=False)
+    model.to(device).eval()
+    return BaseCLIP(
+        model=model,
+        processor=processor,
+        tokenizer=open_clip.get_tokenizer(arch),
+        device_type=device
+    )
+
+
+def run_mode(
+    mode: str,
+    arch: str,
+    pretrained: Union[str, None],
+    device_name: str,
+    warmup: List[int],
+    repeat: int,
+    batch_size: int
+) -> Dict[str, float]:
+    """
+    Loads the encoder in this process and times warm-up, first and steady-state requests.
+
+    Returns:
+        Dict[str, float]: Milliseconds for load, warm-up, the first text and
+        image request and the mean of the following requests.
+    """
+    device = torch.device(device_name)
+
+    def synchronize() -> None:
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+
+    started = time.perf_counter()
+    encoder = build_encoder(arch, pretrained, device)
+    encoder.optimize(**MODES[mode])
+    stats = {"load": (time.perf_counter() - started) * 1000, "warmup": 0.0}
+    if warmup:
+        started = time.perf_counter()
+        encoder.warmup(warmup)
+        stats["warmup"] = (time.perf_counter() - started) * 1000
+
+    texts = ["a man riding a bicycle on a crowded street"] * batch_size
+    blank = encoder.processor(Image.new("RGB", (encoder.image_size, encoder.image_size)))
+    images = blank.expand(batch_size, -1, -1, -1)
+
+    async def timed(call) -> float:
+        started = time.perf_counter()
+        await call()
+        synchronize()
+        return (time.perf_counter() - started) * 1000
+
+    async def measure() -> None:
+        for kind, call in (
+            ("text", lambda: encoder.text_embedding_batch(texts)),
+            ("image", lambda: encoder.image_embedding_batch(images))
+        ):
+            stats[f"first_{kind}"] = await timed(call)
+            steady = [await timed(call) for _ in range(repeat)]
+            stats[f"steady_{kind}"] = sum(steady) / len(steady)
+
+    asyncio.run(measure())
+    return stats
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--arch", default="ViT-B-32", help="open_clip architecture / tokenizer")
+    parser.add_argument("--pretrained", help="load real weights, e.g. an hf-hub: id")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--warmup", type=int, nargs="*", default=[], help="warm-up batch sizes")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.pretrained or args.arch + ' (random weights)'} on {args.device}, "
+          f"batch {args.batch_size}, warm-up {args.warmup or 'off'} (ms)")
+    print(f"{'mode':>15}{'load':>9}{'warmup':>9}{'1st text':>10}{'text':>8}"
+          f"{'1st image':>11}{'image':>8}")
+    context = get_context("spawn")
+    for mode in args.modes:
+        with context.Pool(1) as pool:
+            stats = pool.apply(run_mode, (
+                mode, args.arch, args.pretrained, args.device,
+                args.warmup, args.repeat, args.batch_size
+            ))
+        print(f"{mode:>15}{stats['load']:>9.0f}{stats['warmup']:>9.0f}"
+              f"{stats['first_text']:>10.1f}{stats['steady_text']:>8.1f}"
+              f"{stats['first_image']:>11.1f}{stats['steady_image']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmarks query-image decoding at full resolution against the reduced path.
+
+Each mode runs in a fresh process so its peak RSS is measured in isolation.
+"full" is the previous ``Image.open(...).convert("RGB")`` followed by the model
+transform; "reduced" is ``src.utils.image_decode.preprocess`` (JPEG draft mode
+or box reduction). A synthetic 3840x2160 JPEG is used unless --image is given.
+
+Example:
+    python -m src.tools.bench_image_decode --size 378 --repeat 50
+"""
+
+import argparse
+import io
+import resource
+import time
+from multiprocessing import get_context
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+from open_clip.transform import image_transform
+
+from src.utils.image_decode import preprocess
+
+
+def synthetic_jpeg(
+    width: int = 3840,
+    height: int = 2160,
+    quality: int = 90
+) -> bytes:
+    """
+    Encodes a noisy gradient image as JPEG, standing in for a 4K screenshot.
+    """
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = gradient + rng.normal(0, 20, (height, width, 3))
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def run_mode(
+    mode: str,
+    data: bytes,
+    size: int,
+    repeat: int
+) -> Dict[str, float]:
+    """
+    Decodes and transforms the image repeat times in the current process.
+
+    Returns:
+        Dict[str, float]: Mean milliseconds per image and peak RSS growth in MB.
+    """
+    processor = image_transform(size, is_train=False)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if mode == "full":
+            processor(Image.open(io.BytesIO(data)).convert("RGB"))
+        else:
+            preprocess(processor, io.BytesIO(data), size)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"ms": elapsed / repeat * 1000, "peak_mb": (peak - baseline) / 1024}
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--image", help="a JPEG to use instead of the synthetic 4K one")
+    parser.add_argument("--size", type=int, default=378, help="model input resolution")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_jpeg()
+    print(f"input: {len(data) / 1e6:.1f} MB, target {args.size}px")
+    context = get_context("spawn")
+    for mode in ("full", "reduced"):
+        with context.Pool(1) as pool:
+            stats = pool.apply(run_mode, (mode, data, args.size, args.repeat))
+        print(f"{mode:>8}: {stats['ms']:.1f} ms/image, peak RSS +{stats['peak_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares text-search throughput in-process and through the inference worker.
+
+The in-process mode loads the encoders and indexes here and runs
+``text_embedding`` followed by ``ClipFaiss.search`` per query, as the API does
+today. The remote mode sends the same queries to a running worker
+(``python -m src.inference.worker``) with ``OP_TEXT_SEARCH``, where concurrent
+queries are batched. Both report queries/s and latency percentiles.
+
+Example:
+    python -m src.tools.bench_inference --mode remote \
+        --socket /tmp/hermes-inference.sock --concurrency 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+import numpy as np
+import torch
+
+from src.inference.client import InferenceClient
+from src.inference.worker import load_encoders
+from src.repositories.load_faiss import ClipFaiss
+from src.services import service as config
+
+QUERIES = [
+    "a man riding a bicycle on a crowded street",
+    "a news anchor sitting at a desk",
+    "fireworks over a river at night",
+    "a red car parked in front of a building",
+    "children playing football on a field",
+    "a woman cooking in a kitchen",
+    "a boat on the sea at sunset",
+    "a crowd of people holding flags"
+]
+
+
+async def run(
+    search: Callable[[str], Awaitable],
+    queries: List[str],
+    requests: int,
+    concurrency: int
+) -> None:
+    """
+    Issues requests with a fixed number of concurrent clients and prints statistics.
+
+    Args:
+        search: An async function running one query.
+        queries (List[str]): The queries, used round-robin.
+        requests (int): The total number of queries.
+        concurrency (int): The number of concurrent clients.
+    """
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client() -> None:
+        for number in counter:
+            started = time.perf_counter()
+            await search(queries[number % len(queries)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    print(
+        f"{requests} queries in {elapsed:.2f}s: {requests / elapsed:.1f} q/s, "
+        f"p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms"
+    )
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("local", "remote"), required=True)
+    parser.add_argument("--model", choices=("apple_clip", "laion_clip"), default="apple_clip")
+    parser.add_argument("--socket", default=config.INFERENCE_SOCKET or "/tmp/hermes-inference.sock")
+    parser.add_argument("--top-k", type=int, default=config.TOP_K)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.mode == "remote":
+        client = InferenceClient(socket_path=args.socket)
+
+        async def search(text: str):
+            return await client.text_search(args.model, text, args.top_k)
+    else:
+        device = torch.device(
+            config.CLIP_DEVICE or ("cuda" if torch.cuda.is_available() else "cpu")
+        )
+        encoder = load_encoders(device)[args.model]
+        faiss = ClipFaiss(
+            apple_faiss_url=config.APPLE_FAISS,
+            laion_faiss_url=config.LAION_FAISS,
+            apple_gpu_device=config.APPLE_FAISS_GPU,
+            mmap=config.FAISS_MMAP
+        )
+
+        async def search(text: str):
+            vectors = await encoder.text_embedding(text)
+            return await faiss.search(args.model, args.top_k, vectors)
+
+    asyncio.run(run(search, QUERIES, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
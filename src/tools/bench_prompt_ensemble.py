@@ -0,0 +1,98 @@
+"""
+Compares the latency of plain, sequential-template and batched-ensemble
+query encoding.
+
+"plain" encodes the bare query; "sequential" encodes each template with its
+own forward; "batched" is ``PromptEnsemble.embed`` with a cold cache (one
+batched forward) and "cached" the same with every prompt already cached.
+
+Example:
+    python -m src.tools.bench_prompt_ensemble --model apple_clip --repeat 20
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+import torch
+
+from src.inference.worker import load_encoders
+from src.services import service as config
+from src.utils.prompt_ensemble import PromptEnsemble
+
+QUERIES = [
+    "a man riding a bicycle on a crowded street",
+    "fireworks over a river at night",
+    "a red car parked in front of a building",
+    "children playing football on a field"
+]
+
+
+async def measure(
+    name: str,
+    encode: Callable[[str], Awaitable],
+    repeat: int,
+    synchronize: Callable[[], None]
+) -> None:
+    """
+    Times encode over the queries and prints the mean latency.
+    """
+    await encode(QUERIES[0])
+    synchronize()
+    started = time.perf_counter()
+    for number in range(repeat):
+        await encode(QUERIES[number % len(QUERIES)])
+    synchronize()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"{name:>10}: {elapsed:.1f} ms/query")
+
+
+async def run(
+    model_type: str,
+    repeat: int
+) -> None:
+    """
+    Loads the encoder and runs each mode.
+    """
+    device = torch.device(
+        config.CLIP_DEVICE or ("cuda" if torch.cuda.is_available() else "cpu")
+    )
+    encoder = load_encoders(device)[model_type]
+
+    def synchronize() -> None:
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+
+    cold = PromptEnsemble(cache_size=0)
+    warm = PromptEnsemble()
+    for query in QUERIES:
+        await warm.embed(encoder, model_type, query)
+    print(f"{len(cold.templates)} templates on {device}")
+
+    async def sequential(text: str):
+        return [await encoder.text_embedding(prompt) for prompt in cold.prompts(text)]
+
+    await measure("plain", encoder.text_embedding, repeat, synchronize)
+    await measure("sequential", sequential, repeat, synchronize)
+    await measure(
+        "batched", lambda text: cold.embed(encoder, model_type, text), repeat, synchronize
+    )
+    await measure(
+        "cached", lambda text: warm.embed(encoder, model_type, text), repeat, synchronize
+    )
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", choices=("apple_clip", "laion_clip"), default="apple_clip")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.model, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Splits a model index into per-video-batch shards for ``ShardedFaiss``.
+
+Vectors are grouped by the ``video_id`` prefix in ``clip.json`` (``L01_V001``
+belongs to batch ``L01``) and each batch is written as ``<batch>.faiss`` with
+a ``<batch>.ids.npy`` array of the global indices it holds.
+
+Example:
+    python -m src.tools.build_shards --index apple.faiss \
+        --json /kaggle/input/json-clip/clip.json --output-dir apple_shards
+"""
+
+import argparse
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from src.repositories.sharded_faiss import IDS_SUFFIX, SHARD_SUFFIX
+
+
+def video_batch(video_id: str) -> str:
+    """
+    Returns the batch prefix of a video id, e.g. "L01" for "L01_V001".
+    """
+    return video_id.split("_")[0]
+
+
+def group_indices(json_url: str) -> Dict[str, List[int]]:
+    """
+    Groups global indices by video batch.
+
+    Args:
+        json_url (str): The path to the metadata JSON file.
+
+    Returns:
+        Dict[str, List[int]]: Sorted global indices per batch.
+    """
+    with open(json_url, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    groups = defaultdict(list)
+    for obj in mapping:
+        groups[video_batch(obj["video_id"])].append(int(obj["indice"]))
+    return {batch: sorted(ids) for batch, ids in groups.items()}
+
+
+def write_shard(
+    index: faiss.Index,
+    ids: List[int],
+    output_dir: str,
+    name: str,
+    factory: str = "Flat",
+    batch_size: int = 65536
+) -> None:
+    """
+    Copies the given vectors of the source index into a new shard.
+
+    Args:
+        index (faiss.Index): The source index.
+        ids (List[int]): The global indices belonging to the shard.
+        output_dir (str): The shard directory.
+        name (str): The shard name.
+        factory (str): The FAISS index factory string for the shard.
+        batch_size (int): The number of vectors copied at a time.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    shard = faiss.index_factory(index.d, factory, faiss.METRIC_INNER_PRODUCT)
+    for start in range(0, len(ids), batch_size):
+        vectors = index.reconstruct_batch(ids[start:start + batch_size])
+        if not shard.is_trained:
+            shard.train(vectors)
+        shard.add(vectors)
+    faiss.write_index(shard, os.path.join(output_dir, name + SHARD_SUFFIX))
+    np.save(os.path.join(output_dir, name + IDS_SUFFIX), ids)
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", required=True, help="source FAISS index")
+    parser.add_argument("--json", required=True, help="metadata JSON (clip.json)")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--factory", default="Flat")
+    parser.add_argument("--batches", nargs="*", help="only write these batches")
+    args = parser.parse_args()
+
+    index = faiss.read_index(args.index)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, ids in group_indices(args.json).items():
+        if args.batches and name not in args.batches:
+            continue
+        write_shard(
+            index=index,
+            ids=ids,
+            output_dir=args.output_dir,
+            name=name,
+            factory=args.factory
+        )
+        print(f"{name}: {len(ids)} vectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Builds the artifacts for two-stage (coarse search + exact re-rank) retrieval.
+
+From an existing full-precision index this writes:
+    * a compressed IVF-PQ index used for the wide candidate search, and
+    * a ``.npy`` matrix of the original vectors (fp16 or fp32) that
+      ``ClipFaiss`` memory-maps to re-rank candidates exactly.
+
+Example:
+    python -m src.tools.build_two_stage --index laion.faiss \
+        --coarse-output laion_ivfpq.faiss --vectors-output laion_fp16.npy \
+        --nlist 4096 --pq-m 64 --nprobe 32
+"""
+
+import argparse
+
+import faiss
+import numpy as np
+
+from src.tools.reduce_index import iter_vectors, sample_vectors
+
+
+def build_coarse_index(
+    index: faiss.Index,
+    nlist: int,
+    pq_m: int,
+    nprobe: int,
+    n_train: int = 200000
+) -> faiss.Index:
+    """
+    Trains an inner-product IVF-PQ index on the vectors of the source index.
+
+    Args:
+        index (faiss.Index): The full-precision source index.
+        nlist (int): The number of inverted lists.
+        pq_m (int): The number of PQ sub-quantizers, must divide the dimension.
+        nprobe (int): The number of lists probed at search time (saved with the index).
+        n_train (int): The number of vectors used for training.
+
+    Returns:
+        faiss.Index: The trained and populated coarse index.
+    """
+    coarse = faiss.index_factory(
+        index.d, f"IVF{nlist},PQ{pq_m}", faiss.METRIC_INNER_PRODUCT
+    )
+    coarse.train(sample_vectors(index, max(n_train, 39 * nlist)))
+    for batch in iter_vectors(index):
+        coarse.add(batch)
+    faiss.extract_index_ivf(coarse).nprobe = nprobe
+    return coarse
+
+
+def write_vectors(
+    index: faiss.Index,
+    output: str,
+    dtype: str = "float16"
+) -> None:
+    """
+    Streams the stored vectors into a ``.npy`` file without loading them all.
+
+    Args:
+        index (faiss.Index): The full-precision source index.
+        output (str): The ``.npy`` path to write.
+        dtype (str): Either "float16" or "float32".
+    """
+    matrix = np.lib.format.open_memmap(
+        output, mode="w+", dtype=dtype, shape=(index.ntotal, index.d)
+    )
+    start = 0
+    for batch in iter_vectors(index):
+        matrix[start:start + len(batch)] = batch
+        start += len(batch)
+    matrix.flush()
+    del matrix
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", required=True, help="source FAISS index")
+    parser.add_argument("--coarse-output", required=True)
+    parser.add_argument("--vectors-output", required=True)
+    parser.add_argument("--dtype", choices=("float16", "float32"), default="float16")
+    parser.add_argument("--nlist", type=int, default=4096)
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--nprobe", type=int, default=32)
+    parser.add_argument("--n-train", type=int, default=200000)
+    args = parser.parse_args()
+
+    index = faiss.read_index(args.index)
+    write_vectors(index, args.vectors_output, args.dtype)
+    coarse = build_coarse_index(
+        index=index,
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        nprobe=args.nprobe,
+        n_train=args.n_train
+    )
+    faiss.write_index(coarse, args.coarse_output)
+    print(f"wrote {coarse.ntotal} vectors to {args.coarse_output} and {args.vectors_output}")
+
+
+if __name__ == "__main__":
+    main()
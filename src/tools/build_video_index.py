@@ -0,0 +1,56 @@
+"""
+Builds the per-video centroid index used for coarse-to-fine search.
+
+Each video's keyframe vectors are averaged and L2-normalized into one
+centroid; centroids are stored in a small ``IndexFlatIP`` next to a JSON list
+of the video id of each row.
+
+Example:
+    python -m src.tools.build_video_index --index apple.faiss \
+        --json /kaggle/input/json-clip/clip.json --output apple_videos
+    # writes apple_videos.faiss and apple_videos.json
+"""
+
+import argparse
+import json
+from collections import defaultdict
+
+import faiss
+import numpy as np
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", required=True, help="keyframe FAISS index")
+    parser.add_argument("--json", required=True, help="metadata JSON (clip.json)")
+    parser.add_argument("--output", required=True, help="output path prefix")
+    args = parser.parse_args()
+
+    index = faiss.read_index(args.index)
+    with open(args.json, "r", encoding="utf-8") as f:
+        mapping = json.load(f)
+    videos = defaultdict(list)
+    for obj in mapping:
+        videos[obj["video_id"]].append(int(obj["indice"]))
+
+    video_ids = sorted(videos)
+    centroids = faiss.IndexFlatIP(index.d)
+    for start in range(0, len(video_ids), 256):
+        batch = np.vstack([
+            index.reconstruct_batch(np.asarray(videos[video_id], dtype=np.int64)).mean(axis=0)
+            for video_id in video_ids[start:start + 256]
+        ]).astype(np.float32)
+        faiss.normalize_L2(batch)
+        centroids.add(batch)
+
+    faiss.write_index(centroids, f"{args.output}.faiss")
+    with open(f"{args.output}.json", "w", encoding="utf-8") as f:
+        json.dump(video_ids, f)
+    print(f"wrote {len(video_ids)} video centroids to {args.output}.faiss")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Incrementally ingests new keyframes into a model index and its metadata.
+
+Keyframes are read from ``<images_dir>/<video_id>/<frame_id>.jpg``. Images are
+decoded and preprocessed in a process pool while the previous batch is being
+encoded, so at most two batches are held in memory.
+
+Metadata rows are appended to a journal next to the metadata (``clip.jsonl``
+for ``clip.json``, one row per line, ``indice`` = line number = FAISS row),
+which all models share. Each index has a progress sidecar
+(``<index>.progress``) recording its model and how many journal rows it
+covers. A run first encodes the journal rows its index does not cover yet
+(frames another model's run added), then new frames not in the journal, so
+every index stays aligned with the same rows. Checkpoints flush the journal,
+then write the index and its sidecar atomically; an interrupted run resumes
+from the index. ``clip.json`` is rebuilt from the journal, streaming, when
+the run finishes. Only the (video_id, frame_id) keys of the journal are held
+in memory, never the rows themselves.
+
+Example:
+    python -m src.tools.ingest_keyframes --model apple_clip \
+        --images-dir keyframes/ --index apple.faiss \
+        --json clip.json --batch-size 128 --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from itertools import islice
+from multiprocessing import Pool
+from typing import Dict, Iterator, Set, Tuple, Union
+
+import faiss
+import numpy as np
+import torch
+from PIL import Image
+from open_clip import create_model_from_pretrained
+
+from src.modules.apple_clip import AppleCLIP
+from src.modules.laion_clip import LaionCLIP
+from src.services.service import APPLE_CLIP_MODEL, LAION_CLIP_MODEL
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+_processor = None
+
+
+def _init_worker(processor) -> None:
+    """
+    Stores the image transform in a pool worker.
+    """
+    global _processor  # pylint: disable=global-statement
+    _processor = processor
+
+
+def _preprocess(path: str) -> Union[np.ndarray, None]:
+    """
+    Decodes and transforms one image in a pool worker.
+
+    Returns:
+        np.ndarray: The (3, H, W) float array, or None for unreadable files.
+    """
+    try:
+        with Image.open(path) as image:
+            return _processor(image.convert("RGB")).numpy()
+    except OSError:
+        return None
+
+
+def load_encoder(
+    model_type: str,
+    device: torch.device
+) -> Union[AppleCLIP, LaionCLIP]:
+    """
+    Loads the image encoder of the given model.
+
+    Args:
+        model_type (str): Either "apple_clip" or "laion_clip".
+        device (torch.device): The device to run the encoder on.
+
+    Returns:
+        Union[AppleCLIP, LaionCLIP]: The encoder wrapper.
+    """
+    if model_type == "apple_clip":
+        model, processor = create_model_from_pretrained(APPLE_CLIP_MODEL)
+        encoder = AppleCLIP
+    elif model_type == "laion_clip":
+        model, processor = create_model_from_pretrained(LAION_CLIP_MODEL)
+        encoder = LaionCLIP
+    else:
+        raise ValueError(f"Model type not supported: {model_type}")
+    model.to(device).eval()
+    return encoder(
+        model=model,
+        processor=processor,
+        tokenizer=None,
+        device_type=device
+    )
+
+
+def journal_path(json_url: str) -> str:
+    """
+    Returns the path of the row journal kept next to a metadata file.
+    """
+    return f"{os.path.splitext(json_url)[0]}.jsonl"
+
+
+def iter_journal(
+    path: str,
+    start: int = 0,
+    stop: Union[int, None] = None
+) -> Iterator[Dict]:
+    """
+    Lazily reads the journal rows in [start, stop).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for row in islice(f, start, stop):
+            yield json.loads(row)
+
+
+def truncate_torn_row(path: str) -> int:
+    """
+    Drops a partial last row left by a run killed in the middle of an append.
+
+    Rows are only complete once their newline is written, and the journal is
+    flushed before every index write, so no index covers a torn row.
+
+    Args:
+        path (str): The journal path.
+
+    Returns:
+        int: The number of bytes removed.
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            chunk = f.read(end - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+
+def open_journal(json_url: str) -> str:
+    """
+    Returns the row journal, creating it from the metadata on first use.
+
+    A torn last row from an interrupted run is truncated on reopen.
+
+    Args:
+        json_url (str): The metadata path; an empty journal is created if missing.
+
+    Returns:
+        str: The journal path.
+    """
+    path = journal_path(json_url)
+    if os.path.exists(path):
+        torn = truncate_torn_row(path)
+        if torn:
+            print(f"dropped a partial last row ({torn} bytes) from {path}")
+        return path
+    mapping = []
+    if os.path.exists(json_url):
+        with open(json_url, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for position, row in enumerate(sorted(mapping, key=lambda row: row["indice"])):
+            if row["indice"] != position:
+                raise RuntimeError(f"{json_url} is missing indice {position}")
+            f.write(json.dumps(row) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def scan_journal(path: str) -> Tuple[int, Set[Tuple[str, str]]]:
+    """
+    Counts the journal rows and collects their frame keys.
+
+    Returns:
+        Tuple[int, Set[Tuple[str, str]]]: The row count and the (video_id,
+        frame_id) pairs already journaled.
+    """
+    rows = 0
+    done = set()
+    for row in iter_journal(path):
+        done.add((row["video_id"], row["frame_id"]))
+        rows += 1
+    return rows, done
+
+
+def iter_keyframes(
+    images_dir: str,
+    done: Set[Tuple[str, str]]
+) -> Iterator[Tuple[str, str, str]]:
+    """
+    Lazily walks the keyframe directory in (video_id, frame_id) order.
+
+    Args:
+        images_dir (str): The root directory with one folder per video.
+        done (Set[Tuple[str, str]]): Frames already in the journal.
+
+    Yields:
+        Tuple[str, str, str]: The video id, frame id and image path.
+    """
+    for video_id in sorted(os.listdir(images_dir)):
+        video_dir = os.path.join(images_dir, video_id)
+        if not os.path.isdir(video_dir):
+            continue
+        for frame_id in sorted(os.listdir(video_dir)):
+            if not frame_id.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if (video_id, frame_id) in done:
+                continue
+            yield video_id, frame_id, os.path.join(video_dir, frame_id)
+
+
+def atomic_write_index(
+    index: faiss.Index,
+    path: str
+) -> None:
+    """
+    Writes an index through a temporary file so readers never see a partial file.
+    """
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_progress(
+    index_url: str,
+    model_type: str,
+    rows: int
+) -> None:
+    """
+    Records atomically how many journal rows an index covers.
+    """
+    path = f"{index_url}.progress"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"model": model_type, "rows": rows}, f)
+    os.replace(tmp_path, path)
+
+
+def load_index(
+    index_url: str,
+    model_type: str,
+    dim: int,
+    journal_rows: int
+) -> faiss.Index:
+    """
+    Loads an index and checks it belongs to the model and fits the journal.
+
+    The journal is flushed before every index write, so an index never
+    covers rows the journal lacks; the sidecar may lag the index by one
+    checkpoint and is rewritten from it.
+
+    Args:
+        index_url (str): The index path; a flat index is created if missing.
+        model_type (str): The model the index must have been built with.
+        dim (int): The embedding dimensionality for a new index.
+        journal_rows (int): The number of journal rows.
+
+    Returns:
+        faiss.Index: The index.
+
+    Raises:
+        RuntimeError: If the index belongs to another model or has more
+        vectors than the journal has rows.
+    """
+    index = faiss.read_index(index_url) if os.path.exists(index_url) else faiss.IndexFlatIP(dim)
+    progress_url = f"{index_url}.progress"
+    if os.path.exists(progress_url):
+        with open(progress_url, "r", encoding="utf-8") as f:
+            progress = json.load(f)
+        if progress["model"] != model_type:
+            raise RuntimeError(f"{index_url} was built with {progress['model']}, not {model_type}")
+    if index.ntotal > journal_rows:
+        raise RuntimeError(
+            f"{index_url} has {index.ntotal} vectors but the journal only {journal_rows} rows"
+        )
+    write_progress(index_url, model_type, index.ntotal)
+    return index
+
+
+def export_json(
+    journal: str,
+    json_url: str
+) -> None:
+    """
+    Rebuilds the metadata JSON array from the journal, one row at a time.
+    """
+    tmp_path = f"{json_url}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for position, row in enumerate(iter_journal(journal)):
+            f.write((", " if position else "") + json.dumps(row))
+        f.write("]")
+    os.replace(tmp_path, json_url)
+
+
+async def ingest(
+    model_type: str,
+    images_dir: str,
+    index_url: str,
+    json_url: str,
+    batch_size: int = 128,
+    workers: int = 8,
+    checkpoint_every: int = 20
+) -> int:
+    """
+    Runs the ingestion pipeline.
+
+    Args:
+        model_type (str): Either "apple_clip" or "laion_clip".
+        images_dir (str): The root directory with one folder per video.
+        index_url (str): The FAISS index to append to.
+        json_url (str): The metadata JSON to append to.
+        batch_size (int): The number of images per encoder batch.
+        workers (int): The number of decode/preprocess processes.
+        checkpoint_every (int): The number of batches between checkpoints.
+
+    Returns:
+        int: The number of frames encoded into the index.
+    """
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    encoder = load_encoder(model_type, device)
+    dim = encoder._model.visual.output_dim  # pylint: disable=protected-access
+    journal = open_journal(json_url)
+    journal_rows, done = scan_journal(journal)
+    index = load_index(index_url, model_type, dim, journal_rows)
+    if index.ntotal < journal_rows:
+        print(f"catching up on {journal_rows - index.ntotal} rows added by other models")
+
+    catch_up = iter_journal(journal, start=index.ntotal, stop=journal_rows)
+
+    def work() -> Iterator[Tuple[str, str, str, bool]]:
+        # journaled rows this index lacks come first, so new rows get the next indice
+        for row in catch_up:
+            path = os.path.join(images_dir, row["video_id"], row["frame_id"])
+            yield row["video_id"], row["frame_id"], path, True
+        for video_id, frame_id, path in iter_keyframes(images_dir, done):
+            yield video_id, frame_id, path, False
+
+    keyframes = work()
+    ingested = 0
+    missing = 0
+    batches = 0
+    start = time.perf_counter()
+
+    def checkpoint() -> None:
+        rows_file.flush()
+        os.fsync(rows_file.fileno())
+        atomic_write_index(index, index_url)
+        write_progress(index_url, model_type, index.ntotal)
+        elapsed = time.perf_counter() - start
+        print(
+            f"checkpoint: {ingested} frames, {index.ntotal} total, "
+            f"{ingested / max(elapsed, 1e-9):.1f} frames/s"
+        )
+
+    with open(journal, "a", encoding="utf-8") as rows_file, \
+            Pool(workers, initializer=_init_worker, initargs=(encoder.processor,)) as pool:
+        chunk = list(islice(keyframes, batch_size))
+        pending = pool.map_async(_preprocess, [item[2] for item in chunk])
+        while chunk:
+            arrays = pending.get()
+            current = chunk
+            chunk = list(islice(keyframes, batch_size))
+            if chunk:
+                pending = pool.map_async(_preprocess, [item[2] for item in chunk])
+
+            readable = [array for array in arrays if array is not None]
+            vectors = iter(())
+            if readable:
+                encoded = await encoder.image_embedding_batch(torch.from_numpy(np.stack(readable)))
+                vectors = iter(np.ascontiguousarray(encoded.float().cpu().numpy()))
+            batch = []
+            for (video_id, frame_id, _, journaled), array in zip(current, arrays):
+                if array is None:
+                    if not journaled:
+                        continue
+                    # a journaled row must keep its place, so it gets a zero vector
+                    missing += 1
+                    batch.append(np.zeros(dim, dtype=np.float32))
+                    continue
+                batch.append(next(vectors))
+                if not journaled:
+                    rows_file.write(json.dumps({
+                        "indice": journal_rows,
+                        "video_id": video_id,
+                        "frame_id": frame_id
+                    }) + "\n")
+                    journal_rows += 1
+            if not batch:
+                continue
+            index.add(np.stack(batch))
+            ingested += len(batch)
+            batches += 1
+            if batches % checkpoint_every == 0:
+                checkpoint()
+        checkpoint()
+    if missing:
+        print(f"{missing} journaled frames could not be read and were added as zero vectors")
+    export_json(journal, json_url)
+    return ingested
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", choices=("apple_clip", "laion_clip"), required=True)
+    parser.add_argument("--images-dir", required=True)
+    parser.add_argument("--index", required=True, help="FAISS index to append to")
+    parser.add_argument("--json", required=True, help="metadata JSON to append to")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint-every", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(ingest(
+        model_type=args.model,
+        images_dir=args.images_dir,
+        index_url=args.index,
+        json_url=args.json,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Offline dimensionality reduction for CLIP FAISS indexes.
+
+Learns a PCA or OPQ projection from the vectors stored in an existing index and
+writes a ``faiss.IndexPreTransform`` so the projection is applied to query
+vectors at search time. ``ClipFaiss`` loads the resulting file like any other
+index. FAISS cannot clone a flat ``IndexScalarQuantizer`` to the GPU, so an
+Apple index written with fp16 or sq8 storage is served from the CPU (with a
+warning); use flat storage to keep it on the GPU.
+
+Example:
+    python -m src.tools.reduce_index \
+        --index /kaggle/input/faiss-database/laion.faiss \
+        --output laion_pca256_fp16.faiss --dim 256 --storage fp16
+
+    python -m src.tools.reduce_index \
+        --index /kaggle/input/faiss-database/laion.faiss \
+        --benchmark --dims 128 256 384 512 --top-k 10 100 1500
+"""
+
+import argparse
+import time
+from typing import Dict, Iterator, List
+
+import faiss
+import numpy as np
+
+STORAGE_TYPES = ("flat", "fp16", "sq8")
+
+
+def iter_vectors(
+    index: faiss.Index,
+    batch_size: int = 65536
+) -> Iterator[np.ndarray]:
+    """
+    Yields the vectors stored in an index batch by batch.
+
+    Args:
+        index (faiss.Index): An index supporting ``reconstruct_n``.
+        batch_size (int): The number of vectors per batch.
+
+    Yields:
+        np.ndarray: A float32 array of shape (n, d).
+    """
+    for start in range(0, index.ntotal, batch_size):
+        count = min(batch_size, index.ntotal - start)
+        yield index.reconstruct_n(start, count)
+
+
+def sample_vectors(
+    index: faiss.Index,
+    n_samples: int,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Draws a random sample of stored vectors for training.
+
+    Args:
+        index (faiss.Index): An index supporting ``reconstruct``.
+        n_samples (int): The number of vectors to sample.
+        seed (int): The random seed.
+
+    Returns:
+        np.ndarray: A float32 array of shape (n_samples, d).
+    """
+    n_samples = min(n_samples, index.ntotal)
+    rng = np.random.default_rng(seed)
+    ids = np.sort(rng.choice(index.ntotal, size=n_samples, replace=False))
+    return np.vstack([index.reconstruct(int(i)) for i in ids]).astype(np.float32)
+
+
+def build_transform(
+    method: str,
+    d_in: int,
+    d_out: int,
+    opq_m: int = 32
+) -> faiss.VectorTransform:
+    """
+    Creates an untrained projection from d_in to d_out dimensions.
+
+    Args:
+        method (str): Either "pca" or "opq".
+        d_in (int): The input dimensionality.
+        d_out (int): The output dimensionality.
+        opq_m (int): The number of OPQ sub-spaces, must divide d_out.
+
+    Returns:
+        faiss.VectorTransform: The untrained transform.
+    """
+    if method == "pca":
+        return faiss.PCAMatrix(d_in, d_out)
+    if method == "opq":
+        if d_out % opq_m:
+            raise ValueError(f"OPQ requires dim {d_out} to be a multiple of {opq_m}")
+        return faiss.OPQMatrix(d_in, opq_m, d_out)
+    raise ValueError(f"Unknown transform method: {method}")
+
+
+def build_storage(
+    storage: str,
+    dim: int
+) -> faiss.Index:
+    """
+    Creates the inner-product index that stores the projected vectors.
+
+    Args:
+        storage (str): One of "flat", "fp16" or "sq8".
+        dim (int): The projected dimensionality.
+
+    Returns:
+        faiss.Index: The empty storage index.
+    """
+    if storage == "flat":
+        return faiss.IndexFlatIP(dim)
+    if storage == "fp16":
+        return faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+        )
+    if storage == "sq8":
+        return faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+    raise ValueError(f"Unknown storage type: {storage}")
+
+
+def build_reduced_index(
+    index: faiss.Index,
+    dim: int,
+    method: str = "pca",
+    storage: str = "flat",
+    n_train: int = 100000,
+    opq_m: int = 32,
+    normalize: bool = True
+) -> faiss.IndexPreTransform:
+    """
+    Learns a projection from the indexed vectors and re-adds them reduced.
+
+    The projected vectors are re-normalized by default so inner-product search
+    keeps ranking by cosine similarity, as the original CLIP index does.
+
+    Args:
+        index (faiss.Index): The full-precision source index.
+        dim (int): The target dimensionality.
+        method (str): Either "pca" or "opq".
+        storage (str): One of "flat", "fp16" or "sq8".
+        n_train (int): The number of vectors used to learn the projection.
+        opq_m (int): The number of OPQ sub-spaces.
+        normalize (bool): Whether to L2-normalize projected vectors.
+
+    Returns:
+        faiss.IndexPreTransform: The trained and populated reduced index.
+    """
+    reduced = faiss.IndexPreTransform(build_storage(storage, dim))
+    if normalize:
+        reduced.prepend_transform(faiss.NormalizationTransform(dim, 2.0))
+    reduced.prepend_transform(build_transform(method, index.d, dim, opq_m))
+    reduced.train(sample_vectors(index, n_train))
+    for batch in iter_vectors(index):
+        reduced.add(batch)
+    return reduced
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """
+    Returns the serialized size of an index, a close proxy for its RAM usage.
+    """
+    return faiss.serialize_index(index).nbytes
+
+
+def recall_at_k(
+    ground_truth: np.ndarray,
+    indices: np.ndarray,
+    k: int
+) -> float:
+    """
+    Computes the mean fraction of the true top-k found in the returned top-k.
+    """
+    hits = [
+        len(np.intersect1d(gt[:k], res[:k], assume_unique=True))
+        for gt, res in zip(ground_truth, indices)
+    ]
+    return float(np.mean(hits)) / k
+
+
+def benchmark(
+    index: faiss.Index,
+    dims: List[int],
+    top_ks: List[int],
+    queries: np.ndarray,
+    method: str = "pca",
+    storage: str = "flat",
+    n_train: int = 100000,
+    opq_m: int = 32,
+    normalize: bool = True
+) -> List[Dict]:
+    """
+    Measures recall@K, per-query latency and memory for several target dims.
+
+    Queries are issued one at a time, matching how the API searches.
+
+    Args:
+        index (faiss.Index): The full-precision source index (ground truth).
+        dims (List[int]): The target dimensionalities to evaluate.
+        top_ks (List[int]): The K values for recall@K.
+        queries (np.ndarray): The query vectors.
+        method (str): Either "pca" or "opq".
+        storage (str): One of "flat", "fp16" or "sq8".
+        n_train (int): The number of vectors used to learn the projection.
+        opq_m (int): The number of OPQ sub-spaces.
+        normalize (bool): Whether to L2-normalize projected vectors.
+
+    Returns:
+        List[Dict]: One row per evaluated configuration, baseline first.
+    """
+    max_k = max(top_ks)
+
+    def timed_search(target: faiss.Index) -> Dict:
+        results = []
+        start = time.perf_counter()
+        for query in queries:
+            _, indices = target.search(query[None, :], max_k)
+            results.append(indices[0])
+        elapsed = time.perf_counter() - start
+        return {
+            "indices": np.vstack(results),
+            "latency_ms": 1000 * elapsed / len(queries)
+        }
+
+    baseline = timed_search(index)
+    rows = [{
+        "dim": index.d,
+        "storage": "original",
+        "latency_ms": baseline["latency_ms"],
+        "bytes": index_bytes(index),
+        **{f"recall@{k}": 1.0 for k in top_ks}
+    }]
+    for dim in dims:
+        reduced = build_reduced_index(
+            index=index,
+            dim=dim,
+            method=method,
+            storage=storage,
+            n_train=n_train,
+            opq_m=opq_m,
+            normalize=normalize
+        )
+        measured = timed_search(reduced)
+        rows.append({
+            "dim": dim,
+            "storage": f"{method}+{storage}",
+            "latency_ms": measured["latency_ms"],
+            "bytes": index_bytes(reduced),
+            **{
+                f"recall@{k}": recall_at_k(baseline["indices"], measured["indices"], k)
+                for k in top_ks
+            }
+        })
+    return rows
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", required=True, help="source FAISS index")
+    parser.add_argument("--output", help="path of the reduced index to write")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--method", choices=("pca", "opq"), default="pca")
+    parser.add_argument("--storage", choices=STORAGE_TYPES, default="flat")
+    parser.add_argument("--opq-m", type=int, default=32)
+    parser.add_argument("--n-train", type=int, default=100000)
+    parser.add_argument("--no-normalize", action="store_true")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 384, 512])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[10, 100, 1500])
+    parser.add_argument("--queries", help=".npy file of query vectors")
+    parser.add_argument("--n-queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index = faiss.read_index(args.index)
+
+    if args.benchmark:
+        if args.queries:
+            queries = np.load(args.queries).astype(np.float32)
+        else:
+            queries = sample_vectors(index, args.n_queries, seed=1)
+        rows = benchmark(
+            index=index,
+            dims=args.dims,
+            top_ks=args.top_k,
+            queries=queries,
+            method=args.method,
+            storage=args.storage,
+            n_train=args.n_train,
+            opq_m=args.opq_m,
+            normalize=not args.no_normalize
+        )
+        recall_columns = [f"recall@{k}" for k in args.top_k]
+        print("dim\tstorage\tlatency_ms\tMiB\t" + "\t".join(recall_columns))
+        for row in rows:
+            print(
+                f"{row['dim']}\t{row['storage']}\t{row['latency_ms']:.2f}\t"
+                f"{row['bytes'] / 2 ** 20:.1f}\t"
+                + "\t".join(f"{row[c]:.3f}" for c in recall_columns)
+            )
+        return
+
+    if not args.output:
+        parser.error("--output is required unless --benchmark is given")
+    reduced = build_reduced_index(
+        index=index,
+        dim=args.dim,
+        method=args.method,
+        storage=args.storage,
+        n_train=args.n_train,
+        opq_m=args.opq_m,
+        normalize=not args.no_normalize
+    )
+    faiss.write_index(reduced, args.output)
+    faiss.write_VectorTransform(reduced.chain.at(0), f"{args.output}.vt")
+    print(f"wrote {reduced.ntotal} vectors ({index.d} -> {args.dim}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
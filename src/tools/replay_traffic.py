@@ -0,0 +1,188 @@
+"""
+Replays traffic captured by TrafficCaptureMiddleware and reports latency per endpoint.
+
+Requests are sent at their original spacing multiplied by 1 / --speed
+(``--speed 0`` sends them back to back), with at most --concurrency in
+flight. ``--target app`` drives an ASGI application in-process, by default
+``main:app``; point --app at another module to replay against stand-in
+models. Any other target is used as the base URL of a running server.
+
+Example:
+    python -m src.tools.replay_traffic --file requests.jsonl \
+        --target http://localhost:8000 --speed 2 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from src.api.middlewares.traffic_capture import decode_body
+
+
+def load_records(
+    path: str,
+    prefix: str = "",
+    limit: int = 0
+) -> List[Dict]:
+    """
+    Reads the captured records, oldest first.
+
+    Lines that are not capture records are skipped.
+
+    Args:
+        path (str): The JSONL capture file.
+        prefix (str): Only replay paths starting with this prefix.
+        limit (int): The maximum number of records, 0 for all.
+
+    Returns:
+        List[Dict]: The records sorted by timestamp.
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "method" not in record or "path" not in record:
+                continue
+            if record.get("truncated") or not record["path"].startswith(prefix):
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record.get("timestamp", 0))
+    return records[:limit] if limit else records
+
+
+def make_client(
+    target: str,
+    app_path: str,
+    timeout: float
+) -> httpx.AsyncClient:
+    """
+    Builds an HTTP client for a server URL, or an in-process one for target "app".
+    """
+    if target != "app":
+        return httpx.AsyncClient(base_url=target, timeout=timeout)
+    module_name, _, attribute = app_path.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://replay",
+        timeout=timeout
+    )
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: List[Dict],
+    speed: float,
+    concurrency: int
+) -> Dict[str, Dict[str, List]]:
+    """
+    Sends the records on their (scaled) original schedule.
+
+    Args:
+        client (httpx.AsyncClient): The client to send with.
+        records (List[Dict]): The captured records, oldest first.
+        speed (float): The rate multiplier, 0 to ignore the original spacing.
+        concurrency (int): The maximum number of requests in flight.
+
+    Returns:
+        Dict[str, Dict[str, List]]: Latencies in seconds and status codes per endpoint.
+    """
+    results: Dict[str, Dict[str, List]] = defaultdict(
+        lambda: {"latencies": [], "statuses": []}
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    origin = records[0].get("timestamp", 0) if records else 0
+    started = time.perf_counter()
+
+    async def send(record: Dict) -> None:
+        async with semaphore:
+            sent = time.perf_counter()
+            try:
+                response = await client.request(
+                    record["method"],
+                    record["path"],
+                    params=record.get("query") or None,
+                    headers=record.get("headers", {}),
+                    content=decode_body(record)
+                )
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            endpoint = results[f"{record['method']} {record['path']}"]
+            endpoint["latencies"].append(time.perf_counter() - sent)
+            endpoint["statuses"].append(status)
+
+    tasks = []
+    for record in records:
+        if speed:
+            delay = (record.get("timestamp", 0) - origin) / speed
+            wait = started + delay - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(send(record)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def report(
+    results: Dict[str, Dict[str, List]],
+    elapsed: float
+) -> None:
+    """
+    Prints request counts, error counts and latency percentiles per endpoint.
+    """
+    print(f"{'endpoint':<36}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    total = 0
+    for endpoint, result in sorted(results.items()):
+        latencies = np.asarray(result["latencies"]) * 1000
+        errors = sum(1 for status in result["statuses"] if not 200 <= status < 300)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(
+            f"{endpoint:<36}{len(latencies):>7}{errors:>8}"
+            f"{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{latencies.max():>9.1f}"
+        )
+        total += len(latencies)
+    print(f"{total} requests in {elapsed:.2f}s: {total / elapsed:.1f} req/s (latencies in ms)")
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", default="requests.jsonl")
+    parser.add_argument("--target", default="app", help="'app' or a base URL")
+    parser.add_argument("--app", default="main:app", help="module:attribute for --target app")
+    parser.add_argument("--speed", type=float, default=1.0, help="rate multiplier, 0 = unpaced")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--prefix", default="/clip/")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    records = load_records(args.file, args.prefix, args.limit)
+    if not records:
+        parser.error(f"no replayable records in {args.file}")
+
+    async def run() -> None:
+        async with make_client(args.target, args.app, args.timeout) as client:
+            started = time.perf_counter()
+            results = await replay(client, records, args.speed, args.concurrency)
+            report(results, time.perf_counter() - started)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
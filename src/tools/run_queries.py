@@ -0,0 +1,187 @@
+"""
+Runs a file of queries offline and writes one submission CSV per query.
+
+The Service is loaded once and queries are grouped by kind and model, so
+each batch of --batch-size queries costs one encoder forward and one FAISS
+search instead of an HTTP round trip per query. Queries are read from a JSONL
+file, one object per line:
+
+    {"id": "query-p1-1-kis", "text": "a man riding a bicycle"}
+    {"id": "query-p1-2-kis", "events": ["a boat leaves", "the boat docks"], "max_gap": 300}
+    {"id": "query-p1-3-kis", "image": "queries/3.jpg", "model_type": "laion_clip"}
+    {"id": "query-p1-4-qa", "text": "the score on the board", "answer": "2-1"}
+
+Each CSV has no header and one ``video_id,frame`` row per result (plus the
+query's ``answer`` column when given), at most --limit rows. A query whose
+CSV already exists is skipped, so an interrupted run resumes where it
+stopped; files are written to a temporary name and renamed when complete.
+Encoders and indexes are loaded in this process, so run it with
+INFERENCE_SOCKET unset.
+
+Example:
+    python -m src.tools.run_queries --queries queries.jsonl --output submission \
+        --batch-size 64 --limit 100
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from src.services.service import Service
+from src.utils.utility import frame_number
+
+QUERY_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def load_queries(path: str) -> List[Dict]:
+    """
+    Reads the query file, checking every query has a unique id that is safe
+    as a file name and exactly one kind.
+    """
+    queries = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            query = json.loads(line)
+            kinds = [kind for kind in ("text", "events", "image") if query.get(kind)]
+            if "id" not in query or len(kinds) != 1:
+                raise ValueError(
+                    f"{path}:{number}: a query needs an id and one of text, events or image"
+                )
+            query_id = query["id"]
+            if not isinstance(query_id, str) or not QUERY_ID.fullmatch(query_id) \
+                    or os.path.basename(query_id) != query_id:
+                raise ValueError(
+                    f"{path}:{number}: id {query_id!r} must be a file name of letters, "
+                    "digits, '.', '_' or '-' not starting with '.'"
+                )
+            if query_id in seen:
+                raise ValueError(f"{path}:{number}: duplicate id {query_id!r}")
+            seen.add(query_id)
+            query["kind"] = kinds[0]
+            queries.append(query)
+    return queries
+
+
+def write_submission(
+    path: str,
+    results: List[Dict],
+    limit: int,
+    answer: str = None
+) -> None:
+    """
+    Writes one query's results in the submission format, atomically.
+
+    Args:
+        path (str): The CSV file.
+        results (List[Dict]): The ranked keyframes.
+        limit (int): The maximum number of rows.
+        answer (str, optional): An answer appended to every row.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for result in results[:limit]:
+            row = [result["video_id"], frame_number(result["frame_id"])]
+            if answer is not None:
+                row.append(answer)
+            writer.writerow(row)
+    os.replace(temporary, path)
+
+
+async def run_batch(
+    service: Service,
+    kind: str,
+    model_type: str,
+    queries: List[Dict]
+) -> List[List[Dict]]:
+    """
+    Runs one batch of queries of the same kind and model.
+    """
+    if kind == "text":
+        return await service.text_clip_retrieval.batch_text_retrieval(
+            model_type=model_type,
+            texts=[query["text"] for query in queries]
+        )
+    if kind == "image":
+        return await service.image_clip_retrieval.batch_image_retrieval(
+            model_type=model_type,
+            images=[query["image"] for query in queries]
+        )
+    results = [None] * len(queries)
+    by_options: Dict[Tuple, List[int]] = defaultdict(list)
+    for position, query in enumerate(queries):
+        by_options[(query.get("max_gap"), query.get("top_chains"))].append(position)
+    for (max_gap, top_chains), positions in by_options.items():
+        batch = await service.multi_event_retrieval.batch_multi_event_search(
+            model_type=model_type,
+            list_events=[queries[position]["events"] for position in positions],
+            max_gap=max_gap,
+            top_chains=top_chains
+        )
+        for position, result in zip(positions, batch):
+            results[position] = result
+    return results
+
+
+async def run(args: argparse.Namespace) -> None:
+    """
+    Loads the service and processes every query without a CSV yet.
+    """
+    os.makedirs(args.output, exist_ok=True)
+    queries = load_queries(args.queries)
+    pending = [
+        query for query in queries
+        if not os.path.exists(os.path.join(args.output, f"{query['id']}.csv"))
+    ]
+    print(f"{len(queries) - len(pending)} of {len(queries)} queries already done")
+    if not pending:
+        return
+
+    groups: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+    for query in pending:
+        groups[(query["kind"], query.get("model_type", args.model))].append(query)
+
+    service = Service()
+    started = time.perf_counter()
+    done = 0
+    for (kind, model_type), group in groups.items():
+        for offset in range(0, len(group), args.batch_size):
+            batch = group[offset:offset + args.batch_size]
+            results = await run_batch(service, kind, model_type, batch)
+            for query, result in zip(batch, results):
+                write_submission(
+                    path=os.path.join(args.output, f"{query['id']}.csv"),
+                    results=result,
+                    limit=args.limit,
+                    answer=query.get("answer")
+                )
+            done += len(batch)
+            elapsed = time.perf_counter() - started
+            print(f"{done}/{len(pending)} queries, {done / elapsed:.1f} q/s")
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", required=True, help="JSONL file of queries")
+    parser.add_argument("--output", required=True, help="directory for the CSV files")
+    parser.add_argument("--model", default="apple_clip", help="model for queries without model_type")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=100, help="rows per CSV")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
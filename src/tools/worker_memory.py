@@ -0,0 +1,80 @@
+"""
+Reports how much memory each serving worker actually owns.
+
+RSS counts shared pages in every process that maps them, so summing it over
+workers overstates the footprint. This tool reads ``/proc/<pid>/smaps_rollup``
+for the gunicorn master and its workers and prints RSS, PSS (shared pages
+divided among their users) and USS (pages private to the process). USS is what
+one more worker would add; the PSS total is the real footprint of the group.
+
+Example:
+    python -m src.tools.worker_memory --pid $(pgrep -f "gunicorn -c" | head -1)
+"""
+
+import argparse
+import os
+from typing import Dict, List
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_rollup(pid: int) -> Dict[str, int]:
+    """
+    Reads the memory rollup of a process.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        Dict[str, int]: The rollup fields in kB, plus "Uss".
+    """
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in FIELDS:
+                usage[key] = int(value.split()[0])
+    usage["Uss"] = usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0)
+    return usage
+
+
+def child_pids(pid: int) -> List[int]:
+    """
+    Lists the direct children of a process.
+    """
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children", "r", encoding="utf-8") as f:
+            children.extend(int(child) for child in f.read().split())
+    return sorted(set(children))
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pid", type=int, required=True, help="gunicorn master pid")
+    args = parser.parse_args()
+
+    pids = [args.pid] + child_pids(args.pid)
+    totals = {"Rss": 0, "Pss": 0, "Uss": 0}
+    print(f"{'pid':>8} {'role':>7} {'rss MB':>10} {'pss MB':>10} {'uss MB':>10} {'shared MB':>10}")
+    for pid in pids:
+        usage = read_rollup(pid)
+        shared = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+        role = "master" if pid == args.pid else "worker"
+        print(
+            f"{pid:>8} {role:>7} {usage['Rss'] / 1024:>10.1f} {usage['Pss'] / 1024:>10.1f} "
+            f"{usage['Uss'] / 1024:>10.1f} {shared / 1024:>10.1f}"
+        )
+        for key in totals:
+            totals[key] += usage.get(key, 0)
+    print(
+        f"{'total':>17} {totals['Rss'] / 1024:>10.1f} {totals['Pss'] / 1024:>10.1f} "
+        f"{totals['Uss'] / 1024:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Result diversification for ranked keyframe hits.
+
+Two strategies are provided:
+    * "collapse" drops hits that duplicate a better-ranked hit of the same
+      video (frame numbers within a window and/or cosine similarity above a
+      threshold). Comparisons only happen inside each video's group, so the
+      cost stays in the low milliseconds for 1500 candidates.
+    * "mmr" re-ranks the head of the list with Maximal Marginal Relevance.
+"""
+
+from typing import Dict, List, Union
+
+import numpy as np
+
+from src.repositories.load_faiss import ClipFaiss
+from src.utils.utility import frame_number
+
+
+def collapse_near_duplicates(
+    video_codes: np.ndarray,
+    frames: np.ndarray,
+    vectors: Union[np.ndarray, None] = None,
+    frame_window: int = 0,
+    similarity_threshold: Union[float, None] = None
+) -> np.ndarray:
+    """
+    Greedily keeps the best-ranked hit of each group of near-duplicates.
+
+    Two hits are duplicates when they belong to the same video and satisfy
+    every enabled criterion: frame numbers at most frame_window apart and
+    cosine similarity of at least similarity_threshold.
+
+    Args:
+        video_codes (np.ndarray): An integer video code per hit, in rank order.
+        frames (np.ndarray): The frame number of each hit.
+        vectors (np.ndarray, optional): L2-normalized vectors of the hits,
+            required when similarity_threshold is set.
+        frame_window (int): The maximum frame distance, 0 to disable.
+        similarity_threshold (float, optional): The minimum cosine similarity.
+
+    Returns:
+        np.ndarray: A boolean mask of the hits to keep.
+    """
+    keep = np.ones(len(video_codes), dtype=bool)
+    if not frame_window and similarity_threshold is None:
+        return keep
+    order = np.argsort(video_codes, kind="stable")
+    boundaries = np.flatnonzero(np.diff(video_codes[order])) + 1
+    for group in np.split(order, boundaries):
+        if len(group) < 2:
+            continue
+        duplicate = np.ones((len(group), len(group)), dtype=bool)
+        if frame_window:
+            group_frames = frames[group]
+            duplicate &= np.abs(group_frames[:, None] - group_frames[None, :]) <= frame_window
+        if similarity_threshold is not None:
+            group_vectors = vectors[group]
+            duplicate &= group_vectors @ group_vectors.T >= similarity_threshold
+        alive = np.ones(len(group), dtype=bool)
+        for position in range(len(group) - 1):
+            if alive[position]:
+                alive[position + 1:] &= ~duplicate[position, position + 1:]
+        keep[group] = alive
+    return keep
+
+
+def mmr_rerank(
+    scores: np.ndarray,
+    vectors: np.ndarray,
+    mmr_lambda: float = 0.7,
+    mmr_top: int = 300
+) -> np.ndarray:
+    """
+    Re-ranks the first mmr_top hits with Maximal Marginal Relevance.
+
+    Each step picks the hit maximizing
+    ``mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to picked hits``.
+    Hits beyond mmr_top keep their original order after the re-ranked head.
+
+    Args:
+        scores (np.ndarray): The query similarity of each hit, in rank order.
+        vectors (np.ndarray): L2-normalized vectors of the hits.
+        mmr_lambda (float): The relevance/diversity trade-off in [0, 1].
+        mmr_top (int): The number of leading hits to re-rank.
+
+    Returns:
+        np.ndarray: The new order as positions into the input.
+    """
+    head = min(mmr_top, len(scores))
+    if head < 2:
+        return np.arange(len(scores))
+    similarities = vectors[:head] @ vectors[:head].T
+    relevance = mmr_lambda * scores[:head]
+    max_similarity = np.full(head, -np.inf, dtype=np.float32)
+    available = np.ones(head, dtype=bool)
+    picked = []
+    for _ in range(head):
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        objective = np.where(available, relevance - (1 - mmr_lambda) * penalty, -np.inf)
+        best = int(np.argmax(objective))
+        picked.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarities[best])
+    return np.concatenate([np.asarray(picked), np.arange(head, len(scores))])
+
+
+async def diversify_results(
+    faiss: ClipFaiss,
+    model_type: str,
+    data: Dict,
+    scores: np.ndarray,
+    indices: np.ndarray,
+    mode: str = "collapse",
+    frame_window: int = 0,
+    similarity_threshold: Union[float, None] = None,
+    mmr_lambda: float = 0.7,
+    mmr_top: int = 300
+) -> List[int]:
+    """
+    Diversifies one ranked FAISS result list.
+
+    Vectors are reconstructed from the index only when the chosen strategy
+    needs them.
+
+    Args:
+        faiss (ClipFaiss): The index wrapper the hits came from.
+        model_type (str): The model whose index was searched.
+        data (Dict): The mapping of indices to video and frame information.
+        scores (np.ndarray): The similarity scores of the hits.
+        indices (np.ndarray): The indices of the hits.
+        mode (str): Either "collapse" or "mmr".
+        frame_window (int): The collapse frame window, 0 to disable.
+        similarity_threshold (float, optional): The collapse similarity threshold.
+        mmr_lambda (float): The MMR relevance/diversity trade-off.
+        mmr_top (int): The number of leading hits MMR re-ranks.
+
+    Returns:
+        List[int]: The diversified indices in rank order.
+    """
+    valid = np.asarray([indice in data for indice in indices], dtype=bool)
+    indices = np.asarray(indices)[valid]
+    scores = np.asarray(scores, dtype=np.float32)[valid]
+    if not len(indices):
+        return []
+    if mode == "mmr":
+        vectors = await faiss.reconstruct(model_type=model_type, indices=indices)
+        order = mmr_rerank(
+            scores=scores,
+            vectors=vectors,
+            mmr_lambda=mmr_lambda,
+            mmr_top=mmr_top
+        )
+        return indices[order].tolist()
+    if mode == "collapse":
+        _, video_codes = np.unique(
+            [data[indice]['video_id'] for indice in indices], return_inverse=True
+        )
+        frames = np.asarray(
+            [frame_number(data[indice]['frame_id']) for indice in indices], dtype=np.int64
+        )
+        vectors = None
+        if similarity_threshold is not None:
+            vectors = await faiss.reconstruct(model_type=model_type, indices=indices)
+        keep = collapse_near_duplicates(
+            video_codes=video_codes,
+            frames=frames,
+            vectors=vectors,
+            frame_window=frame_window,
+            similarity_threshold=similarity_threshold
+        )
+        return indices[keep].tolist()
+    raise ValueError(f"Unknown diversification mode: {mode}")
+
+
+async def rank_indices(
+    faiss: ClipFaiss,
+    model_type: str,
+    data: Dict,
+    scores: np.ndarray,
+    indices: np.ndarray,
+    diversify: Union[Dict, None] = None
+) -> List[int]:
+    """
+    Applies the optional diversification stage to a ranked result list.
+
+    Args:
+        faiss (ClipFaiss): The index wrapper the hits came from.
+        model_type (str): The model whose index was searched.
+        data (Dict): A dictionary mapping indices to video and frame information.
+        scores (np.ndarray): The similarity scores of the hits.
+        indices (np.ndarray): The indices of the hits.
+        diversify (Dict, optional): Arguments for diversify_results.
+
+    Returns:
+        List[int]: The indices to return, in rank order.
+    """
+    if not diversify:
+        return indices
+    return await diversify_results(
+        faiss=faiss,
+        model_type=model_type,
+        data=data,
+        scores=scores,
+        indices=indices,
+        **diversify
+    )
@@ -0,0 +1,196 @@
+"""
+Size-bounded cache of image query embeddings.
+
+Uploads are keyed on a BLAKE2 digest of their raw bytes, so a repeated upload
+is answered before any decoding. An optional perceptual tier keys decoded
+images on a 64-bit difference hash (dHash) and matches within a Hamming
+distance, catching re-encoded or resized copies of the same picture; it costs
+a decode but still skips the encoder forward.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple, Union
+
+import numpy as np
+from PIL import Image
+from torch import Tensor
+
+
+def content_hash(data: bytes) -> bytes:
+    """
+    Returns a 128-bit digest of the raw upload bytes.
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def difference_hash(
+    image: Image.Image,
+    hash_size: int = 8
+) -> int:
+    """
+    Computes the dHash of an image: whether each pixel of a small grayscale
+    thumbnail is brighter than its right neighbour.
+
+    Args:
+        image (Image.Image): The decoded image.
+        hash_size (int): The hash is hash_size * hash_size bits.
+
+    Returns:
+        int: The hash as an integer.
+    """
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class EmbeddingCache:
+    """
+    An LRU cache of embeddings per model with hit-rate counters.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        perceptual: bool = False,
+        max_distance: int = 4
+    ) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int): The number of embeddings kept in each tier.
+            perceptual (bool): Whether to enable the dHash tier.
+            max_distance (int): The largest Hamming distance counted as the same image.
+        """
+        self._max_entries = max_entries
+        self._perceptual = perceptual
+        self._max_distance = max_distance
+        self._exact: "OrderedDict[Tuple[str, bytes], Tensor]" = OrderedDict()
+        self._similar: "OrderedDict[Tuple[str, int], Tensor]" = OrderedDict()
+        self._counters = {"exact_hits": 0, "perceptual_hits": 0, "misses": 0}
+
+    @property
+    def perceptual(self) -> bool:
+        """
+        Tells whether the dHash tier is enabled.
+        """
+        return self._perceptual
+
+    def _put(
+        self,
+        tier: "OrderedDict",
+        key: Hashable,
+        vector: Tensor
+    ) -> None:
+        tier[key] = vector
+        tier.move_to_end(key)
+        while len(tier) > self._max_entries:
+            tier.popitem(last=False)
+
+    def get_exact(
+        self,
+        model_type: str,
+        digest: bytes
+    ) -> Union[Tensor, None]:
+        """
+        Looks an upload up by its content hash.
+
+        Args:
+            model_type (str): The model the embedding belongs to.
+            digest (bytes): The content_hash of the upload.
+
+        Returns:
+            Tensor: The cached embedding, or None.
+        """
+        key = (model_type, digest)
+        vector = self._exact.get(key)
+        if vector is not None:
+            self._exact.move_to_end(key)
+            self._counters["exact_hits"] += 1
+        return vector
+
+    def get_similar(
+        self,
+        model_type: str,
+        dhash: int
+    ) -> Union[Tensor, None]:
+        """
+        Looks a decoded image up by perceptual hash.
+
+        The scan is linear in the tier size, which is cheap next to an
+        encoder forward for the few thousand entries the cache holds.
+
+        Args:
+            model_type (str): The model the embedding belongs to.
+            dhash (int): The difference_hash of the image.
+
+        Returns:
+            Tensor: The embedding of the closest cached image within
+            max_distance, or None.
+        """
+        best_key, best_distance = None, self._max_distance + 1
+        for key in self._similar:
+            if key[0] != model_type:
+                continue
+            distance = (key[1] ^ dhash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None
+        self._similar.move_to_end(best_key)
+        self._counters["perceptual_hits"] += 1
+        return self._similar[best_key]
+
+    def put(
+        self,
+        model_type: str,
+        digest: bytes,
+        vector: Tensor,
+        dhash: Union[int, None] = None
+    ) -> None:
+        """
+        Stores an embedding computed after a miss.
+
+        Args:
+            model_type (str): The model the embedding belongs to.
+            digest (bytes): The content_hash of the upload.
+            vector (Tensor): The embedding; kept as a float32 CPU copy.
+            dhash (int, optional): The perceptual hash, when that tier is enabled.
+        """
+        # clone: float() and cpu() return the caller's tensor when it is
+        # already float32 on the CPU, and the caller may modify it in place
+        vector = vector.detach().float().cpu().clone()
+        self._put(self._exact, (model_type, digest), vector)
+        if dhash is not None:
+            self._put(self._similar, (model_type, dhash), vector)
+
+    def record_miss(self) -> None:
+        """
+        Counts a lookup that had to run the encoder.
+        """
+        self._counters["misses"] += 1
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Returns the bytes held by the cached embeddings of both tiers.
+        """
+        vectors = {id(vector): vector for vector in self._exact.values()}
+        vectors.update((id(vector), vector) for vector in self._similar.values())
+        return sum(vector.element_size() * vector.nelement() for vector in vectors.values())
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Returns entry counts, hit counters and the overall hit rate.
+        """
+        lookups = sum(self._counters.values())
+        hits = self._counters["exact_hits"] + self._counters["perceptual_hits"]
+        return {
+            "entries": len(self._exact),
+            "perceptual_entries": len(self._similar),
+            **self._counters,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
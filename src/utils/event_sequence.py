@@ -0,0 +1,124 @@
+"""
+Ranking of ordered event sequences within videos.
+
+A chain picks one hit per event, all in the same video, with strictly
+increasing frame numbers and at most max_gap frames between consecutive
+events. Its score is the sum of the hits' similarities. For each video the
+best chain ending at every hit is found with one dynamic-programming pass per
+event: hits are sorted by frame, and the best predecessor within the allowed
+gap is the front of a monotonic deque (a sliding-window maximum), so each
+pass is linear in the hits of the two events involved.
+"""
+
+import heapq
+from collections import defaultdict, deque
+from typing import Dict, List, Sequence, Tuple, Union
+
+from src.utils.utility import frame_number
+
+NO_CHAIN = float("-inf")
+
+
+def chain_scores(
+    frames: List[List[int]],
+    scores: List[List[float]],
+    max_gap: Union[int, None] = None
+) -> Tuple[List[float], List[List[int]]]:
+    """
+    Scores the best chain ending at each hit of the last event in one video.
+
+    Args:
+        frames (List[List[int]]): The frame numbers of each event's hits, sorted ascending.
+        scores (List[List[float]]): The similarity of each hit, aligned with frames.
+        max_gap (int, optional): The largest frame distance between consecutive events.
+
+    Returns:
+        Tuple[List[float], List[List[int]]]: The chain score per hit of the last
+        event (NO_CHAIN when no chain ends there) and, for every event after
+        the first, the index of each hit's predecessor in the previous event.
+    """
+    totals = list(scores[0])
+    parents = []
+    for event in range(1, len(frames)):
+        previous, current = frames[event - 1], frames[event]
+        best = [NO_CHAIN] * len(current)
+        parent = [-1] * len(current)
+        window = deque()
+        j = 0
+        for i, frame in enumerate(current):
+            while j < len(previous) and previous[j] < frame:
+                if totals[j] != NO_CHAIN:
+                    while window and totals[window[-1]] <= totals[j]:
+                        window.pop()
+                    window.append(j)
+                j += 1
+            if max_gap is not None:
+                while window and frame - previous[window[0]] > max_gap:
+                    window.popleft()
+            if window:
+                best[i] = totals[window[0]] + scores[event][i]
+                parent[i] = window[0]
+        totals = best
+        parents.append(parent)
+    return totals, parents
+
+
+def rank_event_chains(
+    event_hits: List[List[Dict]],
+    event_scores: List[Sequence[float]],
+    top_k: int,
+    max_gap: Union[int, None] = None,
+    field: str = "video_id",
+    frame_field: str = "frame_id"
+) -> List[Tuple[float, List[Dict]]]:
+    """
+    Returns the best-scoring event chains, at most one per first-event hit.
+
+    Args:
+        event_hits (List[List[Dict]]): The hits of each event, in event order.
+        event_scores (List[Sequence[float]]): The similarity of each hit.
+        top_k (int): The number of chains to return.
+        max_gap (int, optional): The largest frame distance between consecutive events.
+        field (str): The hit field identifying the video.
+        frame_field (str): The hit field holding the frame id.
+
+    Returns:
+        List[Tuple[float, List[Dict]]]: (score, one hit per event) pairs, best first.
+    """
+    grouped = [defaultdict(list) for _ in event_hits]
+    for videos, hits, scores in zip(grouped, event_hits, event_scores):
+        for hit, score in zip(hits, scores):
+            videos[hit[field]].append((frame_number(hit[frame_field]), float(score), hit))
+
+    chains = {}
+    candidates = []
+    for video in set(grouped[0]).intersection(*grouped[1:]):
+        events = [sorted(videos[video], key=lambda hit: hit[0]) for videos in grouped]
+        totals, parents = chain_scores(
+            frames=[[hit[0] for hit in hits] for hits in events],
+            scores=[[hit[1] for hit in hits] for hits in events],
+            max_gap=max_gap
+        )
+        chains[video] = (events, parents)
+        candidates.extend(
+            (-total, video, end) for end, total in enumerate(totals) if total != NO_CHAIN
+        )
+
+    heapq.heapify(candidates)
+    ranked = []
+    starts = set()
+    while candidates and len(ranked) < top_k:
+        negative_score, video, end = heapq.heappop(candidates)
+        events, parents = chains[video]
+        path = [end]
+        for parent in reversed(parents):
+            path.append(parent[path[-1]])
+        path.reverse()
+        start = (video, path[0])
+        if start in starts:
+            continue
+        starts.add(start)
+        ranked.append(
+            (-negative_score, [events[event][index][2] for event, index in enumerate(path)])
+        )
+    return ranked
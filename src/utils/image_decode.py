@@ -0,0 +1,98 @@
+"""
+Reduced-cost decoding of query images.
+
+The CLIP processors resize to a few hundred pixels, so decoding a 4K upload at
+full resolution wastes time and memory. JPEGs are decoded with PIL's draft
+mode, which lets libjpeg scale by 1/2, 1/4 or 1/8 during decoding while
+keeping both sides at least the target size; other formats are box-reduced
+right after decoding. Decode and transform run in a thread pool (PIL releases
+the GIL while decoding) so the event loop is not blocked.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Union
+
+from PIL import Image
+from torch import Tensor
+
+from src.utils.utility import convert_value
+
+IMAGE_DECODE_WORKERS = convert_value(os.getenv("IMAGE_DECODE_WORKERS", "4"))
+
+_executor: Union[ThreadPoolExecutor, None] = None
+
+
+def decode_executor() -> ThreadPoolExecutor:
+    """
+    Returns the shared decode pool, creating it on first use so forked
+    workers each get their own threads.
+    """
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=IMAGE_DECODE_WORKERS,
+            thread_name_prefix="image-decode"
+        )
+    return _executor
+
+
+def open_reduced(
+    image,
+    target_size: int
+) -> Image.Image:
+    """
+    Decodes an image to RGB at the smallest cheap scale whose shorter side
+    is still at least target_size.
+
+    Args:
+        image: A path or binary file-like object.
+        target_size (int): The processor's input resolution.
+
+    Returns:
+        Image.Image: The decoded RGB image.
+    """
+    decoded = Image.open(image)
+    if decoded.format == "JPEG":
+        decoded.draft("RGB", (target_size, target_size))
+    else:
+        factor = min(decoded.size) // target_size
+        if factor >= 2:
+            if decoded.mode in ("P", "1"):
+                # Image.reduce rejects palette and bilevel images
+                decoded = decoded.convert("RGB")
+            decoded = decoded.reduce(factor)
+    return decoded.convert("RGB")
+
+
+def preprocess(
+    processor: Callable,
+    image,
+    target_size: int
+) -> Tensor:
+    """
+    Decodes an image with open_reduced and applies the model transform.
+
+    Args:
+        processor (Callable): The model's image transform.
+        image: A path or binary file-like object.
+        target_size (int): The processor's input resolution.
+
+    Returns:
+        Tensor: The (3, H, W) input tensor.
+    """
+    return processor(open_reduced(image, target_size))
+
+
+async def preprocess_async(
+    processor: Callable,
+    image,
+    target_size: int
+) -> Tensor:
+    """
+    Runs preprocess in the decode pool.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        decode_executor(), preprocess, processor, image, target_size
+    )
@@ -0,0 +1,156 @@
+"""
+Memory accounting helpers for the admin memory report.
+
+Sizes are estimates: Python containers are walked recursively with
+``sys.getsizeof`` (shared objects counted once), numpy arrays and torch
+tensors contribute their buffer sizes, and FAISS indexes are sized from
+``ntotal``, ``d`` and the encoded code size. Allocation profiling compares
+two ``tracemalloc`` snapshots taken around a call; profiles run one at a
+time, since overlapping ones would share and stop the same trace.
+"""
+
+import asyncio
+import sys
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+from torch import Tensor
+
+PROFILE_GROUPS = ("lineno", "filename", "traceback")
+PROFILE_LOCK = asyncio.Lock()
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Estimates the bytes held by an object and everything it references.
+
+    Args:
+        obj (Any): The object; dicts, lists, tuples, sets, strings, numpy
+            arrays and tensors are followed, other objects count their own size.
+
+    Returns:
+        int: The estimated size in bytes.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Tensor):
+            total += item.element_size() * item.nelement()
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, np.ndarray):
+            if isinstance(item.base, np.ndarray):
+                stack.append(item.base)
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+def index_bytes(index) -> Dict[str, int]:
+    """
+    Estimates the storage of a FAISS index.
+
+    Args:
+        index: A faiss.Index or ShardedFaiss.
+
+    Returns:
+        Dict[str, int]: ``ntotal``, ``d``, ``flat_bytes`` (ntotal * d float32
+        values) and ``code_bytes`` (ntotal times the encoded vector size, when
+        the index reports one).
+    """
+    ntotal, d = int(index.ntotal), int(index.d)
+    stats = {"ntotal": ntotal, "d": d, "flat_bytes": ntotal * d * 4}
+    try:
+        stats["code_bytes"] = ntotal * int(index.sa_code_size())
+    except (AttributeError, RuntimeError):
+        stats["code_bytes"] = stats["flat_bytes"]
+    return stats
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    Reads the resident and peak resident size of this process from /proc.
+
+    Returns:
+        Dict[str, int]: ``rss_bytes`` and ``peak_rss_bytes``, empty where /proc
+        is unavailable.
+    """
+    fields = {"VmRSS": "rss_bytes", "VmHWM": "peak_rss_bytes"}
+    usage = {}
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    usage[fields[key]] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
+
+
+async def profile_allocations(
+    call: Callable[[], Awaitable],
+    repeat: int = 1,
+    group_by: str = "lineno",
+    top: int = 20,
+    frames: int = 10
+) -> Dict:
+    """
+    Runs a call under tracemalloc and reports where its memory was allocated.
+
+    Other requests served at the same time are included in the diff, so
+    profile on an otherwise idle worker. Concurrent calls wait on
+    PROFILE_LOCK and run one after another.
+
+    Args:
+        call (Callable[[], Awaitable]): Creates the awaitable to profile.
+        repeat (int): How many times to await it between the snapshots.
+        group_by (str): "lineno", "filename" or "traceback".
+        top (int): The number of allocation sites reported.
+        frames (int): The stack depth recorded when tracing is started here.
+
+    Returns:
+        Dict: The net and peak traced bytes and the top allocation sites by size growth.
+    """
+    if group_by not in PROFILE_GROUPS:
+        raise ValueError(f"group_by must be one of {PROFILE_GROUPS}")
+    async with PROFILE_LOCK:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames)
+        try:
+            tracemalloc.reset_peak()
+            ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            before = tracemalloc.take_snapshot().filter_traces(ignore)
+            traced_before, _ = tracemalloc.get_traced_memory()
+            for _ in range(repeat):
+                await call()
+            traced_after, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(ignore)
+        finally:
+            if started:
+                tracemalloc.stop()
+    sites: List[Dict] = [
+        {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_diff": stat.size_diff,
+            "size": stat.size,
+            "count_diff": stat.count_diff
+        }
+        for stat in after.compare_to(before, group_by)[:top]
+    ]
+    return {
+        "net_bytes": traced_after - traced_before,
+        "peak_bytes": peak - traced_before,
+        "sites": sites
+    }
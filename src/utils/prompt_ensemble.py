@@ -0,0 +1,132 @@
+"""
+Prompt-template ensembling for text queries.
+
+A query is expanded into several templates ("a photo of {}.", ...), the
+prompts are encoded together in one batched forward, and their embeddings
+are averaged and renormalized. Prompt embeddings are cached per model, so a
+repeated ensembled query only encodes the prompts it has not seen yet.
+Plain (non-ensembled) search encodes the query directly and neither reads
+nor fills this cache.
+"""
+
+from collections import OrderedDict
+from typing import List, Tuple
+
+import torch
+import torch.nn.functional as F
+from torch import Tensor
+
+from src.modules.base_clip import BaseCLIP
+
+DEFAULT_TEMPLATES = [
+    "{}",
+    "a photo of {}.",
+    "a video frame of {}.",
+    "a screenshot of {}.",
+    "a news footage of {}.",
+    "a blurry photo of {}.",
+    "a close-up photo of {}."
+]
+
+
+class PromptEnsemble:
+    """
+    Encodes queries as the normalized mean of their template embeddings.
+    """
+
+    def __init__(
+        self,
+        templates: List[str] = None,
+        cache_size: int = 4096
+    ) -> None:
+        """
+        Initializes the ensemble.
+
+        Args:
+            templates (List[str], optional): Format strings with one ``{}``;
+                defaults to DEFAULT_TEMPLATES.
+            cache_size (int): The number of prompt embeddings kept, 0 to disable.
+        """
+        self._templates = templates or DEFAULT_TEMPLATES
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], Tensor]" = OrderedDict()
+
+    @property
+    def templates(self) -> List[str]:
+        """
+        Returns the templates in use.
+        """
+        return list(self._templates)
+
+    @property
+    def memory_bytes(self) -> int:
+        """
+        Returns the bytes held by the cached prompt embeddings.
+        """
+        return sum(vector.element_size() * vector.nelement() for vector in self._cache.values())
+
+    def prompts(self, text: str) -> List[str]:
+        """
+        Expands a query into one prompt per template.
+        """
+        return [template.format(text) for template in self._templates]
+
+    async def embed(
+        self,
+        encoder: BaseCLIP,
+        model_type: str,
+        text: str
+    ) -> Tensor:
+        """
+        Embeds a query with all templates in at most one batched forward.
+
+        Args:
+            encoder (BaseCLIP): The model's encoder.
+            model_type (str): The model name, part of the cache key.
+            text (str): The query.
+
+        Returns:
+            Tensor: The (1, d) normalized ensemble embedding.
+        """
+        return await self.embed_many(encoder=encoder, model_type=model_type, texts=[text])
+
+    async def embed_many(
+        self,
+        encoder: BaseCLIP,
+        model_type: str,
+        texts: List[str]
+    ) -> Tensor:
+        """
+        Embeds several queries with all templates in at most one batched forward.
+
+        Args:
+            encoder (BaseCLIP): The model's encoder.
+            model_type (str): The model name, part of the cache key.
+            texts (List[str]): The queries.
+
+        Returns:
+            Tensor: The (len(texts), d) normalized ensemble embeddings.
+        """
+        groups = [self.prompts(text) for text in texts]
+        unique = dict.fromkeys(prompt for prompts in groups for prompt in prompts)
+        found = {}
+        for prompt in unique:
+            vector = self._cache.get((model_type, prompt))
+            if vector is not None:
+                self._cache.move_to_end((model_type, prompt))
+                found[prompt] = vector
+        missing = [prompt for prompt in unique if prompt not in found]
+        if missing:
+            vectors = (await encoder.text_embedding_batch(missing)).detach().float().cpu()
+            found.update(zip(missing, vectors))
+            if self._cache_size:
+                for prompt, vector in zip(missing, vectors):
+                    # a row is a view that would keep the whole batch alive
+                    self._cache[(model_type, prompt)] = vector.clone()
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        vectors = torch.stack([
+            torch.stack([found[prompt] for prompt in prompts]).mean(dim=0)
+            for prompts in groups
+        ])
+        return F.normalize(vectors, dim=-1)
@@ -0,0 +1,52 @@
+"""
+Single-flight deduplication of concurrent identical async calls.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time; callers arriving while it
+    is in flight await the same result instead of starting their own.
+
+    Nothing is kept once the computation finishes, so this is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Returns the number of keys currently being computed.
+        """
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Returns the result of fn(), sharing it with concurrent callers of the same key.
+
+        The computation runs as its own task, so a caller that is cancelled
+        (e.g. the client disconnected) does not cancel it for the others.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (Callable[[], Awaitable[T]]): Starts the computation.
+
+        Returns:
+            T: The shared result; callers must not mutate it.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
@@ -2,7 +2,7 @@
 This script is used for utility functions
 """
 import json
-from typing import List, Dict
+from typing import List, Dict, Union
 
 
 def convert_value(value):
@@ -44,3 +44,50 @@ def count_non_empty_fields(test: str, list_ocr: List[Dict], list_asr: List[Dict]
     if list_asr:  # kiểm tra list_asr không phải là danh sách rỗng
         count += 1
     return count
+
+
+def frame_number(frame_id: str) -> int:
+    """
+    Convert a frame id such as "0123.jpg" or "0123" to its frame number.
+
+    Args:
+        frame_id: The frame id, with or without a file extension.
+
+    Returns:
+        The frame number as an integer.
+    """
+    return int(str(frame_id).split('.')[0])
+
+
+def diversify_arguments(options) -> Union[Dict, None]:
+    """
+    Convert request diversification options to service arguments.
+
+    Args:
+        options: A DiversifyOptions model, or None.
+
+    Returns:
+        The keyword arguments for diversify_results, or None when disabled.
+    """
+    if options is None or not options.mode:
+        return None
+    return options.dict()
+
+
+def composition_arguments(request) -> Union[Dict, None]:
+    """
+    Convert the positive and negative phrases of a text request to service arguments.
+
+    Args:
+        request: A RequestClipText model.
+
+    Returns:
+        The hashable composition arguments, or None when the request has no phrases.
+    """
+    if not request.positives and not request.negatives:
+        return None
+    return {
+        "positives": tuple((phrase.text, phrase.weight) for phrase in request.positives),
+        "negatives": tuple((phrase.text, phrase.weight) for phrase in request.negatives),
+        "negative_mode": request.negative_mode
+    }
@@ -0,0 +1,175 @@
+"""
+Integration tests for the inference worker protocol: a worker is served on a
+temporary Unix socket with stub encoders and small flat indexes, and remote
+results must match the local ones.
+"""
+
+import asyncio
+import os
+import tempfile
+import zlib
+from typing import List
+
+import faiss
+import numpy as np
+import pytest
+import torch
+
+from src.inference.client import InferenceClient
+from src.inference.protocol import InferenceError
+from src.inference.worker import InferenceWorker
+from src.repositories.load_faiss import ClipFaiss
+
+DIM = 16
+NTOTAL = 200
+MODELS = ("apple_clip", "laion_clip", "tiny_clip")
+
+
+class StubEncoder:
+    """
+    Encodes each text to a fixed pseudo-random unit vector and counts calls.
+    """
+
+    image_size = 8
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(DIM).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    async def text_embedding_batch(self, texts: List[str]) -> torch.Tensor:
+        self.calls += 1
+        return torch.from_numpy(np.stack([self.vector(text) for text in texts]))
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path):
+    """
+    Writes one IndexFlatIP per model and loads them into a ClipFaiss.
+    """
+    rng = np.random.default_rng(0)
+    paths = {}
+    for model_type in MODELS:
+        vectors = rng.standard_normal((NTOTAL, DIM)).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        index = faiss.IndexFlatIP(DIM)
+        index.add(vectors)
+        paths[model_type] = str(tmp_path / f"{model_type}.faiss")
+        faiss.write_index(index, paths[model_type])
+    return ClipFaiss(
+        apple_faiss_url=paths["apple_clip"],
+        laion_faiss_url=paths["laion_clip"],
+        apple_gpu_device=None,
+        extra_indexes={"tiny_clip": {"faiss_url": paths["tiny_clip"]}}
+    )
+
+
+def run_with_worker(store: ClipFaiss, scenario) -> None:
+    """
+    Serves a worker on a temporary socket, runs the scenario against it and stops it.
+    """
+    encoders = {model_type: StubEncoder() for model_type in MODELS}
+    worker = InferenceWorker(encoders=encoders, faiss=store, max_wait=0.005)
+
+    async def main() -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            socket_path = os.path.join(directory, "worker.sock")
+            server = asyncio.create_task(worker.serve(socket_path))
+            while not os.path.exists(socket_path):
+                await asyncio.sleep(0.01)
+            try:
+                await scenario(InferenceClient(socket_path=socket_path), encoders)
+            finally:
+                server.cancel()
+                await asyncio.gather(server, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("model_type", MODELS)
+def test_search_matches_local(store, model_type):
+    queries = np.stack([StubEncoder.vector(f"query {i}") for i in range(5)])
+
+    async def scenario(client, _):
+        scores, indices = await client.search(model_type, queries, top_k=10)
+        local_scores, local_indices = await store.search(
+            model_type=model_type, top_k=10, query_vectors=torch.from_numpy(queries)
+        )
+        np.testing.assert_array_equal(indices, local_indices)
+        np.testing.assert_allclose(scores, local_scores, rtol=1e-6)
+
+    run_with_worker(store, scenario)
+
+
+@pytest.mark.parametrize("model_type", MODELS)
+def test_text_search_matches_local(store, model_type):
+    texts = [f"a person riding a bicycle {i}" for i in range(8)]
+
+    async def scenario(client, encoders):
+        results = await asyncio.gather(
+            *(client.text_search(model_type, text, top_k=5) for text in texts)
+        )
+        for text, (scores, indices) in zip(texts, results):
+            local_scores, local_indices = await store.search(
+                model_type=model_type,
+                top_k=5,
+                query_vectors=torch.from_numpy(StubEncoder.vector(text)[None])
+            )
+            np.testing.assert_array_equal(indices, local_indices)
+            np.testing.assert_allclose(scores, local_scores, rtol=1e-6)
+        # concurrent texts share encoder forwards in the worker
+        assert encoders[model_type].calls < len(texts)
+
+    run_with_worker(store, scenario)
+
+
+@pytest.mark.parametrize("model_type", MODELS)
+def test_reconstruct_matches_local(store, model_type):
+    indices = np.array([0, 17, 3, NTOTAL - 1], dtype=np.int64)
+
+    async def scenario(client, _):
+        remote = await client.reconstruct(model_type, indices)
+        local = await store.reconstruct(model_type=model_type, indices=indices)
+        np.testing.assert_array_equal(remote, local)
+
+    run_with_worker(store, scenario)
+
+
+def test_batched_searches_keep_their_own_candidate_k(store):
+    texts = [f"a dog on a beach {i}" for i in range(6)]
+    candidate_ks = [None, 50, None, 20, 50, 20]
+
+    async def scenario(client, _):
+        results = await asyncio.gather(*(
+            client.text_search("apple_clip", text, top_k=5, candidate_k=candidate_k)
+            for text, candidate_k in zip(texts, candidate_ks)
+        ))
+        for text, candidate_k, (scores, indices) in zip(texts, candidate_ks, results):
+            local_scores, local_indices = await store.search(
+                model_type="apple_clip",
+                top_k=5,
+                query_vectors=torch.from_numpy(StubEncoder.vector(text)[None]),
+                candidate_k=candidate_k
+            )
+            np.testing.assert_array_equal(indices, local_indices)
+            np.testing.assert_allclose(scores, local_scores, rtol=1e-6)
+
+    run_with_worker(store, scenario)
+
+
+def test_errors_are_reported_per_request(store):
+    async def scenario(client, _):
+        with pytest.raises(InferenceError):
+            await client.reconstruct("apple_clip", np.array([NTOTAL], dtype=np.int64))
+        with pytest.raises(InferenceError):
+            await client.text_search("unknown_clip", "a dog", top_k=5)
+        # the connection stays usable after failed requests
+        _, indices = await client.text_search("apple_clip", "a dog", top_k=5)
+        assert indices.shape == (1, 5)
+        assert not client._pending  # pylint: disable=protected-access
+
+    run_with_worker(store, scenario)
@@ -0,0 +1,50 @@
+"""
+Tests for reopening the ingest journal after an interrupted run.
+"""
+
+import json
+
+import pytest
+
+from src.tools.ingest_keyframes import open_journal, scan_journal, truncate_torn_row
+
+ROWS = [
+    {"indice": 0, "video_id": "L01_V001", "frame_id": "001"},
+    {"indice": 1, "video_id": "L01_V001", "frame_id": "002"}
+]
+
+
+@pytest.fixture(name="json_url")
+def fixture_json_url(tmp_path) -> str:
+    """
+    Writes a journal whose last row was cut off in the middle of an append.
+    """
+    lines = "".join(json.dumps(row) + "\n" for row in ROWS)
+    torn = json.dumps({"indice": 2, "video_id": "L01_V001", "frame_id": "003"})[:20]
+    (tmp_path / "clip.jsonl").write_text(lines + torn, encoding="utf-8")
+    return str(tmp_path / "clip.json")
+
+
+def test_open_journal_drops_a_torn_last_row(json_url):
+    journal = open_journal(json_url)
+    rows, done = scan_journal(journal)
+    assert rows == len(ROWS)
+    assert done == {(row["video_id"], row["frame_id"]) for row in ROWS}
+
+    # rows appended after the reopen start on their own line
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"indice": 2, "video_id": "L01_V001", "frame_id": "003"}) + "\n")
+    rows, _ = scan_journal(journal)
+    assert rows == len(ROWS) + 1
+
+
+def test_truncate_keeps_complete_journals(tmp_path):
+    path = tmp_path / "clip.jsonl"
+    path.write_text(json.dumps(ROWS[0]) + "\n", encoding="utf-8")
+    assert truncate_torn_row(str(path)) == 0
+    assert path.read_text(encoding="utf-8") == json.dumps(ROWS[0]) + "\n"
+
+    # a journal holding only a partial row is emptied
+    path.write_text('{"indice": 0, "vid', encoding="utf-8")
+    assert truncate_torn_row(str(path)) == len('{"indice": 0, "vid')
+    assert path.read_text(encoding="utf-8") == ""
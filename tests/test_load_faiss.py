@@ -0,0 +1,66 @@
+"""
+Tests for ClipFaiss.reconstruct over flat and sharded indexes.
+"""
+
+import asyncio
+
+import faiss
+import numpy as np
+import pytest
+
+from src.repositories.load_faiss import ClipFaiss
+
+DIM = 8
+
+
+def write_flat(path: str, vectors: np.ndarray) -> None:
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    faiss.write_index(index, path)
+
+
+@pytest.fixture(name="vectors")
+def fixture_vectors() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((30, DIM)).astype(np.float32)
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path, vectors):
+    """
+    Serves apple_clip from two shards (L01: ids 0-9, L02: ids 10-29) and
+    laion_clip from a flat index.
+    """
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    for name, ids in (("L01", np.arange(0, 10)), ("L02", np.arange(10, 30))):
+        write_flat(str(shard_dir / f"{name}.faiss"), vectors[ids])
+        np.save(shard_dir / f"{name}.ids.npy", ids.astype(np.int64))
+    write_flat(str(tmp_path / "laion.faiss"), vectors)
+    return ClipFaiss(
+        apple_faiss_url=None,
+        laion_faiss_url=str(tmp_path / "laion.faiss"),
+        apple_shard_dir=str(shard_dir),
+        apple_gpu_device=None
+    )
+
+
+def test_reconstruct_after_unloading_a_shard(store, vectors):
+    store.unload_shard(model_type="apple_clip", name="L01")
+    # ntotal of the loaded shards is 20, but id 15 lives in L02
+    result = asyncio.run(store.reconstruct("apple_clip", np.array([15, 29])))
+    np.testing.assert_array_equal(result, vectors[[15, 29]])
+
+
+def test_reconstruct_rejects_ids_of_unloaded_shards(store):
+    store.unload_shard(model_type="apple_clip", name="L01")
+    with pytest.raises(KeyError):
+        asyncio.run(store.reconstruct("apple_clip", np.array([3])))
+
+
+def test_reconstruct_rejects_ids_outside_a_flat_index(store, vectors):
+    result = asyncio.run(store.reconstruct("laion_clip", np.array([0, 29])))
+    np.testing.assert_array_equal(result, vectors[[0, 29]])
+    with pytest.raises(KeyError):
+        asyncio.run(store.reconstruct("laion_clip", np.array([30])))
+    with pytest.raises(KeyError):
+        asyncio.run(store.reconstruct("laion_clip", np.array([-1])))
@@ -0,0 +1,132 @@
+"""
+Concurrency tests for single-flight deduplication of identical text queries.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+import torch
+
+from src.modules.model_registry import ModelRegistry
+from src.services.text_clip_retrieval import TextClipRetrieval
+
+CONCURRENT = 16
+
+
+class CountingEncoder:
+    """
+    Stands in for a CLIP encoder; counts calls and can be made to fail.
+    """
+
+    def __init__(self, error: Exception = None) -> None:
+        self.calls = 0
+        self.error = error
+
+    async def text_embedding(self, text: str) -> torch.Tensor:
+        self.calls += 1
+        # yield so the other callers arrive while this call is in flight
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return torch.ones(1, 4)
+
+
+class StubFaiss:
+    """
+    Returns the same hits for every query.
+    """
+
+    async def search(self, model_type, top_k, query_vectors, candidate_k=None):
+        scores = np.linspace(1, 0, top_k, dtype=np.float32)[None]
+        indices = np.arange(top_k, dtype=np.int64)[None]
+        return scores, indices
+
+
+def build_retrieval(encoder: CountingEncoder) -> TextClipRetrieval:
+    models = ModelRegistry()
+    models.register("stub_clip", lambda device: encoder)
+    return TextClipRetrieval(
+        top_k=5,
+        models=models,
+        faiss=StubFaiss(),
+        data={indice: {"indice": indice} for indice in range(5)}
+    )
+
+
+def test_identical_requests_share_one_encoder_call():
+    encoder = CountingEncoder()
+    retrieval = build_retrieval(encoder)
+
+    async def main():
+        return await asyncio.gather(*(
+            retrieval.text_retrieval(model_type="stub_clip", text="a red car")
+            for _ in range(CONCURRENT)
+        ))
+
+    results = asyncio.run(main())
+    assert encoder.calls == 1
+    assert all(result == results[0] for result in results)
+    assert len(results[0]) == 5
+
+
+def test_different_requests_are_not_shared():
+    encoder = CountingEncoder()
+    retrieval = build_retrieval(encoder)
+
+    async def main():
+        await asyncio.gather(
+            retrieval.text_retrieval(model_type="stub_clip", text="a red car"),
+            retrieval.text_retrieval(model_type="stub_clip", text="a blue car")
+        )
+
+    asyncio.run(main())
+    assert encoder.calls == 2
+
+
+def test_error_propagates_to_every_waiter():
+    encoder = CountingEncoder(error=RuntimeError("encoder failed"))
+    retrieval = build_retrieval(encoder)
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                retrieval.text_retrieval(model_type="stub_clip", text="a red car")
+                for _ in range(CONCURRENT)
+            ),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert encoder.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # nothing is kept after the failure, so a later request tries again
+    encoder.error = None
+    result = asyncio.run(
+        retrieval.text_retrieval(model_type="stub_clip", text="a red car")
+    )
+    assert encoder.calls == 2
+    assert len(result) == 5
+
+
+@pytest.mark.parametrize("cancelled", [0, CONCURRENT // 2])
+def test_cancelled_waiters_do_not_cancel_the_call(cancelled):
+    encoder = CountingEncoder()
+    retrieval = build_retrieval(encoder)
+
+    async def main():
+        tasks = [
+            asyncio.create_task(
+                retrieval.text_retrieval(model_type="stub_clip", text="a red car")
+            )
+            for _ in range(CONCURRENT)
+        ]
+        await asyncio.sleep(0)
+        for task in tasks[:cancelled]:
+            task.cancel()
+        return await asyncio.gather(*tasks[cancelled:])
+
+    results = asyncio.run(main())
+    assert encoder.calls == 1
+    assert all(len(result) == 5 for result in results)